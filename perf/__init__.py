@@ -0,0 +1 @@
+# Performance tooling package
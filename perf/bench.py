@@ -0,0 +1,245 @@
+"""
+Micro-benchmark runner with stored baselines and regression gating.
+
+Usage (from the repository root):
+    python -m perf.bench run                     # run and print results
+    python -m perf.bench run --save              # overwrite perf/baselines/<service>.json
+    python -m perf.bench run --save --filter X   # update only the matching benchmarks
+    python -m perf.bench compare --threshold 0.2 # exit 1 if any benchmark is >20% slower
+
+Each service is measured in its own interpreter because both use the
+top-level package name `app`.
+"""
+import argparse
+import datetime
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(REPO_ROOT, "perf", "baselines")
+SCHEMA_VERSION = 1
+SERVICES = ("api", "comments")
+SERVICE_DIRS = {
+    "api": os.path.join(REPO_ROOT, "text-generation-api"),
+    "comments": os.path.join(REPO_ROOT, "text-generation-comments"),
+}
+
+
+def measure(fn: Callable[[], object], min_time: float = 0.05, repeats: int = 7) -> dict:
+    """
+    Time `fn` in calibrated batches.
+
+    Loops per repeat are doubled until one batch takes at least `min_time`,
+    then `repeats` batches are timed and reported per call in nanoseconds.
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= min_time * 1e9:
+            break
+        loops *= 2
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            fn()
+        timings.append((time.perf_counter_ns() - start) / loops)
+
+    return {
+        "median_ns": statistics.median(timings),
+        "min_ns": min(timings),
+        "stdev_ns": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "loops": loops,
+        "repeats": repeats,
+    }
+
+
+def _measure_service(service: str, name_filter: Optional[str], output: str, min_time: float, repeats: int) -> None:
+    """Child-process entry point: run one service's benchmarks into `output`."""
+    sys.path.insert(0, SERVICE_DIRS[service])
+    module = importlib.import_module(f"perf.benchmarks.{service}")
+    benchmarks = module.build()
+
+    results = {}
+    for name, fn in benchmarks.items():
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = measure(fn, min_time, repeats)
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f)
+
+
+def run_benchmarks(service: str, name_filter: Optional[str], min_time: float, repeats: int) -> Dict[str, dict]:
+    """Run a service's benchmarks in a fresh interpreter and return the results."""
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+        output = tmp.name
+    cmd = [
+        sys.executable, "-m", "perf.bench", "_measure", "--service", service,
+        "--output", output, "--min-time", str(min_time), "--repeats", str(repeats),
+    ]
+    if name_filter:
+        cmd += ["--filter", name_filter]
+
+    # Service modules print while loading (glossary etc.); keep that out of the report
+    subprocess.run(cmd, cwd=REPO_ROOT, check=True, stdout=subprocess.DEVNULL)
+    with open(output, encoding="utf-8") as f:
+        results = json.load(f)
+    os.unlink(output)
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def baseline_path(service: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{service}.json")
+
+
+def save_baseline(service: str, results: Dict[str, dict], merge: bool = False) -> str:
+    """
+    Write results as the versioned baseline for `service`. With `merge` the
+    stored baseline is kept and only the benchmarks in `results` are
+    replaced, so `run --save --filter X` refreshes X alone.
+    """
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    if merge and os.path.exists(baseline_path(service)):
+        results = {**load_baseline(service), **results}
+    document = {
+        "schema_version": SCHEMA_VERSION,
+        "service": service,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "benchmarks": results,
+    }
+    path = baseline_path(service)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return path
+
+
+def load_baseline(service: str) -> Dict[str, dict]:
+    with open(baseline_path(service), encoding="utf-8") as f:
+        document = json.load(f)
+    if document.get("schema_version") != SCHEMA_VERSION:
+        raise ValueError(
+            f"Baseline {baseline_path(service)} has schema {document.get('schema_version')}, "
+            f"expected {SCHEMA_VERSION}; re-create it with `run --save`"
+        )
+    return document["benchmarks"]
+
+
+def _format_ns(value: float) -> str:
+    if value >= 1e6:
+        return f"{value / 1e6:.2f} ms"
+    if value >= 1e3:
+        return f"{value / 1e3:.2f} us"
+    return f"{value:.0f} ns"
+
+
+def print_results(service: str, results: Dict[str, dict]) -> None:
+    print(f"\n=== {service} ===")
+    for name, row in results.items():
+        print(f"{name:<42}{_format_ns(row['median_ns']):>12}  (min {_format_ns(row['min_ns'])}, loops {row['loops']})")
+
+
+def compare(service: str, results: Dict[str, dict], baseline: Dict[str, dict], threshold: float,
+            name_filter: Optional[str] = None) -> List[str]:
+    """Print a comparison table and return the names of regressed benchmarks."""
+    regressions = []
+    print(f"\n=== {service} vs baseline (threshold +{threshold:.0%}) ===")
+    for name, row in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<42}{_format_ns(row['median_ns']):>12}  new (no baseline)")
+            continue
+        ratio = row["median_ns"] / base["median_ns"]
+        status = "ok"
+        if ratio > 1 + threshold:
+            status = "REGRESSION"
+            regressions.append(f"{service}:{name}")
+        elif ratio < 1 - threshold:
+            status = "faster"
+        print(
+            f"{name:<42}{_format_ns(base['median_ns']):>12} -> {_format_ns(row['median_ns']):>10}"
+            f"  {ratio - 1:+7.1%}  {status}"
+        )
+    for name in baseline:
+        if name not in results and not (name_filter and name_filter not in name):
+            print(f"{name:<42}{'':>12}  missing from current run")
+    return regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks with baseline regression gating")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for command in ("run", "compare"):
+        p = sub.add_parser(command)
+        p.add_argument("--service", choices=[*SERVICES, "both"], default="both")
+        p.add_argument("--filter", default=None, help="Only run benchmarks whose name contains this")
+        p.add_argument("--min-time", type=float, default=0.05, help="Minimum seconds per timed batch")
+        p.add_argument("--repeats", type=int, default=7)
+        if command == "run":
+            p.add_argument("--save", action="store_true", help="Store results as the new baseline")
+        else:
+            p.add_argument("--threshold", type=float, default=0.25,
+                           help="Allowed slowdown as a fraction of the baseline median")
+
+    child = sub.add_parser("_measure")
+    child.add_argument("--service", choices=SERVICES, required=True)
+    child.add_argument("--output", required=True)
+    child.add_argument("--filter", default=None)
+    child.add_argument("--min-time", type=float, default=0.05)
+    child.add_argument("--repeats", type=int, default=7)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.command == "_measure":
+        _measure_service(args.service, args.filter, args.output, args.min_time, args.repeats)
+        return 0
+
+    services = SERVICES if args.service == "both" else (args.service,)
+    regressions = []
+    for service in services:
+        results = run_benchmarks(service, args.filter, args.min_time, args.repeats)
+        if args.command == "run":
+            print_results(service, results)
+            if args.save:
+                path = save_baseline(service, results, merge=args.filter is not None)
+                print(f"Saved baseline: {path}")
+        else:
+            regressions += compare(service, results, load_baseline(service), args.threshold, args.filter)
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
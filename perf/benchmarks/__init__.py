@@ -0,0 +1 @@
+# Micro-benchmark definitions, one module per service
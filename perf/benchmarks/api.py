@@ -0,0 +1,50 @@
+"""
+Micro-benchmarks for the Text Generation API hot paths.
+Imported by `perf.bench` with text-generation-api on sys.path.
+"""
+from typing import Callable, Dict
+
+from perf.benchmarks.serialization import batch_body, compression_benchmarks, response_benchmarks
+from perf.loadtest import ENTITY_FIELDS
+
+
+def build() -> Dict[str, Callable[[], object]]:
+    """Return benchmark name -> zero-argument callable."""
+    from app.models.schemas import GenerationRequest, GenerationResponse
+    from app.services.template_generator import template_generator
+
+    benchmarks: Dict[str, Callable[[], object]] = {}
+
+    for entity, fields in ENTITY_FIELDS.items():
+        benchmarks[f"template_generate[{entity}]"] = (
+            lambda entity=entity, fields=fields: template_generator.generate(entity, fields)
+        )
+
+    benchmarks["format_date[iso]"] = lambda: template_generator._format_date("2026-01-05")
+    benchmarks["format_date[invalid]"] = lambda: template_generator._format_date("next week")
+
+    request_body = {
+        "entity_type": "review",
+        "generation_mode": "ai",
+        "fields": ENTITY_FIELDS["review"],
+    }
+    benchmarks["validate_request[generation]"] = lambda: GenerationRequest.model_validate(request_body)
+
+    description = template_generator.generate("review", ENTITY_FIELDS["review"])
+    benchmarks["build_response[generation]"] = lambda: GenerationResponse(
+        success=True,
+        generated_description=description,
+        generation_mode="template",
+        editable=True,
+    ).model_dump_json()
+
+    response = GenerationResponse(
+        success=True,
+        generated_description=description,
+        generation_mode="template",
+        editable=True,
+    )
+    benchmarks.update(response_benchmarks("generation", response))
+    benchmarks.update(compression_benchmarks("generation_batch50", batch_body(response, 50)))
+
+    return benchmarks
@@ -0,0 +1,114 @@
+"""
+Micro-benchmarks for the Comment Rephrasing Service hot paths.
+Imported by `perf.bench` with text-generation-comments on sys.path.
+"""
+from typing import Callable, Dict
+
+from perf.benchmarks.serialization import batch_body, compression_benchmarks, response_benchmarks
+from perf.mock_llm import REPHRASE_RESPONSE
+
+SHORT_INPUT = "iim colum spacing wrong"
+LONG_INPUT = (
+    "please update the boq with revised quantities for the podium slab and check the "
+    "rebar spacing at grid c4 against the gfc dwgs before resubmitting"
+)
+
+
+def build() -> Dict[str, Callable[[], object]]:
+    """Return benchmark name -> zero-argument callable."""
+    from app.models.rephrase_schemas import (
+        CommentRephraseRequest,
+        CommentRephraseResponse,
+        CorrectionsInfo,
+        ReviewStatus,
+    )
+    from app.services.comment_rephraser import comment_rephraser
+    from app.services.prompt_optimizer import PromptOptimizer
+    from app.services.rule_rephraser import rule_rephraser
+    from app.services.suggestion_index import SuggestionIndex
+    from app.services.construction_terms import (
+        _close_matches,
+        detect_issue_category,
+        expand_abbreviations,
+        find_relevant_glossary_terms,
+        load_glossary,
+        rank_glossary_terms,
+    )
+
+    # Benchmark matching against the real glossary, not the lazy first load
+    load_glossary()
+
+    def cold(fn: Callable[[str], object], text: str) -> Callable[[], object]:
+        # Without the per-word fuzzy-match cache every loop would be a cache hit
+        def run() -> object:
+            _close_matches.cache_clear()
+            return fn(text)
+        return run
+
+    expanded_text, expansions = expand_abbreviations(SHORT_INPUT)
+    glossary_terms = find_relevant_glossary_terms(SHORT_INPUT)
+    ranked_glossary = rank_glossary_terms(LONG_INPUT)
+    context = {"workflow_name": "Two Step Approval", "step_name": "Structural Review"}
+    suggestions = comment_rephraser._parse_suggestions(REPHRASE_RESPONSE)
+    # A full index of distinct past inputs, as after months of traffic
+    index = SuggestionIndex()
+    subjects = ["rebar spacing", "column", "wall paint", "slab level", "drawing", "boq", "site cleanup", "formwork"]
+    verdicts = ["wrong", "missing", "bd", "ok", "incomplete", "unclear"]
+    for i in range(index.max_entries):
+        status = ("reject", "revise", "submit")[i % 3]
+        input_text = f"{subjects[i % 8]} {verdicts[i // 8 % 6]} grid {i // 48}"
+        for suggestion in suggestions:
+            index.add(i, input_text, status, suggestion.text, suggestion.style, suggestion.confidence)
+
+    request_body = {
+        "input": SHORT_INPUT,
+        "status": "reject",
+        "context": context,
+        "num_suggestions": 3,
+    }
+
+    response = CommentRephraseResponse(
+        success=True,
+        suggestions=suggestions,
+        corrections=CorrectionsInfo(terms_expanded=expansions),
+        original_input=SHORT_INPUT,
+        input_type="expand",
+    )
+
+    return {
+        **response_benchmarks("rephrase", response),
+        **compression_benchmarks("rephrase_batch50", batch_body(response, 50)),
+        "expand_abbreviations[short]": lambda: expand_abbreviations(SHORT_INPUT),
+        "expand_abbreviations[long]": lambda: expand_abbreviations(LONG_INPUT),
+        "detect_issue_category[short]": lambda: detect_issue_category(SHORT_INPUT),
+        "detect_issue_category[long]": lambda: detect_issue_category(LONG_INPUT),
+        "find_relevant_glossary_terms[short]": cold(find_relevant_glossary_terms, SHORT_INPUT),
+        "find_relevant_glossary_terms[long]": cold(find_relevant_glossary_terms, LONG_INPUT),
+        # Typeahead re-sends the same words on every keystroke
+        "find_relevant_glossary_terms[cached][short]": lambda: find_relevant_glossary_terms(SHORT_INPUT),
+        "find_relevant_glossary_terms[cached][long]": lambda: find_relevant_glossary_terms(LONG_INPUT),
+        "build_prompt": lambda: comment_rephraser._build_prompt(
+            SHORT_INPUT, ReviewStatus.REJECT, expanded_text, context, glossary_terms
+        ),
+        "rank_glossary_terms[long]": cold(rank_glossary_terms, LONG_INPUT),
+        "optimize_prompt[long]": lambda: PromptOptimizer(550).optimize(
+            lambda terms, few_shot: comment_rephraser._build_prompt(
+                LONG_INPUT, ReviewStatus.REVISE, expanded_text, context, terms, few_shot
+            ),
+            ranked_glossary,
+            "polish",
+        ),
+        "rule_rephrase[short]": lambda: rule_rephraser.suggest(SHORT_INPUT, ReviewStatus.REJECT),
+        "rule_rephrase[long]": lambda: rule_rephraser.suggest(LONG_INPUT, ReviewStatus.REVISE, input_type="polish"),
+        "retrieval_search[hit]": lambda: index.search("rebar spacing wrong grid 12", ReviewStatus.REJECT),
+        "retrieval_search[miss]": lambda: index.search(LONG_INPUT, ReviewStatus.REVISE),
+        "parse_suggestions": lambda: comment_rephraser._parse_suggestions(REPHRASE_RESPONSE),
+        "validate_request[rephrase]": lambda: CommentRephraseRequest.model_validate(request_body),
+        "build_response[rephrase]": lambda: CommentRephraseResponse(
+            success=True,
+            suggestions=suggestions,
+            corrections=CorrectionsInfo(terms_expanded=expansions),
+            original_input=SHORT_INPUT,
+            input_type="expand",
+        ).model_dump_json(),
+    }
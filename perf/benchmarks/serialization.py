@@ -0,0 +1,58 @@
+"""
+Response serialization and compression benchmarks shared by both services.
+
+For each payload:
+
+- `respond[fastapi]` is what the installed FastAPI does with a model a
+  handler returns: validate it against `response_model`, then encode it
+  with pydantic-core.
+- `respond[legacy]` is what FastAPI releases before that fast path do (the
+  requirements allow them): dump the model to a dict, validate the dict
+  into a new model, dump it again and encode it with the stdlib json module.
+- `respond[fast]` is the `model_response` path.
+
+The differences are the CPU saved per request.
+"""
+import json
+from typing import Callable, Dict
+
+from pydantic import BaseModel
+
+
+def response_benchmarks(label: str, model: BaseModel) -> Dict[str, Callable[[], object]]:
+    """Benchmarks rendering `model` as an HTTP response body three ways."""
+    from fastapi.responses import JSONResponse, Response
+    from fastapi.utils import create_model_field
+
+    from textgen_common.serialization import FastJSONResponse
+
+    field = create_model_field(name=f"Response_{label}", type_=type(model), mode="serialization")
+
+    def fastapi_path():
+        value, _ = field.validate(model, {}, loc=("response",))
+        return Response(field.serialize_json(value), media_type="application/json").body
+
+    def legacy_path():
+        value, _ = field.validate(model.model_dump(by_alias=True), {}, loc=("response",))
+        return JSONResponse(field.serialize(value, mode="json")).body
+
+    return {
+        f"respond[fastapi][{label}]": fastapi_path,
+        f"respond[legacy][{label}]": legacy_path,
+        f"respond[fast][{label}]": lambda: FastJSONResponse(model).body,
+    }
+
+
+def compression_benchmarks(label: str, body: bytes) -> Dict[str, Callable[[], object]]:
+    """Benchmarks compressing a response body with each negotiated encoding."""
+    from textgen_common.compression import brotli, compress
+
+    benchmarks = {f"compress[gzip][{label}]": lambda: compress("gzip", body)}
+    if brotli is not None:
+        benchmarks[f"compress[br][{label}]"] = lambda: compress("br", body)
+    return benchmarks
+
+
+def batch_body(model: BaseModel, count: int) -> bytes:
+    """A JSON array of `count` copies of the model, sized like a batch response."""
+    return json.dumps([model.model_dump(mode="json")] * count).encode("utf-8")
@@ -0,0 +1,335 @@
+"""
+Load-testing suite for the Text Generation API and the Comment Rephrasing Service.
+
+Drives the real FastAPI apps in-process through httpx's ASGI transport, with
+the OpenAI/Groq/Gemini clients replaced by mocks from `perf.mock_llm`.
+
+Usage (from the repository root):
+    python -m perf.loadtest --service comments --concurrency 32 --requests 2000 \\
+        --mix rephrase=6,feedback=2,review=2 --latency lognormal:0.8:0.5
+    python -m perf.loadtest --service api --duration 30 --latency uniform:0.3:1.2
+    python -m perf.loadtest --service both --json results.json
+    python -m perf.loadtest --service comments --mix rephrase=1,rephrase_batch=9  # priority isolation
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVICE_DIRS = {
+    "api": os.path.join(REPO_ROOT, "text-generation-api"),
+    "comments": os.path.join(REPO_ROOT, "text-generation-comments"),
+}
+
+DEFAULT_MIX = {
+    "api": "generate=4,generate_template=1",
+    "comments": "rephrase=6,feedback=2,review=2",
+}
+
+REPHRASE_INPUTS = [
+    "rebar spacing wrong", "iim colum bad", "dims missing on dwg", "site cleared ok",
+    "conc cover insufficient", "wall paint bd", "rfa for rnf", "clash with mep duct",
+    "specs not followed for waterproofing membrane", "approved", "safety rails missing at lvl 3",
+    "please update the boq with revised quantities for the podium slab",
+]
+
+ENTITY_FIELDS = {
+    "review": {
+        "name": "Phase 1 Inspection", "start_date": "2026-01-05", "due_date": "2026-01-15",
+        "workflow": "Approval Workflow", "priority": "High", "estimated_cost": 50000,
+        "checklist": ["Safety Check", "Quality Review"],
+    },
+    "rfa": {
+        "name": "Safety Compliance", "request_date": "2026-01-10", "due_date": "2026-01-20",
+        "workflow": "Review Process", "priority": "Medium",
+    },
+    "issue": {
+        "name": "Window Problem", "issue_type": "Windows component", "placement": "main entrance",
+        "location": "Chennai", "root_cause": "large opening", "start_date": "2026-01-20",
+        "due_date": "2026-01-28", "estimated_cost": 12000,
+    },
+}
+
+STATUSES = ["submit", "reject", "revise"]
+
+
+def _generate_payload(rng: random.Random, mode: str) -> dict:
+    entity = rng.choice(list(ENTITY_FIELDS))
+    return {"entity_type": entity, "generation_mode": mode, "fields": ENTITY_FIELDS[entity]}
+
+
+def _rephrase_payload(rng: random.Random) -> dict:
+    return {
+        "input": rng.choice(REPHRASE_INPUTS),
+        "status": rng.choice(STATUSES),
+        "num_suggestions": 3,
+    }
+
+
+def _feedback_payload(rng: random.Random) -> dict:
+    return {"suggestion_id": rng.randint(1, 1000), "is_helpful": rng.random() < 0.7}
+
+
+def _review_payload(rng: random.Random) -> dict:
+    return {
+        "review_id": rng.randint(1, 200),
+        "workflow_step": rng.randint(1, 5),
+        "user_name": f"reviewer{rng.randint(1, 50)}",
+        "status": rng.choice(STATUSES),
+        "text": rng.choice(REPHRASE_INPUTS),
+    }
+
+
+BATCH = {"X-Priority-Class": "batch"}
+
+# name -> (path, payload factory, extra headers)
+ENDPOINTS: Dict[str, Tuple[str, Callable[[random.Random], dict], Dict[str, str]]] = {
+    "generate": ("/api/v1/generate-description", lambda rng: _generate_payload(rng, "ai"), {}),
+    "generate_batch": ("/api/v1/generate-description", lambda rng: _generate_payload(rng, "ai"), BATCH),
+    "generate_template": ("/api/v1/generate-description", lambda rng: _generate_payload(rng, "template"), {}),
+    "rephrase": ("/api/v1/rephrase-comment", _rephrase_payload, {}),
+    "rephrase_batch": ("/api/v1/rephrase-comment", _rephrase_payload, BATCH),
+    "feedback": ("/api/v1/feedback", _feedback_payload, {}),
+    "review": ("/api/v1/review-comments/add", _review_payload, {}),
+}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse 'rephrase=6,feedback=2' into endpoint weights."""
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in mix: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def load_service(service: str, db_path: Optional[str] = None):
+    """
+    Import a service's FastAPI app in this process.
+
+    Both services use the top-level package name `app`, so only one can be
+    loaded per process.
+    """
+    sys.path.insert(0, SERVICE_DIRS[service])
+    # Per-request access logs would drown the report
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if service == "comments":
+        os.environ["COMMENTS_DB_PATH"] = db_path
+        from app.comments_db.base import Base
+        from app.comments_db.session import sync_engine
+        import app.comments_db.models  # noqa: F401 - registers tables
+        Base.metadata.create_all(bind=sync_engine)
+
+    from app.main import app
+    from app.config import settings
+    from textgen_common.providers import providers
+    return app, settings, providers
+
+
+def summarize(results: List[Tuple[str, float, bool]], elapsed: float) -> dict:
+    """Aggregate raw (endpoint, latency, ok) samples into a report."""
+    by_endpoint: Dict[str, List[Tuple[float, bool]]] = {}
+    for name, latency, ok in results:
+        by_endpoint.setdefault(name, []).append((latency, ok))
+    by_endpoint["ALL"] = [(latency, ok) for _, latency, ok in results]
+
+    report = {}
+    for name, samples in by_endpoint.items():
+        latencies = sorted(latency for latency, _ in samples)
+        errors = sum(1 for _, ok in samples if not ok)
+        report[name] = {
+            "requests": len(samples),
+            "errors": errors,
+            "error_rate": errors / len(samples) if samples else 0.0,
+            "throughput_rps": len(samples) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        }
+    return report
+
+
+def print_report(service: str, report: dict, elapsed: float) -> None:
+    print(f"\n=== {service}: {report['ALL']['requests']} requests in {elapsed:.2f}s ===")
+    header = f"{'endpoint':<20}{'reqs':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'err %':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, row in report.items():
+        print(
+            f"{name:<20}{row['requests']:>8}{row['throughput_rps']:>10.1f}"
+            f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+            f"{row['error_rate'] * 100:>8.2f}"
+        )
+
+
+async def run_load(app, mix: Dict[str, float], concurrency: int, total: Optional[int],
+                   duration: Optional[float], seed: int) -> Tuple[List[Tuple[str, float, bool]], float]:
+    """Run the workload against an ASGI app and return raw samples."""
+    import httpx
+
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    results: List[Tuple[str, float, bool]] = []
+    issued = 0
+    deadline = time.perf_counter() + duration if duration else None
+
+    def next_request() -> Optional[Tuple[str, dict]]:
+        nonlocal issued
+        if total is not None and issued >= total:
+            return None
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+        issued += 1
+        name = rng.choices(names, weights)[0]
+        return name, ENDPOINTS[name][1](rng)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=120) as client:
+
+        async def worker():
+            while True:
+                item = next_request()
+                if item is None:
+                    return
+                name, payload = item
+                start = time.perf_counter()
+                try:
+                    path, _, headers = ENDPOINTS[name]
+                    response = await client.post(path, json=payload, headers=headers)
+                    ok = response.status_code < 400 and response.json().get("success", True) is not False
+                except Exception:
+                    ok = False
+                results.append((name, time.perf_counter() - start, ok))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return results, elapsed
+
+
+def run_service(args) -> dict:
+    """Load one service in-process, install the mock provider and run the workload."""
+    from perf.mock_llm import LatencyDistribution, install_mock_provider
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app, settings, providers = load_service(args.service, os.path.join(tmp, "loadtest.db"))
+        mock = install_mock_provider(
+            providers, settings, args.provider,
+            LatencyDistribution(args.latency, seed=args.seed),
+            error_rate=args.error_rate, seed=args.seed,
+        )
+        mix = parse_mix(args.mix or DEFAULT_MIX[args.service])
+
+        # Keep any remaining service output out of the report
+        sink = io.StringIO() if not args.verbose else sys.stdout
+        with contextlib.redirect_stdout(sink):
+            if args.warmup:
+                asyncio.run(run_load(app, mix, min(args.concurrency, args.warmup), args.warmup, None, args.seed + 1))
+            results, elapsed = asyncio.run(
+                run_load(app, mix, args.concurrency, args.requests, args.duration, args.seed)
+            )
+
+    report = summarize(results, elapsed)
+    print_report(args.service, report, elapsed)
+    print(f"mock provider calls: {mock.behaviour.calls}")
+    return {
+        "service": args.service,
+        "config": {
+            "concurrency": args.concurrency, "requests": args.requests, "duration": args.duration,
+            "mix": mix, "latency": args.latency, "error_rate": args.error_rate,
+            "provider": args.provider, "seed": args.seed,
+        },
+        "elapsed_s": elapsed,
+        "endpoints": report,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Load-test the Krion AI services with a mock LLM")
+    parser.add_argument("--service", choices=["api", "comments", "both"], default="both")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=None, help="Total requests (default 500 unless --duration)")
+    parser.add_argument("--duration", type=float, default=None, help="Run for N seconds instead of a request count")
+    parser.add_argument("--mix", default=None, help="Endpoint weights, e.g. rephrase=6,feedback=2,review=2")
+    parser.add_argument("--latency", default="lognormal:0.5:0.4", help="Mock LLM latency distribution spec")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of mock LLM calls that fail")
+    parser.add_argument("--provider", choices=["openai", "groq", "gemini"], default="groq")
+    parser.add_argument("--warmup", type=int, default=10, help="Warmup requests before measuring")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--json", dest="json_path", default=None, help="Write the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show service output during the run")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.requests is None and args.duration is None:
+        args.requests = 500
+
+    if args.service == "both":
+        # Each service needs its own interpreter because both are named `app`
+        reports = []
+        for service in ("api", "comments"):
+            child_argv = [a for a in (argv if argv is not None else sys.argv[1:])]
+            child_argv = _replace_option(child_argv, "--service", service)
+            with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+                json_path = tmp.name
+            child_argv = _replace_option(child_argv, "--json", json_path)
+            code = subprocess.call([sys.executable, "-m", "perf.loadtest", *child_argv], cwd=REPO_ROOT)
+            if code != 0:
+                return code
+            with open(json_path, encoding="utf-8") as f:
+                reports.extend(json.load(f))
+            os.unlink(json_path)
+    else:
+        reports = [run_service(args)]
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+    return 0
+
+
+def _replace_option(argv: List[str], option: str, value: str) -> List[str]:
+    """Return argv with `option` set to `value` (handles both '--opt v' and '--opt=v')."""
+    result = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        if arg == option:
+            skip = True
+            continue
+        if arg.startswith(option + "="):
+            continue
+        result.append(arg)
+    return result + [option, value]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
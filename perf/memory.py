@@ -0,0 +1,178 @@
+"""
+Per-box memory benchmark for the pre-fork (gunicorn) deployment mode.
+
+Starts each service under gunicorn.conf.py with an increasing worker count,
+drives a few requests through every worker, then sums the proportional set
+size (PSS) of the master and all workers. Shared copy-on-write pages are
+split between the processes that map them, so the PSS sum is the real
+per-box footprint; with preloading it should grow by only a worker's private
+heap per extra worker.
+
+Usage (from the repository root, Linux only):
+    python -m perf.memory --service comments --workers 1,2,4,8
+    python -m perf.memory --compare-no-preload                 # same runs without preload_app
+    python -m perf.memory --max-worker-mb 30                   # exit 1 if a worker adds more
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+from perf.startup import HEALTH_PATHS, SERVICE_DIRS, SERVICES, _free_port, _service_env
+
+
+def _children(pid: int) -> List[int]:
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="utf-8") as f:
+                # The command name may contain spaces; the ppid follows the closing paren
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return children
+
+
+def _memory_kb(pid: int) -> Dict[str, int]:
+    """Pss and Rss of one process from /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup", encoding="utf-8") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key.lower()] = int(rest.split()[0])
+    return values
+
+
+def _get(url: str, timeout: float = 5.0) -> bool:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+        return True
+    except OSError:  # URLError, refused/reset connections and timeouts
+        return False
+
+
+def measure(service: str, workers: int, preload: bool, requests: int, settle: float, timeout: float) -> dict:
+    """Run one gunicorn configuration and return its summed memory."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}{HEALTH_PATHS[service]}"
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = _service_env(service, workdir)
+        env.update({
+            "BIND": f"127.0.0.1:{port}",
+            "WEB_CONCURRENCY": str(workers),
+            "GUNICORN_PRELOAD": "true" if preload else "false",
+            "PROMETHEUS_MULTIPROC_DIR": os.path.join(workdir, "metrics"),
+            "SHARED_STORE_PATH": os.path.join(workdir, "shared.sqlite3"),
+        })
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app"],
+            cwd=SERVICE_DIRS[service],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            deadline = time.monotonic() + timeout
+            while not _get(url, timeout=1.0) or len(_children(proc.pid)) < workers:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"gunicorn exited with {proc.returncode}")
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{service} with {workers} workers not ready within {timeout:.0f}s")
+                time.sleep(0.1)
+
+            # Fresh connections are spread over the workers by the kernel
+            for _ in range(requests * workers):
+                _get(url)
+            # Let the per-worker startup warm-up finish
+            time.sleep(settle)
+
+            pids = [proc.pid, *_children(proc.pid)]
+            per_process = [_memory_kb(pid) for pid in pids]
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    return {
+        "workers": workers,
+        "preload": preload,
+        "processes": len(pids),
+        "pss_mb": sum(p["pss"] for p in per_process) / 1024,
+        "rss_mb": sum(p["rss"] for p in per_process) / 1024,
+    }
+
+
+def marginal_worker_mb(rows: List[dict]) -> float:
+    """Least-squares slope of total PSS over worker count."""
+    if len(rows) < 2:
+        return 0.0
+    xs = [row["workers"] for row in rows]
+    ys = [row["pss_mb"] for row in rows]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sum((x - mean_x) ** 2 for x in xs)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Per-box PSS across gunicorn worker counts")
+    parser.add_argument("--service", choices=[*SERVICES, "both"], default="both")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--requests", type=int, default=20, help="Health requests per worker before measuring")
+    parser.add_argument("--settle", type=float, default=2.0, help="Seconds to wait before reading memory")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--compare-no-preload", action="store_true", help="Also measure without preload_app")
+    parser.add_argument("--max-worker-mb", type=float, default=40.0,
+                        help="Fail if each extra preloaded worker adds more PSS than this (0 disables)")
+    parser.add_argument("--json", default=None, help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("PSS needs Linux /proc/<pid>/smaps_rollup")
+        return 2
+
+    counts = [int(n) for n in args.workers.split(",")]
+    services = SERVICES if args.service == "both" else (args.service,)
+    modes = [True, False] if args.compare_no_preload else [True]
+    report = {}
+    failures = []
+
+    for service in services:
+        print(f"\n=== {service} ===")
+        print(f"{'mode':<12}{'workers':>8}{'PSS MB':>10}{'RSS MB':>10}")
+        report[service] = {}
+        for preload in modes:
+            mode = "preload" if preload else "no-preload"
+            rows = [measure(service, n, preload, args.requests, args.settle, args.timeout) for n in counts]
+            for row in rows:
+                print(f"{mode:<12}{row['workers']:>8}{row['pss_mb']:>10.1f}{row['rss_mb']:>10.1f}")
+            slope = marginal_worker_mb(rows)
+            print(f"{mode:<12}{'':>8}  +{slope:.1f} MB PSS per extra worker")
+            report[service][mode] = {"rows": rows, "per_worker_mb": slope}
+            if preload and args.max_worker_mb and slope > args.max_worker_mb:
+                failures.append(f"{service} +{slope:.1f} MB/worker > {args.max_worker_mb:.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if failures:
+        print(f"\nOver budget: {'; '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+In-process mock LLM clients for load and capacity testing.
+
+The mocks mimic the parts of the OpenAI (also used for Groq) and Gemini SDKs
+that the services call, with configurable latency distributions and error
+rates. Like the real clients, the OpenAI mock and Gemini's
+`generate_content_async` wait without blocking the event loop and can be
+cancelled; Gemini's sync `generate_content` blocks the calling thread.
+With `stream=True` both async mocks return the text word by word.
+"""
+import asyncio
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+
+class LatencyDistribution:
+    """
+    Latency sampler parsed from a compact spec string (seconds).
+
+    Supported specs:
+        fixed:0.5
+        uniform:0.2:1.5
+        normal:0.8:0.2          (mean, stddev; clamped at 0)
+        lognormal:0.8:0.5       (median, sigma)
+    """
+
+    def __init__(self, spec: str = "fixed:0", seed: Optional[int] = None):
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        self.spec = spec
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if kind not in expected or len(self.params) != expected[kind]:
+            raise ValueError(f"Invalid latency spec: {spec}")
+
+    def sample(self) -> float:
+        """Draw one latency value in seconds."""
+        with self._lock:
+            if self.kind == "fixed":
+                return self.params[0]
+            if self.kind == "uniform":
+                return self._rng.uniform(*self.params)
+            if self.kind == "normal":
+                return max(0.0, self._rng.gauss(*self.params))
+            median, sigma = self.params
+            return median * self._rng.lognormvariate(0.0, sigma)
+
+
+class MockProviderError(Exception):
+    """Raised by the mock clients to simulate provider failures."""
+
+
+REPHRASE_LINES = {
+    "[FORMAL]": "The submitted item does not comply with the approved specifications. Please revise and resubmit.",
+    "[FRIENDLY]": "Thanks for the submission. A few details need correcting before we can approve it.",
+    "[CONCISE]": "Non-compliant with specifications. Revise and resubmit.",
+    "[DETAILED]": "The submitted item deviates from the approved specifications in the marked sections.",
+    "[ACTIONABLE]": "Correct the marked sections to match the approved specifications and resubmit.",
+}
+
+REPHRASE_RESPONSE = "\n".join(f"{label} {REPHRASE_LINES[label]}" for label in ("[FORMAL]", "[FRIENDLY]", "[CONCISE]"))
+
+DESCRIPTION_RESPONSE = (
+    "This item has been scheduled according to the provided timeline and follows the "
+    "configured workflow. All key details have been captured for the project team."
+)
+
+
+def _mock_text(prompt: str) -> str:
+    """Pick a canned response shaped like what the service expects."""
+    _, marker, output_format = prompt.partition("OUTPUT FORMAT:")
+    if not marker:
+        return DESCRIPTION_RESPONSE
+    # One line per style label the prompt asks for, in its order
+    labels = sorted(
+        (label for label in REPHRASE_LINES if label in output_format),
+        key=output_format.index,
+    )
+    return "\n".join(f"{label} {REPHRASE_LINES[label]}" for label in labels)
+
+
+class _MockBehaviour:
+    """Shared latency and fault behaviour for the mock clients."""
+
+    def __init__(self, latency: LatencyDistribution, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _draw(self):
+        with self._lock:
+            self.calls += 1
+            fail = self._rng.random() < self.error_rate
+        return self.latency.sample(), fail
+
+    def simulate(self) -> None:
+        delay, fail = self._draw()
+        time.sleep(delay)
+        if fail:
+            raise MockProviderError("Simulated provider error")
+
+    async def simulate_async(self) -> None:
+        delay, fail = self._draw()
+        await asyncio.sleep(delay)
+        if fail:
+            raise MockProviderError("Simulated provider error")
+
+
+def _words(text: str):
+    """Split text into stream chunks that keep their separators."""
+    chunks, start = [], 0
+    for i, char in enumerate(text):
+        if char in " \n":
+            chunks.append(text[start:i + 1])
+            start = i + 1
+    if start < len(text):
+        chunks.append(text[start:])
+    return chunks
+
+
+async def _aiter(items):
+    for item in items:
+        await asyncio.sleep(0)
+        yield item
+
+
+class _MockCompletions:
+    def __init__(self, behaviour: _MockBehaviour):
+        self._behaviour = behaviour
+
+    async def create(self, model: str, messages: list, stream: bool = False, **kwargs):
+        await self._behaviour.simulate_async()
+        prompt = messages[-1]["content"]
+        text = _mock_text(prompt)
+        usage = SimpleNamespace(
+            prompt_tokens=len(prompt) // 4,
+            completion_tokens=len(text) // 4,
+            total_tokens=(len(prompt) + len(text)) // 4,
+        )
+        if stream:
+            chunks = [
+                SimpleNamespace(model=model, choices=[SimpleNamespace(delta=SimpleNamespace(content=word))], usage=None)
+                for word in _words(text)
+            ]
+            chunks.append(SimpleNamespace(model=model, choices=[], usage=usage))
+            return _aiter(chunks)
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(message=SimpleNamespace(content=text), finish_reason="stop")],
+            usage=usage,
+        )
+
+
+class MockOpenAIClient:
+    """Stand-in for `openai.AsyncOpenAI` (also used for Groq)."""
+
+    def __init__(self, latency: LatencyDistribution, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.behaviour = _MockBehaviour(latency, error_rate, seed)
+        self.chat = SimpleNamespace(completions=_MockCompletions(self.behaviour))
+
+
+class MockGeminiModel:
+    """Stand-in for `google.generativeai.GenerativeModel`."""
+
+    def __init__(
+        self,
+        latency: LatencyDistribution,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+        model_name: str = "models/mock-gemini",
+    ):
+        self.behaviour = _MockBehaviour(latency, error_rate, seed)
+        self.model_name = model_name
+
+    def generate_content(self, prompt: str, **kwargs):
+        self.behaviour.simulate()
+        return self._response(prompt)
+
+    async def generate_content_async(self, prompt: str, stream: bool = False, **kwargs):
+        await self.behaviour.simulate_async()
+        if stream:
+            return _MockGeminiStream(self._response(prompt))
+        return self._response(prompt)
+
+    def _response(self, prompt: str):
+        text = _mock_text(prompt)
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=len(prompt) // 4,
+                candidates_token_count=len(text) // 4,
+            ),
+        )
+
+
+class _MockGeminiStream:
+    """Async-iterable streamed response; usage is available on the response itself."""
+
+    def __init__(self, response):
+        self.usage_metadata = response.usage_metadata
+        self._chunks = [SimpleNamespace(text=word) for word in _words(response.text)]
+
+    def __aiter__(self):
+        return _aiter(self._chunks)
+
+
+def install_mock_provider(providers, settings, provider: str, latency: LatencyDistribution,
+                          error_rate: float = 0.0, seed: Optional[int] = None):
+    """
+    Point a service's provider layer (`textgen_common.providers.providers`) at a mock client.
+
+    Returns the mock so callers can inspect call counts.
+    """
+    settings.ai_provider = provider
+    providers._initialized = True
+    providers.openai_client = providers.groq_client = providers.gemini_model = None
+    providers.gemini_factory = None
+    providers._gemini_models.clear()
+
+    if provider == "gemini":
+        mock = MockGeminiModel(latency, error_rate, seed)
+        providers.gemini_model = mock
+        # Every system prompt gets the same mock
+        providers.gemini_factory = lambda model_name, system_instruction=None: mock
+    else:
+        mock = MockOpenAIClient(latency, error_rate, seed)
+        if provider == "groq":
+            providers.groq_client = mock
+        else:
+            providers.openai_client = mock
+    return mock
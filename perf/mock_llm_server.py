@@ -0,0 +1,339 @@
+"""
+Local mock LLM provider server.
+
+Speaks the OpenAI chat completions API (also used for Groq) and the Gemini
+REST `generateContent` / `streamGenerateContent` API, with configurable
+per-route latency, token-by-token streaming, 429/5xx/timeout injection and
+recorded-response playback. Point the services at it with:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1
+    GROQ_BASE_URL=http://127.0.0.1:8100/v1
+    GEMINI_BASE_URL=http://127.0.0.1:8100
+
+Usage (from the repository root):
+    python -m perf.mock_llm_server --port 8100 --latency lognormal:0.6:0.4 \\
+        --token-latency fixed:0.01 --rate-429 0.02 --rate-5xx 0.01
+    python -m perf.mock_llm_server --config perf/mock_llm_config.example.json
+
+Runtime control:
+    GET  /_mock/stats            call and fault counters
+    POST /_mock/config           replace route config (same shape as the config file)
+"""
+import argparse
+import asyncio
+import copy
+import json
+import random
+import re
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from perf.mock_llm import LatencyDistribution, _mock_text
+
+DEFAULT_ROUTE_CONFIG = {
+    "latency": "fixed:0.2",          # time to first token / full response
+    "token_latency": "fixed:0.0",    # delay between streamed tokens
+    "faults": {"429": 0.0, "500": 0.0, "503": 0.0, "timeout": 0.0},
+}
+
+DEFAULT_CONFIG = {
+    "routes": {
+        "chat": copy.deepcopy(DEFAULT_ROUTE_CONFIG),
+        "gemini": copy.deepcopy(DEFAULT_ROUTE_CONFIG),
+    },
+    "timeout_seconds": 120.0,
+    "retry_after_seconds": 1,
+    "playback": None,
+    "seed": None,
+}
+
+
+class Playback:
+    """
+    Recorded responses loaded from JSONL.
+
+    Each line is `{"match": "<regex>", "response": "<text>"}`; the first
+    pattern found in the prompt wins.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.entries: List[tuple] = []
+        if path:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        record = json.loads(line)
+                        self.entries.append((re.compile(record["match"], re.IGNORECASE), record["response"]))
+
+    def lookup(self, prompt: str) -> Optional[str]:
+        for pattern, response in self.entries:
+            if pattern.search(prompt):
+                return response
+        return None
+
+
+class MockState:
+    """Mutable server configuration and counters."""
+
+    def __init__(self, config: dict):
+        self.stats: Dict[str, int] = {}
+        self.configure(config)
+
+    def configure(self, config: dict) -> None:
+        merged = copy.deepcopy(DEFAULT_CONFIG)
+        for key, value in config.items():
+            if key == "routes":
+                for route, route_config in value.items():
+                    target = merged["routes"].setdefault(route, copy.deepcopy(DEFAULT_ROUTE_CONFIG))
+                    target.update({k: v for k, v in route_config.items() if k != "faults"})
+                    target["faults"].update(route_config.get("faults", {}))
+            else:
+                merged[key] = value
+
+        self.config = merged
+        self.rng = random.Random(merged["seed"])
+        self.playback = Playback(merged["playback"])
+        self.latency = {
+            route: (
+                LatencyDistribution(rc["latency"], seed=merged["seed"]),
+                LatencyDistribution(rc["token_latency"], seed=merged["seed"]),
+            )
+            for route, rc in merged["routes"].items()
+        }
+
+    def count(self, key: str) -> None:
+        self.stats[key] = self.stats.get(key, 0) + 1
+
+    def pick_fault(self, route: str) -> Optional[str]:
+        roll = self.rng.random()
+        cumulative = 0.0
+        for fault, rate in self.config["routes"][route]["faults"].items():
+            cumulative += rate
+            if roll < cumulative:
+                return fault
+        return None
+
+
+state = MockState({})
+app = FastAPI(title="Mock LLM Provider", docs_url=None, redoc_url=None)
+
+
+def _tokens(text: str) -> List[str]:
+    """Split text into word-ish tokens that re-join to the original."""
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+async def _apply_fault(route: str, error_shape: str) -> Optional[JSONResponse]:
+    """Inject a configured fault, returning an error response if one fires."""
+    fault = state.pick_fault(route)
+    if fault is None:
+        return None
+
+    state.count(f"{route}.fault.{fault}")
+    if fault == "timeout":
+        # Hold the connection past any sane client timeout
+        await asyncio.sleep(state.config["timeout_seconds"])
+        return JSONResponse(status_code=504, content={"error": {"message": "Mock timeout"}})
+
+    status = int(fault)
+    headers = {"Retry-After": str(state.config["retry_after_seconds"])} if status == 429 else None
+    if error_shape == "openai":
+        body = {"error": {"message": f"Mock error {status}", "type": "mock_error", "code": status}}
+    else:
+        body = {"error": {"code": status, "message": f"Mock error {status}", "status": "UNAVAILABLE"}}
+    return JSONResponse(status_code=status, content=body, headers=headers)
+
+
+def _response_text(prompt: str) -> str:
+    return state.playback.lookup(prompt) or _mock_text(prompt)
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    """OpenAI/Groq-compatible chat completions, streaming or not."""
+    body = await request.json()
+    state.count("chat.requests")
+
+    error = await _apply_fault("chat", "openai")
+    if error is not None:
+        return error
+
+    first_token, per_token = state.latency["chat"]
+    prompt = body["messages"][-1]["content"] if body.get("messages") else ""
+    text = _response_text(prompt)
+    model = body.get("model", "mock-model")
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+    usage = {
+        "prompt_tokens": _count_tokens(prompt),
+        "completion_tokens": _count_tokens(text),
+        "total_tokens": _count_tokens(prompt) + _count_tokens(text),
+    }
+
+    await asyncio.sleep(first_token.sample())
+
+    if not body.get("stream"):
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        }
+
+    async def events():
+        def chunk(delta: dict, finish_reason=None, extra=None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            if extra:
+                payload.update(extra)
+            return f"data: {json.dumps(payload)}\n\n"
+
+        yield chunk({"role": "assistant", "content": ""})
+        for token in _tokens(text):
+            await asyncio.sleep(per_token.sample())
+            yield chunk({"content": token})
+        include_usage = (body.get("stream_options") or {}).get("include_usage")
+        yield chunk({}, "stop", {"usage": usage} if include_usage else None)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/v1beta/models/{model_action}")
+async def gemini_generate(model_action: str, request: Request):
+    """Gemini REST `models/{model}:generateContent` and `:streamGenerateContent`."""
+    model, _, action = model_action.partition(":")
+    body = await request.json()
+    state.count("gemini.requests")
+
+    error = await _apply_fault("gemini", "gemini")
+    if error is not None:
+        return error
+
+    first_token, per_token = state.latency["gemini"]
+    prompt = " ".join(
+        part.get("text", "")
+        for content in body.get("contents", [])
+        for part in content.get("parts", [])
+    )
+    text = _response_text(prompt)
+
+    def payload(chunk_text: str, finished: bool) -> dict:
+        return {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": chunk_text}]},
+                "finishReason": "STOP" if finished else None,
+                "index": 0,
+            }],
+            "usageMetadata": {
+                "promptTokenCount": _count_tokens(prompt),
+                "candidatesTokenCount": _count_tokens(text),
+                "totalTokenCount": _count_tokens(prompt) + _count_tokens(text),
+            },
+            "modelVersion": model,
+        }
+
+    await asyncio.sleep(first_token.sample())
+
+    if action != "streamGenerateContent":
+        return payload(text, True)
+
+    async def events():
+        tokens = _tokens(text)
+        for i, token in enumerate(tokens):
+            await asyncio.sleep(per_token.sample())
+            yield f"data: {json.dumps(payload(token, i == len(tokens) - 1))}\r\n\r\n"
+
+    # The SDK asks for `alt=sse`; anything else gets a JSON array
+    if request.query_params.get("alt") == "sse":
+        return StreamingResponse(events(), media_type="text/event-stream")
+    return [payload(token, False) for token in _tokens(text)]
+
+
+@app.get("/_mock/stats")
+async def mock_stats():
+    return {"stats": state.stats, "config": state.config}
+
+
+@app.post("/_mock/config")
+async def mock_config(request: Request):
+    state.configure(await request.json())
+    state.stats.clear()
+    return {"config": state.config}
+
+
+def build_config(args) -> dict:
+    """Combine the optional config file with command-line overrides."""
+    config: dict = {}
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            config = json.load(f)
+
+    overrides = {}
+    if args.latency:
+        overrides["latency"] = args.latency
+    if args.token_latency:
+        overrides["token_latency"] = args.token_latency
+    faults = {
+        key: value for key, value in {
+            "429": args.rate_429, "500": args.rate_5xx, "timeout": args.rate_timeout,
+        }.items() if value is not None
+    }
+    if faults:
+        overrides["faults"] = faults
+    if overrides:
+        routes = config.setdefault("routes", {})
+        for route in ("chat", "gemini"):
+            route_config = routes.setdefault(route, {})
+            route_config.update({k: v for k, v in overrides.items() if k != "faults"})
+            route_config.setdefault("faults", {}).update(overrides.get("faults", {}))
+
+    if args.playback:
+        config["playback"] = args.playback
+    if args.seed is not None:
+        config["seed"] = args.seed
+    return config
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Groq/Gemini provider")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--config", help="JSON config file (see mock_llm_config.example.json)")
+    parser.add_argument("--latency", help="Latency to first token for all routes, e.g. lognormal:0.6:0.4")
+    parser.add_argument("--token-latency", help="Delay between streamed tokens, e.g. fixed:0.01")
+    parser.add_argument("--rate-429", type=float, help="Fraction of calls answered with 429")
+    parser.add_argument("--rate-5xx", type=float, help="Fraction of calls answered with 500")
+    parser.add_argument("--rate-timeout", type=float, help="Fraction of calls that hang until timeout_seconds")
+    parser.add_argument("--playback", help="JSONL file of recorded responses")
+    parser.add_argument("--seed", type=int, help="Seed for latency and fault sampling")
+    args = parser.parse_args(argv)
+
+    state.configure(build_config(args))
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
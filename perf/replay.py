@@ -0,0 +1,249 @@
+"""
+Replay captured production traffic against a service.
+
+Reads the JSONL files written by the services' opt-in capture (CAPTURE_DIR)
+and re-issues each request against a target: a running service, or the
+service loaded in-process with the mock provider from `perf.mock_llm`
+(`--target mock`). The report compares the replay with the capture per
+endpoint: latency percentiles, throughput and error rate.
+
+Usage (from the repository root):
+    python -m perf.replay captures/ --target http://127.0.0.1:8002
+    python -m perf.replay captures/ --service comments --target mock --speed 4
+    python -m perf.replay captures/*.jsonl.gz --target http://127.0.0.1:8000 --speed 0 --concurrency 32
+
+--speed scales the captured inter-arrival times: 1 keeps the original
+timing, 4 sends the same sequence four times as fast, 0 sends as fast as
+--concurrency clients can. With timed replay, latency is measured from
+the request's due time, so client-side queueing behind --concurrency shows
+up as latency instead of silently slowing the arrival rate.
+
+Captured durations are measured inside the service, replayed ones at the
+client, so a remote target's numbers include the network.
+"""
+import argparse
+import asyncio
+import contextlib
+import glob
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import zlib
+from typing import Iterator, List, Optional, Tuple
+
+from perf.loadtest import summarize
+
+SERVICE_NAMES = {
+    "text-generation-api": "api",
+    "text-generation-comments": "comments",
+}
+
+Sample = Tuple[str, float, bool]
+
+
+def _iter_lines(path: str) -> Iterator[str]:
+    """Lines of a .jsonl or .jsonl.gz file; a file still being written ends at its last flush."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                yield line
+        except (EOFError, zlib.error, gzip.BadGzipFile):
+            return
+
+
+def load_records(paths: List[str], service: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+    """Captured records from files and directories, oldest first."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, "*.jsonl.gz")) + glob.glob(os.path.join(path, "*.jsonl")))
+        else:
+            files.append(path)
+
+    records = []
+    for path in sorted(files):
+        for line in _iter_lines(path):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash
+            if service and SERVICE_NAMES.get(record.get("service"), record.get("service")) != service:
+                continue
+            if record.get("body_truncated"):
+                continue  # the body was too large to keep, so it cannot be re-sent
+            records.append(record)
+    records.sort(key=lambda r: r["ts"])
+    return records[:limit] if limit else records
+
+
+def endpoint(record: dict) -> str:
+    return f"{record['method']} {record['path']}"
+
+
+def captured_samples(records: List[dict]) -> Tuple[List[Sample], float]:
+    """(endpoint, latency, ok) samples as captured, and the captured time span."""
+    samples = [
+        (endpoint(r), r["duration_ms"] / 1000, r["status"] < 400 and r.get("outcome") != "error")
+        for r in records
+    ]
+    span = records[-1]["ts"] + records[-1]["duration_ms"] / 1000 - records[0]["ts"] if records else 0.0
+    return samples, span
+
+
+async def replay(client, records: List[dict], speed: float, concurrency: int) -> Tuple[List[Sample], float]:
+    """Re-issue the records and return (endpoint, latency, ok) samples and the elapsed time."""
+    slots = asyncio.Semaphore(concurrency)
+    results: List[Sample] = []
+
+    async def issue(record: dict, due: float) -> None:
+        async with slots:
+            if not speed:
+                due = time.perf_counter()
+            url = record["path"] + (f"?{record['query']}" if record.get("query") else "")
+            try:
+                if "body" in record:
+                    content = json.dumps(record["body"]).encode("utf-8")
+                else:
+                    content = record.get("body_text", "").encode("utf-8")
+                response = await client.request(
+                    record["method"], url, content=content or None, headers=record.get("headers", {})
+                )
+                ok = response.status_code < 400
+                if ok and response.headers.get("content-type", "").startswith("application/json"):
+                    body = response.json()
+                    ok = not isinstance(body, dict) or body.get("success", True) is not False
+            except Exception:
+                ok = False
+            results.append((endpoint(record), time.perf_counter() - due, ok))
+
+    start = time.perf_counter()
+    first = records[0]["ts"]
+    tasks = []
+    for record in records:
+        due = start + (record["ts"] - first) / speed if speed else start
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(issue(record, due)))
+    await asyncio.gather(*tasks)
+    return results, time.perf_counter() - start
+
+
+def compare(captured: dict, replayed: dict) -> dict:
+    """Per-endpoint captured vs replayed numbers and relative differences."""
+    diff = {}
+    for name in replayed:
+        before, after = captured.get(name), replayed[name]
+        row = {"captured": before, "replayed": after}
+        if before:
+            for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+                row[f"{key}_change"] = (after[key] - before[key]) / before[key] if before[key] else None
+        diff[name] = row
+    return diff
+
+
+def print_diff(diff: dict, elapsed: float, span: float) -> None:
+    print(f"\n=== replay: {diff['ALL']['replayed']['requests']} requests in {elapsed:.2f}s "
+          f"(captured over {span:.2f}s) ===")
+    header = f"{'endpoint':<40}{'reqs':>7}{'p50 ms':>18}{'p95 ms':>18}{'rps':>18}{'err %':>16}"
+    print(header)
+    print(f"{'':<47}" + "".join(f"{'capt -> replay':>{width}}" for width in (18, 18, 18, 16)))
+    print("-" * len(header))
+    for name, row in diff.items():
+        before, after = row["captured"] or {}, row["replayed"]
+
+        def pair(key: str, scale: float = 1.0, fmt: str = ".1f") -> str:
+            return f"{before.get(key, 0) * scale:{fmt}} -> {after[key] * scale:{fmt}}"
+
+        print(
+            f"{name:<40}{after['requests']:>7}{pair('p50_ms'):>18}{pair('p95_ms'):>18}"
+            f"{pair('throughput_rps'):>18}{pair('error_rate', 100):>16}"
+        )
+
+
+def _client(args):
+    """httpx client for the target; `mock` loads the service in-process."""
+    import httpx
+
+    if args.target != "mock":
+        return httpx.AsyncClient(base_url=args.target, timeout=args.timeout), None
+
+    from perf.loadtest import load_service
+    from perf.mock_llm import LatencyDistribution, install_mock_provider
+
+    os.environ["CAPTURE_DIR"] = ""  # do not capture the replay itself
+    tmp = tempfile.TemporaryDirectory()
+    app, settings, providers = load_service(args.service, os.path.join(tmp.name, "replay.db"))
+    install_mock_provider(
+        providers, settings, args.provider,
+        LatencyDistribution(args.latency, seed=args.seed), seed=args.seed,
+    )
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=args.timeout), tmp
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Replay captured traffic against a Krion AI service")
+    parser.add_argument("paths", nargs="+", help="Capture files or directories")
+    parser.add_argument("--target", required=True, help="Base URL of a running service, or 'mock'")
+    parser.add_argument("--service", choices=["api", "comments"], default=None,
+                        help="Only replay this service's records (required with --target mock)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Inter-arrival scale: 1 original, 2 twice as fast, 0 as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=64, help="Maximum requests in flight")
+    parser.add_argument("--limit", type=int, default=None, help="Replay only the first N records")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--latency", default="lognormal:0.5:0.4", help="Mock LLM latency distribution spec")
+    parser.add_argument("--provider", choices=["openai", "groq", "gemini"], default="groq")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--json", dest="json_path", default=None, help="Write the comparison as JSON")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.target == "mock" and not args.service:
+        print("--target mock needs --service", file=sys.stderr)
+        return 2
+    records = load_records(args.paths, args.service, args.limit)
+    if not records:
+        print("No replayable records found", file=sys.stderr)
+        return 1
+
+    client, tmp = _client(args)
+
+    async def run():
+        async with client:
+            return await replay(client, records, args.speed, args.concurrency)
+
+    try:
+        # Keep service output out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            results, elapsed = asyncio.run(run())
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    samples, span = captured_samples(records)
+    diff = compare(summarize(samples, span), summarize(results, elapsed))
+    print_diff(diff, elapsed, span)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "target": args.target, "service": args.service, "speed": args.speed,
+                "concurrency": args.concurrency, "records": len(records),
+                "captured_span_s": span, "elapsed_s": elapsed, "endpoints": diff,
+            }, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
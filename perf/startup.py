@@ -0,0 +1,227 @@
+"""
+Import-time report and cold-start budget for both services.
+
+Usage (from the repository root):
+    python -m perf.startup imports --service comments          # per-module import cost
+    python -m perf.startup imports --budget-ms 900              # exit 1 if `app.main` is slower
+    python -m perf.startup coldstart --budget-ms 2500           # spawn uvicorn, time first 200
+    python -m perf.startup coldstart --budget-ms 0              # report only, no budget
+    python -m perf.startup coldstart --service comments --path /api/v1/rephrase \\
+        --body '{"input": "rebar spacing wrong", "status": "reject"}'
+
+Every measurement runs in a fresh interpreter, so nothing is already
+imported or cached in memory.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICES = ("api", "comments")
+SERVICE_DIRS = {
+    "api": os.path.join(REPO_ROOT, "text-generation-api"),
+    "comments": os.path.join(REPO_ROOT, "text-generation-comments"),
+}
+HEALTH_PATHS = {
+    "api": "/api/v1/health",
+    "comments": "/api/v1/rephrase-health",
+}
+
+# Roughly 1.5x what both services measure on a developer laptop
+DEFAULT_IMPORT_BUDGET_MS = 600.0
+DEFAULT_COLDSTART_BUDGET_MS = 1500.0
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _service_env(service: str, workdir: str) -> Dict[str, str]:
+    """Environment for a service child process that never touches tracked files."""
+    env = dict(os.environ)
+    env.setdefault("LOG_LEVEL", "WARNING")
+    if service == "comments":
+        db_path = os.path.join(workdir, "comments.db")
+        shutil.copyfile(os.path.join(SERVICE_DIRS["comments"], "comments.db"), db_path)
+        env["COMMENTS_DB_PATH"] = db_path
+    return env
+
+
+def import_times(service: str) -> List[dict]:
+    """Run `python -X importtime -c 'import app.main'` and parse its report."""
+    with tempfile.TemporaryDirectory() as workdir:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import app.main"],
+            cwd=SERVICE_DIRS[service],
+            env=_service_env(service, workdir),
+            capture_output=True,
+            text=True,
+        )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {service} app.main failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append({
+                "module": module,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                "depth": len(indent) // 2,
+            })
+    return rows
+
+
+def summarize_imports(rows: List[dict], top: int) -> dict:
+    """Total cost, self time per top-level package and the slowest `app.*`/`textgen_common.*` modules."""
+    by_package: Dict[str, float] = {}
+    for row in rows:
+        package = row["module"].split(".")[0]
+        by_package[package] = by_package.get(package, 0.0) + row["self_ms"]
+
+    app_modules = [
+        row for row in rows
+        if row["module"].split(".")[0] in ("app", "textgen_common")
+    ]
+    total = next((row["cumulative_ms"] for row in rows if row["module"] == "app.main"), 0.0)
+    return {
+        "total_ms": round(total, 3),
+        "packages": dict(sorted(by_package.items(), key=lambda kv: -kv[1])[:top]),
+        "app_modules": {
+            row["module"]: row["cumulative_ms"]
+            for row in sorted(app_modules, key=lambda r: -r["cumulative_ms"])[:top]
+        },
+    }
+
+
+def print_imports(service: str, summary: dict) -> None:
+    print(f"\n=== {service}: import app.main {summary['total_ms']:.1f} ms ===")
+    print("Self time by top-level package:")
+    for name, ms in summary["packages"].items():
+        print(f"  {name:<40}{ms:>9.1f} ms")
+    print("Cumulative time of app modules:")
+    for name, ms in summary["app_modules"].items():
+        print(f"  {name:<40}{ms:>9.1f} ms")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def cold_start(service: str, path: str, body: Optional[str], timeout: float) -> float:
+    """
+    Spawn uvicorn and return seconds from process start to the first
+    successful response on `path`.
+    """
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    data = body.encode() if body is not None else None
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+             "--port", str(port), "--log-level", "warning"],
+            cwd=SERVICE_DIRS[service],
+            env=_service_env(service, workdir),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        try:
+            while True:
+                elapsed = time.perf_counter() - start
+                if elapsed > timeout:
+                    raise RuntimeError(f"{service} did not answer {path} within {timeout:.0f}s")
+                if proc.poll() is not None:
+                    raise RuntimeError(f"{service} exited during startup:\n{proc.stderr.read().decode()[-2000:]}")
+                try:
+                    request = urllib.request.Request(url, data=data, headers=headers)
+                    with urllib.request.urlopen(request, timeout=timeout) as response:
+                        response.read()
+                    return time.perf_counter() - start
+                except urllib.error.HTTPError as exc:
+                    raise RuntimeError(f"{path} answered {exc.code}") from exc
+                except (urllib.error.URLError, ConnectionError):
+                    time.sleep(0.005)
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Import-time report and cold-start budget")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("imports", help="Per-module import cost of app.main")
+    p.add_argument("--service", choices=[*SERVICES, "both"], default="both")
+    p.add_argument("--top", type=int, default=15)
+    p.add_argument("--budget-ms", type=float, default=DEFAULT_IMPORT_BUDGET_MS,
+                   help="Fail if importing app.main takes longer")
+    p.add_argument("--json", default=None, help="Also write the summary to this file")
+
+    p = sub.add_parser("coldstart", help="Process start to first successful response")
+    p.add_argument("--service", choices=[*SERVICES, "both"], default="both")
+    p.add_argument("--path", default=None, help="Request path (default: the service health endpoint)")
+    p.add_argument("--body", default=None, help="JSON body; sends a POST instead of a GET")
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--timeout", type=float, default=60.0)
+    p.add_argument("--budget-ms", type=float, default=DEFAULT_COLDSTART_BUDGET_MS,
+                   help="Fail if the median cold start is slower")
+    p.add_argument("--json", default=None, help="Also write the results to this file")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    services = SERVICES if args.service == "both" else (args.service,)
+    report = {}
+    over_budget = []
+
+    for service in services:
+        if args.command == "imports":
+            summary = summarize_imports(import_times(service), args.top)
+            print_imports(service, summary)
+            report[service] = summary
+            measured = summary["total_ms"]
+        else:
+            path = args.path or HEALTH_PATHS[service]
+            samples = [cold_start(service, path, args.body, args.timeout) * 1000 for _ in range(args.runs)]
+            measured = statistics.median(samples)
+            print(
+                f"{service}: first response on {path} after {measured:.0f} ms median "
+                f"(min {min(samples):.0f}, max {max(samples):.0f}, runs {args.runs})"
+            )
+            report[service] = {"path": path, "median_ms": measured, "samples_ms": samples}
+
+        if args.budget_ms and measured > args.budget_ms:
+            over_budget.append(f"{service} {measured:.0f} ms > {args.budget_ms:.0f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if over_budget:
+        print(f"\nOver budget: {'; '.join(over_budget)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,10 +3,15 @@ Configuration settings for the Text Generation API.
 Uses simple environment variables for maximum compatibility.
 """
 import os
+import tempfile
 from dotenv import load_dotenv
 
+from textgen_common import configure
+
 load_dotenv()
 
+SERVICE_NAME = "text-generation-api"
+
 
 class Settings:
     """Application settings loaded from environment variables."""
@@ -18,15 +23,96 @@ class Settings:
         self.gemini_api_key = os.getenv("GEMINI_API_KEY", "")
         self.groq_api_key = os.getenv("GROQ_API_KEY", "")
         
+        # Provider endpoints (override to point at a local mock provider)
+        self.openai_base_url = os.getenv("OPENAI_BASE_URL") or None
+        self.groq_base_url = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+        self.gemini_base_url = os.getenv("GEMINI_BASE_URL") or None
+        
         # Generation Settings
         self.default_generation_mode = os.getenv("DEFAULT_GENERATION_MODE", "template")
         self.max_description_length = int(os.getenv("MAX_DESCRIPTION_LENGTH", "500"))
         
-        # OpenAI Model Settings
+        # Model Settings (the model each provider is called with, in both services)
         self.openai_model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+        self.groq_model = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+        self.gemini_model = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+        
+        # Provider Call Settings (per-attempt timeout; timeouts, connection errors, 429
+        # and 5xx answers are retried with jittered exponential backoff until output
+        # has been received; HTTP connections kept per worker for the provider)
+        self.provider_timeout_seconds = float(os.getenv("PROVIDER_TIMEOUT_SECONDS", "30"))
+        self.provider_max_retries = int(os.getenv("PROVIDER_MAX_RETRIES", "2"))
+        self.provider_retry_backoff_seconds = float(os.getenv("PROVIDER_RETRY_BACKOFF_SECONDS", "0.25"))
+        self.provider_max_connections = int(os.getenv("PROVIDER_MAX_CONNECTIONS", "32"))
+        
+        # Logging Settings (LOG_LEVELS: per-module overrides, e.g. "app.services=DEBUG")
+        self.log_level = os.getenv("LOG_LEVEL", "INFO")
+        self.log_levels = os.getenv("LOG_LEVELS", "")
+        self.log_format = os.getenv("LOG_FORMAT", "json")
+        self.log_rate_limit_count = int(os.getenv("LOG_RATE_LIMIT_COUNT", "5"))
+        self.log_rate_limit_window = float(os.getenv("LOG_RATE_LIMIT_WINDOW", "60"))
+        
+        # Profiling Settings (admin token enables on-demand profiling)
+        self.profiling_admin_token = os.getenv("PROFILING_ADMIN_TOKEN", "")
+        self.profiling_sample_rate = int(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+        self.profiling_output_dir = os.getenv("PROFILING_OUTPUT_DIR", "profiles")
+        self.profiling_interval_ms = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+        self.profiling_max_artifacts = int(os.getenv("PROFILING_MAX_ARTIFACTS", "200"))
+        
+        # Tracing Settings (spans are exported to a local JSONL file)
+        self.tracing_enabled = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+        self.tracing_sample_rate = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+        self.tracing_export_path = os.getenv("TRACING_EXPORT_PATH", "traces/spans.jsonl")
+        
+        # Scheduler Settings (provider call admission: SCHEDULER_MAX_IN_FLIGHT calls per
+        # provider on the box; each worker process enforces its own share, so the default
+        # per-worker cap is that divided by WEB_CONCURRENCY, and
+        # SCHEDULER_MAX_IN_FLIGHT_PER_WORKER sets the share directly. Weighted fair
+        # share and queue limit per priority class; a class left out of
+        # SCHEDULER_QUEUE_LIMITS keeps its default limit)
+        self.scheduler_max_in_flight = int(os.getenv("SCHEDULER_MAX_IN_FLIGHT", "32"))
+        self.scheduler_max_in_flight_per_worker = int(os.getenv(
+            "SCHEDULER_MAX_IN_FLIGHT_PER_WORKER",
+            max(1, self.scheduler_max_in_flight // int(os.getenv("WEB_CONCURRENCY", "1"))),
+        ))
+        self.scheduler_weights = os.getenv("SCHEDULER_WEIGHTS", "interactive=8,batch=2,background=1")
+        self.scheduler_queue_limits = os.getenv("SCHEDULER_QUEUE_LIMITS", "interactive=64,batch=256,background=1024")
+        
+        # Load Shedding Settings (serve the template instead of queueing for AI
+        # once the estimated provider wait exceeds this many seconds; 0 disables)
+        self.shed_ai_wait_seconds = float(os.getenv("SHED_AI_WAIT_SECONDS", "5"))
+        
+        # Response Settings (FAST_SERIALIZATION sends handler-built models without
+        # FastAPI re-validating them; bodies of COMPRESSION_MIN_BYTES or more are
+        # br/gzip compressed when the client accepts it, 0 disables)
+        self.fast_serialization = os.getenv("FAST_SERIALIZATION", "true").lower() == "true"
+        self.compression_min_bytes = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+        
+        # Capture Settings (opt-in: a sample of /api/ requests is written, sanitized,
+        # to rotating gzip JSONL files in CAPTURE_DIR for perf.replay; empty disables.
+        # CAPTURE_MAX_BYTES is uncompressed JSON per file, CAPTURE_BACKUPS files per worker)
+        self.capture_dir = os.getenv("CAPTURE_DIR", "")
+        self.capture_sample_rate = float(os.getenv("CAPTURE_SAMPLE_RATE", "1.0"))
+        self.capture_max_bytes = int(os.getenv("CAPTURE_MAX_BYTES", str(64 * 1024 * 1024)))
+        self.capture_backups = int(os.getenv("CAPTURE_BACKUPS", "5"))
+        
+        # Idempotency Settings (a response to a request with an Idempotency-Key header is
+        # replayed to retries for IDEMPOTENCY_TTL_SECONDS; a duplicate of a request still
+        # running waits up to IDEMPOTENCY_WAIT_SECONDS for it; a worker that dies holds
+        # the key for at most IDEMPOTENCY_LOCK_SECONDS)
+        self.idempotency_ttl_seconds = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+        self.idempotency_wait_seconds = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "60"))
+        self.idempotency_lock_seconds = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "120"))
+        
+        # Shared Store Settings (box-local cache shared by all workers; tmpfs when available)
+        self.shared_store_path = os.getenv("SHARED_STORE_PATH") or os.path.join(
+            "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+            "text-generation-api-shared.sqlite3",
+        )
         
-        # Gemini Model Settings
-        self.gemini_model = os.getenv("GEMINI_MODEL", "gemini-pro")
+        # Startup Settings (load provider SDK and other lazy state in the background after startup)
+        self.warmup_on_startup = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
 
 
 settings = Settings()
+configure(settings, SERVICE_NAME)
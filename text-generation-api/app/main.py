@@ -3,8 +3,18 @@ FastAPI application entry point for Text Generation API.
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.config import SERVICE_NAME, settings
 from app.routers import generation
-from app.config import settings
+from textgen_common.compression import CompressionMiddleware
+from textgen_common.metrics import metrics_middleware, router as metrics_router
+from textgen_common.profiling import profiling_middleware, router as profiling_router
+from textgen_common.tracing import setup_tracing, tracing_middleware
+from textgen_common.logging_config import request_logging_middleware, setup_logging
+from textgen_common.serialization import FastJSONResponse
+from app.warmup import lifespan
+
+setup_logging()
+setup_tracing()
 
 # Create FastAPI app
 app = FastAPI(
@@ -25,7 +35,9 @@ app = FastAPI(
     """,
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -37,8 +49,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in traffic capture, inside compression and access logging: it sees plain
+# bodies and the outcome the handlers put in the access log context
+if settings.capture_dir:
+    from textgen_common.capture import CaptureMiddleware, CaptureWriter
+
+    app.add_middleware(
+        CaptureMiddleware,
+        writer=CaptureWriter(settings.capture_dir, SERVICE_NAME, settings.capture_max_bytes, settings.capture_backups),
+        sample_rate=settings.capture_sample_rate,
+    )
+
+# br/gzip for large responses; inside the metrics and logging middlewares, so they see its cost
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_bytes)
+
+# Request latency metrics, opt-in profiling, tracing and access logging (last added runs first)
+app.middleware("http")(profiling_middleware)
+app.middleware("http")(metrics_middleware)
+app.middleware("http")(tracing_middleware)
+app.middleware("http")(request_logging_middleware)
+
 # Include routers
 app.include_router(generation.router)
+app.include_router(metrics_router)
+app.include_router(profiling_router)
 
 
 @app.get("/")
@@ -96,6 +96,10 @@ class GenerationResponse(BaseModel):
     generated_description: str = Field(..., description="The generated description")
     generation_mode: str = Field(..., description="Mode used for generation")
     editable: bool = Field(default=True, description="Whether user can edit the description")
+    degraded: bool = Field(
+        default=False,
+        description="True when AI was requested but overload forced template output"
+    )
     error: Optional[str] = Field(None, description="Error message if generation failed")
     
     class Config:
@@ -1,23 +1,39 @@
 """
 API routes for description generation.
 """
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from textgen_common.cancellation import CLIENT_CLOSED_REQUEST, ClientDisconnected, run_cancellable
+from textgen_common.idempotency import IdempotencyError, idempotency_keys
 from app.models.schemas import GenerationRequest, GenerationResponse
+from textgen_common.scheduler import PriorityClass
+from textgen_common.serialization import model_response
+from app.services.ai_generator import PIPELINE
 from app.services.generator import description_generator
 
 router = APIRouter(prefix="/api/v1", tags=["Generation"])
 
 
 @router.post("/generate-description", response_model=GenerationResponse)
-async def generate_description(request: GenerationRequest) -> GenerationResponse:
+async def generate_description(
+    request: GenerationRequest,
+    http_request: Request,
+    priority_class: PriorityClass = Header(PriorityClass.INTERACTIVE, alias="X-Priority-Class"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+) -> GenerationResponse:
     """
     Generate a description for the specified entity based on provided fields.
     
     - **entity_type**: Type of entity (issue, review, rfa)
     - **generation_mode**: Method to use (template or ai)
     - **fields**: Dictionary of field values for the entity
+    - **X-Priority-Class** header: interactive (default), batch or background;
+      bulk and background jobs should set it so they queue behind users
+    - **Idempotency-Key** header: retries with the same key get the first
+      response (`Idempotent-Replayed: true`) instead of a new AI call
     
-    Returns a generated description that the user can edit.
+    Returns a generated description that the user can edit. If the client
+    disconnects first, the work (including the provider call) is cancelled.
     """
     try:
         # Validate entity type
@@ -28,30 +44,44 @@ async def generate_description(request: GenerationRequest) -> GenerationResponse
                 detail=f"Invalid entity_type. Must be one of: {valid_types}"
             )
         
-        # Generate description
-        description, mode_used = await description_generator.generate(
-            entity_type=request.entity_type.value,
-            generation_mode=request.generation_mode,
-            fields=request.fields
-        )
+        async def generate() -> GenerationResponse:
+            description, mode_used = await description_generator.generate(
+                entity_type=request.entity_type.value,
+                generation_mode=request.generation_mode,
+                fields=request.fields,
+                priority_class=priority_class
+            )
+            return GenerationResponse(
+                success=True,
+                generated_description=description,
+                generation_mode=mode_used,
+                editable=True,
+                degraded=request.generation_mode.value != mode_used
+            )
         
-        return GenerationResponse(
-            success=True,
-            generated_description=description,
-            generation_mode=mode_used,
-            editable=True
+        # Generate description, once per idempotency key
+        result = await run_cancellable(
+            http_request,
+            PIPELINE,
+            idempotency_keys.run(PIPELINE, idempotency_key, request, generate, GenerationResponse)
         )
         
+        return result.response()
+        
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except IdempotencyError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        return GenerationResponse(
+        return model_response(GenerationResponse(
             success=False,
             generated_description="",
             generation_mode=request.generation_mode.value,
             editable=True,
             error=str(e)
-        )
+        ))
 
 
 @router.get("/health")
@@ -3,63 +3,24 @@ AI-powered description generator.
 Supports OpenAI, Groq, and Google Gemini - NO FALLBACK for testing.
 """
 from typing import Dict, Any
-import asyncio
+import logging
 from app.config import settings
 from app.services.template_generator import template_generator
+from textgen_common.metrics import PROVIDER_FALLBACKS, stage_timer
+from textgen_common.logging_config import set_log_context
+from textgen_common.providers import providers
+from textgen_common.scheduler import OverloadedError, PriorityClass, QueueFullError, scheduler
+
+PIPELINE = "ai_generation"
+SYSTEM_PROMPT = "You are a professional technical writer."
+MAX_TOKENS = 200
+
+logger = logging.getLogger(__name__)
 
 
 class AIGenerator:
     """Generates descriptions using AI (OpenAI, Groq, or Gemini)."""
     
-    def __init__(self):
-        """Initialize AI clients based on configuration."""
-        self.openai_client = None
-        self.groq_client = None
-        self.gemini_model = None
-        self._initialized = False
-    
-    def _initialize_clients(self):
-        """Initialize AI provider clients (lazy initialization)."""
-        if self._initialized:
-            return
-        
-        self._initialized = True
-        
-        print(f"🔧 AI Provider from .env: '{settings.ai_provider}'")
-        print(f"🔧 Groq Key present: {bool(settings.groq_api_key)}")
-        print(f"🔧 OpenAI Key present: {bool(settings.openai_api_key)}")
-        
-        if settings.ai_provider == "openai" and settings.openai_api_key:
-            try:
-                from openai import OpenAI
-                self.openai_client = OpenAI(api_key=settings.openai_api_key)
-                print("✅ OpenAI client initialized successfully")
-            except Exception as e:
-                print(f"❌ Failed to initialize OpenAI: {e}")
-        
-        elif settings.ai_provider == "groq" and settings.groq_api_key:
-            try:
-                from openai import OpenAI
-                self.groq_client = OpenAI(
-                    api_key=settings.groq_api_key,
-                    base_url="https://api.groq.com/openai/v1"
-                )
-                print("✅ Groq client initialized successfully")
-            except Exception as e:
-                print(f"❌ Failed to initialize Groq: {e}")
-        
-        elif settings.ai_provider == "gemini" and settings.gemini_api_key:
-            try:
-                import google.generativeai as genai
-                genai.configure(api_key=settings.gemini_api_key)
-                model_name = "models/gemini-pro-latest"
-                self.gemini_model = genai.GenerativeModel(model_name)
-                print(f"✅ Gemini client initialized with model: {model_name}")
-            except Exception as e:
-                print(f"❌ Failed to initialize Gemini: {e}")
-        else:
-            print(f"⚠️ No matching provider found for: {settings.ai_provider}")
-    
     def _build_prompt(self, entity_type: str, fields: Dict[str, Any]) -> str:
         """Build the AI prompt for description generation."""
         fields_text = "\n".join([f"- {key}: {value}" for key, value in fields.items() if value])
@@ -83,78 +44,65 @@ Generate only the description text, nothing else."""
         
         return prompt
     
-    async def generate(self, entity_type: str, fields: Dict[str, Any]) -> str:
+    async def generate(
+        self,
+        entity_type: str,
+        fields: Dict[str, Any],
+        priority_class: PriorityClass = PriorityClass.INTERACTIVE
+    ) -> str:
         """
         Generate description using AI.
         Falls back to template if AI fails.
+
+        Raises OverloadedError instead of queueing when the estimated provider
+        wait for `priority_class` exceeds SHED_AI_WAIT_SECONDS or its queue is full.
         """
-        # Lazy initialization
-        self._initialize_clients()
+        providers.initialize()
+        
+        provider = settings.ai_provider
+        set_log_context(provider=provider, outcome="ai")
+        
+        wait = scheduler.estimated_wait(provider, priority_class)
+        if settings.shed_ai_wait_seconds and wait > settings.shed_ai_wait_seconds:
+            raise OverloadedError("estimated_wait", wait)
         
         try:
-            prompt = self._build_prompt(entity_type, fields)
+            with stage_timer(PIPELINE, "build_prompt"):
+                prompt = self._build_prompt(entity_type, fields)
             
-            if settings.ai_provider == "openai" and self.openai_client:
-                print("🚀 Using OpenAI...")
-                return await self._generate_openai(prompt)
-            elif settings.ai_provider == "groq" and self.groq_client:
-                print("🚀 Using Groq...")
-                return await self._generate_groq(prompt)
-            elif settings.ai_provider == "gemini" and self.gemini_model:
-                print("🚀 Using Gemini...")
-                return await self._generate_gemini(prompt)
-            else:
+            if not providers.ready(provider):
                 # No AI configured, use template
-                print("⚠️ AI not configured, falling back to template")
-                return template_generator.generate(entity_type, fields)
+                logger.warning("AI not configured, falling back to template", extra={"provider": provider})
+                set_log_context(outcome="fallback_not_configured")
+                PROVIDER_FALLBACKS.labels(provider, "not_configured").inc()
+                return self._generate_template(entity_type, fields)
+            
+            text, _ = await providers.complete(
+                PIPELINE,
+                prompt,
+                system=SYSTEM_PROMPT,
+                max_tokens=MAX_TOKENS,
+                priority_class=priority_class
+            )
+            return text
+        
+        except QueueFullError as e:
+            raise OverloadedError("queue_full", scheduler.estimated_wait(provider, priority_class)) from e
         
         except Exception as e:
             # AI failed, fallback to template
-            print(f"⚠️ AI failed: {e}. Falling back to template.")
-            return template_generator.generate(entity_type, fields)
-    
-    async def _generate_openai(self, prompt: str) -> str:
-        """Generate using OpenAI API."""
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a professional technical writer."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=200,
-                temperature=0.7
+            logger.warning(
+                "AI generation failed, falling back to template",
+                extra={"provider": provider, "error": str(e), "error_type": type(e).__name__},
             )
-        )
-        return response.choices[0].message.content.strip()
+            set_log_context(outcome="fallback_error")
+            PROVIDER_FALLBACKS.labels(provider, "error").inc()
+            return self._generate_template(entity_type, fields)
     
-    async def _generate_groq(self, prompt: str) -> str:
-        """Generate using Groq API (OpenAI-compatible)."""
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: self.groq_client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[
-                    {"role": "system", "content": "You are a professional technical writer."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=200,
-                temperature=0.7
-            )
-        )
-        return response.choices[0].message.content.strip()
-    
-    async def _generate_gemini(self, prompt: str) -> str:
-        """Generate using Google Gemini API."""
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: self.gemini_model.generate_content(prompt)
-        )
-        return response.text.strip()
+    def _generate_template(self, entity_type: str, fields: Dict[str, Any]) -> str:
+        """Generate the template fallback, timed as its own stage."""
+        with stage_timer(PIPELINE, "template"):
+            return template_generator.generate(entity_type, fields)
 
 
 # Singleton instance
@@ -3,9 +3,15 @@ Main generator orchestrator.
 Routes requests to appropriate generator based on mode.
 """
 from typing import Dict, Any, Tuple
+import logging
 from app.models.schemas import GenerationMode
 from app.services.template_generator import template_generator
-from app.services.ai_generator import ai_generator
+from app.services.ai_generator import PIPELINE, ai_generator
+from textgen_common.scheduler import OverloadedError, PriorityClass
+from textgen_common.metrics import REQUESTS_SHED
+from textgen_common.logging_config import set_log_context
+
+logger = logging.getLogger(__name__)
 
 
 class DescriptionGenerator:
@@ -15,7 +21,8 @@ class DescriptionGenerator:
         self, 
         entity_type: str, 
         generation_mode: GenerationMode,
-        fields: Dict[str, Any]
+        fields: Dict[str, Any],
+        priority_class: PriorityClass = PriorityClass.INTERACTIVE
     ) -> Tuple[str, str]:
         """
         Generate description based on mode.
@@ -24,16 +31,28 @@ class DescriptionGenerator:
             entity_type: Type of entity (review, rfa, issue)
             generation_mode: Template or AI mode
             fields: Dictionary of field values
+            priority_class: Scheduling class for the provider call (AI mode)
             
         Returns:
-            Tuple of (generated_description, actual_mode_used)
+            Tuple of (generated_description, actual_mode_used); AI requests
+            shed under overload come back in "template" mode
         """
         if generation_mode == GenerationMode.TEMPLATE:
             description = template_generator.generate(entity_type, fields)
             return description, "template"
         
         elif generation_mode == GenerationMode.AI:
-            description = await ai_generator.generate(entity_type, fields)
+            try:
+                description = await ai_generator.generate(entity_type, fields, priority_class)
+            except OverloadedError as e:
+                # Shed: a template answer now beats an AI answer after a long queue
+                logger.warning(
+                    "AI generation shed, serving template",
+                    extra={"reason": e.reason, "estimated_wait_s": round(e.retry_after, 3)},
+                )
+                REQUESTS_SHED.labels(PIPELINE, e.reason, "template").inc()
+                set_log_context(outcome=f"shed_{e.reason}")
+                return template_generator.generate(entity_type, fields), "template"
             # Check if fallback was used (AI may fall back to template)
             return description, "ai"
         
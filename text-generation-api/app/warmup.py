@@ -0,0 +1,70 @@
+"""
+Startup warm-up for the Text Generation API.
+
+Heavy dependencies (the selected provider SDK and its client) are imported
+lazily, so the server accepts connections quickly. Right after startup a
+background thread loads them, so the first AI request does not pay for the
+import either. Disable with WARMUP_ON_STARTUP=false.
+
+Under gunicorn (gunicorn.conf.py) `warm_shared` additionally loads the
+read-only data once in the master process, before workers are forked.
+"""
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up() -> None:
+    """Load everything the first request would otherwise load lazily."""
+    import app.services.ai_generator  # noqa: F401
+    from textgen_common.providers import providers
+
+    providers.initialize()
+
+
+def warm_shared() -> None:
+    """
+    Load read-only state in the gunicorn master before workers fork.
+
+    Workers then share these pages copy-on-write. Nothing that owns threads,
+    sockets or file handles is created here: provider clients are still
+    built per worker by the lifespan warm-up.
+    """
+    from app.services.template_generator import template_generator  # noqa: F401 - templates
+
+    # The OpenAI SDK (also used for Groq) is plain Python and fork-safe to
+    # import; the Gemini SDK pulls in gRPC, which must not start before fork.
+    if settings.ai_provider in ("openai", "groq"):
+        import openai  # noqa: F401
+
+
+def _run() -> None:
+    start = time.perf_counter()
+    try:
+        warm_up()
+    except Exception:
+        logger.exception("Startup warm-up failed")
+        return
+    logger.info("Startup warm-up complete", extra={"duration_ms": round((time.perf_counter() - start) * 1000, 3)})
+
+
+def start_warmup() -> Optional[threading.Thread]:
+    """Run the warm-up in a daemon thread when enabled."""
+    if not settings.warmup_on_startup:
+        return None
+    thread = threading.Thread(target=_run, name="startup-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """FastAPI lifespan: kick off the warm-up without delaying startup."""
+    start_warmup()
+    yield
@@ -0,0 +1,78 @@
+"""
+Pre-fork deployment for the Text Generation API.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The app is imported once in the master (`preload_app`), read-only data is
+loaded there and frozen out of the garbage collector, then workers are
+forked and share those pages copy-on-write. Per-box memory therefore grows
+by only a worker's private heap per extra worker. Mutable caches live in the
+box-local shared store (textgen_common/shared_store.py) and Prometheus metrics are
+aggregated across workers through PROMETHEUS_MULTIPROC_DIR.
+
+Environment: WEB_CONCURRENCY (workers, default 4), GUNICORN_PRELOAD
+(default true; `false` only for comparison), BIND (default
+0.0.0.0:8000), PROMETHEUS_MULTIPROC_DIR (a dedicated directory; the
+previous run's samples in it are deleted at startup).
+"""
+import gc
+import os
+import re
+import tempfile
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+# Read by app/config.py to split SCHEDULER_MAX_IN_FLIGHT over the workers
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Files prometheus_client writes to PROMETHEUS_MULTIPROC_DIR
+_SAMPLE_FILE = re.compile(r"^(counter|histogram|summary|gauge_[a-z]+)_\d+\.db$")
+
+
+def _clear_metrics_dir(path: str) -> None:
+    """
+    Delete the previous run's samples, which would otherwise be summed into
+    this run's. Only sample files are removed: a directory holding anything
+    else is not a dedicated metrics directory and is refused.
+    """
+    os.makedirs(path, exist_ok=True)
+    names = os.listdir(path)
+    foreign = [name for name in names if not _SAMPLE_FILE.match(name)]
+    if foreign:
+        raise RuntimeError(
+            f"PROMETHEUS_MULTIPROC_DIR={path} holds files other than metric samples "
+            f"({', '.join(sorted(foreign)[:3])}); point it at a dedicated directory"
+        )
+    for name in names:
+        os.remove(os.path.join(path, name))
+
+
+# Must happen before prometheus_client is imported by the preloaded app, which
+# is before any server hook runs, so this is done when the config is read
+_metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "text-generation-api-metrics")
+)
+_clear_metrics_dir(_metrics_dir)
+
+
+def when_ready(server):
+    """Runs in the master after the app is loaded and before any worker forks."""
+    if not preload_app:
+        return
+    from app.warmup import warm_shared
+
+    warm_shared()
+    # Keep the collector from touching (and so copying) the shared objects in workers
+    gc.collect()
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
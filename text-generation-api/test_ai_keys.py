@@ -12,6 +12,11 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# Optional endpoint overrides (e.g. the local mock: python -m perf.mock_llm_server)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL") or None
+
 
 def test_groq():
     """Test Groq API"""
@@ -20,7 +25,7 @@ def test_groq():
         from openai import OpenAI
         client = OpenAI(
             api_key=GROQ_API_KEY,
-            base_url="https://api.groq.com/openai/v1"
+            base_url=GROQ_BASE_URL
         )
         response = client.chat.completions.create(
             model="llama-3.1-8b-instant",
@@ -40,7 +45,7 @@ def test_openai():
     print("\n🔄 Testing OPENAI...")
     try:
         from openai import OpenAI
-        client = OpenAI(api_key=OPENAI_API_KEY)
+        client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
         response = client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[{"role": "user", "content": "Say 'Hello from OpenAI!' in one line"}],
@@ -59,7 +64,14 @@ def test_gemini():
     print("\n🔄 Testing GEMINI...")
     try:
         import google.generativeai as genai
-        genai.configure(api_key=GEMINI_API_KEY)
+        if GEMINI_BASE_URL:
+            genai.configure(
+                api_key=GEMINI_API_KEY,
+                transport="rest",
+                client_options={"api_endpoint": GEMINI_BASE_URL}
+            )
+        else:
+            genai.configure(api_key=GEMINI_API_KEY)
         model = genai.GenerativeModel("gemini-2.0-flash")
         response = model.generate_content("Say 'Hello from Gemini!' in one line")
         print(f"✅ GEMINI WORKS! Response: {response.text}")
@@ -127,3 +127,40 @@ class TestGenerationAPI:
         
         # Should still return 200 with default values
         assert response.status_code == 200
+    
+    def test_metrics_endpoint(self):
+        """Test Prometheus metrics are exposed with per-route latency."""
+        client.get("/api/v1/health")
+        response = client.get("/metrics")
+        
+        assert response.status_code == 200
+        assert 'route="/api/v1/health"' in response.text
+    
+    def test_ai_request_shed_under_overload(self, monkeypatch):
+        """Test AI requests fall back to a degraded template answer when overloaded."""
+        from app.config import settings
+        from textgen_common.scheduler import scheduler
+        
+        monkeypatch.setattr(settings, "shed_ai_wait_seconds", 1.0)
+        monkeypatch.setattr(scheduler, "estimated_wait", lambda provider, priority_class: 30.0)
+        request_data = {
+            "entity_type": "rfa",
+            "generation_mode": "ai",
+            "fields": {
+                "name": "Safety Compliance",
+                "request_date": "2026-01-10",
+                "due_date": "2026-01-20",
+                "workflow": "Review Process",
+                "priority": "Medium"
+            }
+        }
+        
+        response = client.post(
+            "/api/v1/generate-description", json=request_data, headers={"X-Priority-Class": "batch"}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["generation_mode"] == "template"
+        assert data["degraded"] is True
+        assert "Safety Compliance" in data["generated_description"]
@@ -0,0 +1,47 @@
+"""
+Tests for client-disconnect cancellation.
+"""
+import asyncio
+
+import pytest
+
+from textgen_common.cancellation import ClientDisconnected, run_cancellable
+
+
+class _FakeRequest:
+    """Request whose receive channel reports a disconnect after `delay` seconds."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def receive(self):
+        await asyncio.sleep(self.delay)
+        return {"type": "http.disconnect"}
+
+
+class TestRunCancellable:
+    """Test cases for run_cancellable."""
+
+    def test_returns_result_before_disconnect(self):
+        """Work that finishes first returns its result."""
+        async def work():
+            await asyncio.sleep(0.01)
+            return "done"
+
+        assert asyncio.run(run_cancellable(_FakeRequest(1.0), "test", work())) == "done"
+
+    def test_disconnect_cancels_work(self):
+        """A disconnect cancels the work and skips everything after its await."""
+        state = {"persisted": False, "cancelled": False}
+
+        async def work():
+            try:
+                await asyncio.sleep(1.0)
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+            state["persisted"] = True
+
+        with pytest.raises(ClientDisconnected):
+            asyncio.run(run_cancellable(_FakeRequest(0.01), "test", work()))
+        assert state == {"persisted": False, "cancelled": True}
@@ -0,0 +1,81 @@
+"""
+Tests for traffic capture.
+"""
+import gzip
+import json
+import os
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from textgen_common.capture import REDACTED, CaptureMiddleware, CaptureWriter, sanitize, sanitize_query
+from textgen_common.logging_config import request_logging_middleware, set_log_context
+
+
+def _read(directory: str, expected: int, timeout: float = 2.0) -> list:
+    """Records written so far; the open file ends at its last flush."""
+    deadline = time.monotonic() + timeout
+    while True:
+        records = []
+        for name in sorted(os.listdir(directory)):
+            with gzip.open(os.path.join(directory, name), "rt", encoding="utf-8") as f:
+                try:
+                    records.extend(json.loads(line) for line in f)
+                except EOFError:
+                    pass
+        if len(records) >= expected or time.monotonic() > deadline:
+            return records
+        time.sleep(0.02)
+
+
+class TestCapture:
+    """Test cases for CaptureMiddleware and sanitize."""
+
+    def test_sanitize_keeps_text_and_masks_personal_data(self):
+        body = {
+            "input": "call +91 98765 43210 or jo@site.com, grid 2026-01-05 rebar wrong",
+            "user_name": "Jo",
+            "fields": {"api_key": "sk-abcdefghijklmnopqrstuvwx", "notes": ["token sk-abcdefghijklmnopqrstuvwx"]},
+        }
+        clean = sanitize(body)
+
+        assert clean["input"] == "call <phone> or <email>, grid 2026-01-05 rebar wrong"
+        assert clean["user_name"] == REDACTED
+        assert clean["fields"] == {"api_key": REDACTED, "notes": ["token <secret>"]}
+
+    def test_sanitize_query(self):
+        """Query parameters are sanitized like body fields and stay a valid query string."""
+        clean = sanitize_query("x=1&token=abc123&q=mail+jo%40site.com&empty=")
+
+        assert clean == "x=1&token=%5Bredacted%5D&q=mail+%3Cemail%3E&empty="
+        assert sanitize_query("") == ""
+
+    def test_requests_are_recorded_with_outcome(self, tmp_path):
+        app = FastAPI()
+        app.add_middleware(CaptureMiddleware, writer=CaptureWriter(str(tmp_path), "text-generation-api"))
+        app.middleware("http")(request_logging_middleware)
+
+        @app.post("/api/v1/echo")
+        async def echo(body: dict):
+            set_log_context(outcome="success", provider="openai")
+            return body
+
+        @app.get("/health")
+        async def health():
+            return {"status": "healthy"}
+
+        client = TestClient(app)
+        client.post("/api/v1/echo?x=1&email=jo%40site.com", json={"input": "wall paint bd", "email": "jo@site.com"},
+                    headers={"X-Priority-Class": "batch"})
+        client.get("/health")
+
+        records = _read(str(tmp_path), 1)
+        assert len(records) == 1
+        record = records[0]
+        assert record["path"] == "/api/v1/echo" and record["query"] == "x=1&email=%5Bredacted%5D"
+        assert record["body"] == {"input": "wall paint bd", "email": REDACTED}
+        assert record["headers"]["x-priority-class"] == "batch"
+        assert record["status"] == 200 and record["duration_ms"] > 0
+        assert record["outcome"] == "success" and record["provider"] == "openai"
+        assert record["request_id"]
@@ -0,0 +1,61 @@
+"""
+Tests for response compression.
+"""
+import gzip
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from textgen_common.compression import CompressionMiddleware, negotiate
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/large")
+    async def large():
+        return {"items": ["reinforcement bar spacing"] * 200}
+
+    @app.get("/small")
+    async def small():
+        return {"status": "healthy"}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(100):
+                yield "data: reinforcement bar spacing\n\n"
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    @app.get("/encoded")
+    async def encoded():
+        return PlainTextResponse(gzip.compress(b"x" * 2048), headers={"Content-Encoding": "gzip"})
+
+    return TestClient(app)
+
+
+class TestCompression:
+    """Test cases for CompressionMiddleware."""
+
+    def test_negotiate(self):
+        assert negotiate("gzip, deflate") == "gzip"
+        assert negotiate("gzip;q=0, identity") is None
+        assert negotiate("") is None
+        assert negotiate("br;q=1.0, gzip;q=0.5") in ("br", "gzip")
+
+    def test_large_json_is_gzipped(self):
+        response = _client().get("/large", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert int(response.headers["content-length"]) < 1024
+        assert response.json()["items"][0] == "reinforcement bar spacing"
+
+    def test_small_streamed_and_encoded_pass_through(self):
+        client = _client()
+        for path in ("/small", "/stream", "/encoded"):
+            response = client.get(path, headers={"Accept-Encoding": "gzip"})
+            assert response.status_code == 200
+            assert path == "/encoded" or "content-encoding" not in response.headers
@@ -0,0 +1,67 @@
+"""
+Tests for Idempotency-Key handling.
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from textgen_common.idempotency import REPLAYED_HEADER, idempotency_keys
+from app.main import app
+from app.services.generator import description_generator
+from textgen_common.shared_store import SharedStore
+
+BODY = {"entity_type": "review", "generation_mode": "ai", "fields": {"title": "Slab pour"}}
+
+
+@pytest.fixture
+def calls(tmp_path, monkeypatch):
+    """Counts generator runs; a run with `fail` in the title is degraded to the template."""
+    calls = []
+
+    async def generate(entity_type, generation_mode, fields, priority_class):
+        calls.append(fields["title"])
+        await asyncio.sleep(0.2)
+        if "fail" in fields["title"]:
+            return "Template text.", "template"
+        return f"Description {len(calls)}.", "ai"
+
+    monkeypatch.setattr(idempotency_keys, "store", SharedStore(str(tmp_path / "store.sqlite3")))
+    monkeypatch.setattr(description_generator, "generate", generate)
+    return calls
+
+
+async def _post(*bodies_and_keys):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*(
+            client.post("/api/v1/generate-description", json=body, headers={"Idempotency-Key": key})
+            for body, key in bodies_and_keys
+        ))
+
+
+class TestIdempotency:
+    """Test cases for the Idempotency-Key header."""
+
+    def test_duplicates_run_once_and_replay(self, calls):
+        """Concurrent duplicates wait for the first call; later ones are replayed."""
+        first, second = asyncio.run(_post((BODY, "k1"), (BODY, "k1")))
+        (later,) = asyncio.run(_post((BODY, "k1")))
+
+        assert calls == ["Slab pour"]
+        assert first.json() == second.json() == later.json()
+        assert first.json()["generated_description"] == "Description 1."
+        assert sorted(r.headers.get(REPLAYED_HEADER, "") for r in (first, second)) == ["", "true"]
+        assert later.headers[REPLAYED_HEADER] == "true"
+
+    def test_degraded_is_not_stored_and_key_must_match_body(self, calls):
+        failing = dict(BODY, fields={"title": "fail"})
+        (first,) = asyncio.run(_post((failing, "k2")))
+        (retry,) = asyncio.run(_post((failing, "k2")))
+        (stored,) = asyncio.run(_post((BODY, "k2")))
+        (reused,) = asyncio.run(_post((failing, "k2")))
+
+        assert first.json()["degraded"] and REPLAYED_HEADER not in retry.headers
+        assert stored.json()["generated_description"] == "Description 3."
+        assert reused.status_code == 422
+        assert calls == ["fail", "fail", "Slab pour"]
@@ -0,0 +1,91 @@
+"""
+Tests for structured logging and log rate limiting.
+"""
+import json
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import SERVICE_NAME, settings
+from app.main import app
+from textgen_common import logging_config
+from textgen_common.logging_config import ContextFilter, JsonFormatter, RateLimitFilter
+from textgen_common.providers import providers
+
+client = TestClient(app)
+
+
+class _Capture(logging.Handler):
+    """Keeps records rendered the way the production handler renders them."""
+
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+        self.setFormatter(JsonFormatter())
+        self.addFilter(ContextFilter())
+
+    def emit(self, record):
+        self.lines.append(json.loads(self.format(record)))
+
+
+@pytest.fixture
+def captured(monkeypatch):
+    handler = _Capture()
+    root = logging.getLogger()
+    monkeypatch.setattr(root, "level", logging.INFO)
+    root.addHandler(handler)
+    yield handler.lines
+    root.removeHandler(handler)
+
+
+def _record(message="Provider call failed", level=logging.WARNING):
+    return logging.makeLogRecord({"name": "app.test", "levelno": level, "levelname": "WARNING", "msg": message})
+
+
+class TestLogging:
+    """Test cases for the JSON log records."""
+
+    def test_records_are_json_with_request_context(self, captured, monkeypatch):
+        """A request's own records and its access record carry the request id and context."""
+        monkeypatch.setattr(providers, "initialize", lambda: None)
+        monkeypatch.setattr(providers, "ready", lambda provider: False)
+        body = {"entity_type": "review", "generation_mode": "ai", "fields": {"name": "Slab pour"}}
+
+        response = client.post("/api/v1/generate-description", json=body, headers={"X-Request-ID": "req-1"})
+
+        assert response.headers["X-Request-ID"] == "req-1"
+        fallback = next(line for line in captured if line["message"] == "AI not configured, falling back to template")
+        assert fallback["request_id"] == "req-1"
+        assert fallback["level"] == "WARNING"
+        assert fallback["service"] == SERVICE_NAME
+
+        access = next(line for line in captured if line["logger"] == "app.access")
+        assert access["request_id"] == "req-1"
+        assert access["route"] == "/api/v1/generate-description"
+        assert access["status"] == 200
+        assert access["outcome"] == "fallback_not_configured"
+        assert "template" in access["stage_timings_ms"]
+        assert access["duration_ms"] >= 0
+
+
+class TestRateLimitFilter:
+    """Test cases for RateLimitFilter."""
+
+    def test_repeats_are_suppressed_within_the_window(self, monkeypatch):
+        """Past LOG_RATE_LIMIT_COUNT repeats are dropped; the next window reports how many."""
+        monkeypatch.setattr(settings, "log_rate_limit_count", 3)
+        monkeypatch.setattr(settings, "log_rate_limit_window", 60)
+        now = [1000.0]
+        monkeypatch.setattr(logging_config.time, "monotonic", lambda: now[0])
+        limiter = RateLimitFilter(settings.log_rate_limit_count, settings.log_rate_limit_window)
+
+        passed = [limiter.filter(_record()) for _ in range(5)]
+        assert passed == [True, True, True, False, False]
+        assert limiter.filter(_record("Another failure"))
+        assert limiter.filter(_record(level=logging.INFO))
+
+        now[0] += 60
+        record = _record()
+        assert limiter.filter(record)
+        assert record.suppressed == 2
@@ -0,0 +1,106 @@
+"""
+Tests for Prometheus metrics and the /metrics endpoint.
+"""
+import os
+import runpy
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.config import settings
+from app.main import app
+from textgen_common.providers import providers
+
+client = TestClient(app)
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BODY = {"entity_type": "review", "generation_mode": "ai", "fields": {"name": "Slab pour"}}
+
+# Run in a fresh interpreter: PROMETHEUS_MULTIPROC_DIR must be set before prometheus_client is imported
+MULTIPROCESS_SCRIPT = """
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+client.get("/api/v1/health")
+print(client.get("/metrics").text)
+"""
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestMetrics:
+    """Test cases for request metrics."""
+
+    def test_request_updates_metrics(self, monkeypatch):
+        """A request records its latency, stage timings and counters, and /metrics shows them."""
+        monkeypatch.setattr(providers, "initialize", lambda: None)
+        monkeypatch.setattr(providers, "ready", lambda provider: False)
+        provider = settings.ai_provider
+        route = {"method": "POST", "route": "/api/v1/generate-description", "status": "200"}
+        before = (
+            _sample("http_request_duration_seconds_count", **route),
+            _sample("pipeline_stage_duration_seconds_count", pipeline="ai_generation", stage="template"),
+            _sample("llm_fallbacks_total", provider=provider, reason="not_configured"),
+        )
+
+        assert client.post("/api/v1/generate-description", json=BODY).status_code == 200
+
+        after = (
+            _sample("http_request_duration_seconds_count", **route),
+            _sample("pipeline_stage_duration_seconds_count", pipeline="ai_generation", stage="template"),
+            _sample("llm_fallbacks_total", provider=provider, reason="not_configured"),
+        )
+        assert [b - a for a, b in zip(before, after)] == [1, 1, 1]
+
+        text = client.get("/metrics").text
+        assert (
+            'http_request_duration_seconds_count{method="POST",'
+            'route="/api/v1/generate-description",status="200"}' in text
+        )
+        assert f'llm_fallbacks_total{{provider="{provider}",reason="not_configured"}}' in text
+
+    def test_multiprocess_collector(self, tmp_path):
+        """With PROMETHEUS_MULTIPROC_DIR, samples go through the directory and /metrics aggregates them."""
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+        output = subprocess.run(
+            [sys.executable, "-c", MULTIPROCESS_SCRIPT],
+            cwd=SERVICE_DIR, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+
+        assert any(name.startswith("histogram_") for name in os.listdir(tmp_path))
+        assert (
+            'http_request_duration_seconds_count{method="GET",'
+            'route="/api/v1/health",status="200"} 1.0' in output
+        )
+
+
+class TestGunicornMetricsDir:
+    """Test cases for the PROMETHEUS_MULTIPROC_DIR handling in gunicorn.conf.py."""
+
+    def _load(self, monkeypatch, path):
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(path))
+        monkeypatch.setenv("WEB_CONCURRENCY", "4")  # set by the config; restored afterwards
+        return runpy.run_path(os.path.join(SERVICE_DIR, "gunicorn.conf.py"))
+
+    def test_previous_samples_are_deleted(self, tmp_path, monkeypatch):
+        for name in ("counter_12.db", "histogram_12.db", "gauge_livesum_12.db"):
+            (tmp_path / name).write_bytes(b"")
+
+        self._load(monkeypatch, tmp_path)
+
+        assert os.listdir(tmp_path) == []
+
+    def test_foreign_directory_is_refused(self, tmp_path, monkeypatch):
+        """A directory holding anything but samples is left alone."""
+        (tmp_path / "counter_12.db").write_bytes(b"")
+        (tmp_path / "notes.txt").write_text("keep")
+
+        with pytest.raises(RuntimeError, match="dedicated directory"):
+            self._load(monkeypatch, tmp_path)
+
+        assert sorted(os.listdir(tmp_path)) == ["counter_12.db", "notes.txt"]
@@ -0,0 +1,86 @@
+"""
+Tests for opt-in request profiling.
+"""
+import itertools
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from textgen_common import profiling
+
+client = TestClient(app)
+TOKEN = "secret"
+
+
+@pytest.fixture
+def profiles(tmp_path, monkeypatch):
+    """Profiling enabled with the admin token, artifacts in a temporary directory."""
+    monkeypatch.setattr(settings, "profiling_admin_token", TOKEN)
+    monkeypatch.setattr(settings, "profiling_sample_rate", 0)
+    monkeypatch.setattr(settings, "profiling_output_dir", str(tmp_path / "profiles"))
+    monkeypatch.setattr(settings, "profiling_interval_ms", 1)
+    monkeypatch.setattr(profiling, "_request_counter", itertools.count(1))
+    return tmp_path / "profiles"
+
+
+class TestProfiling:
+    """Test cases for the profiling middleware and artifact download."""
+
+    def test_admin_token_required(self, profiles):
+        """X-Profile without the right admin token is ignored."""
+        for headers in ({"X-Profile": "cprofile"}, {"X-Profile": "cprofile", "X-Admin-Token": "wrong"}):
+            response = client.get("/api/v1/health", headers=headers)
+            assert response.status_code == 200
+            assert "X-Profile-Artifact" not in response.headers
+        assert not profiles.exists()
+
+    def test_no_profiling_without_configured_token(self, profiles, monkeypatch):
+        monkeypatch.setattr(settings, "profiling_admin_token", "")
+        response = client.get("/api/v1/health", headers={"X-Profile": "cprofile", "X-Admin-Token": ""})
+
+        assert "X-Profile-Artifact" not in response.headers
+
+    def test_unknown_mode_is_rejected(self, profiles):
+        response = client.get("/api/v1/health", headers={"X-Profile": "perf", "X-Admin-Token": TOKEN})
+
+        assert response.status_code == 400
+        assert "perf" in response.json()["detail"]
+
+    def test_artifact_download(self, profiles):
+        """An on-demand profile is stored and downloadable by an admin only."""
+        response = client.get("/api/v1/health", headers={"X-Profile": "cprofile", "X-Admin-Token": TOKEN})
+        name = response.headers["X-Profile-Artifact"]
+        assert name.endswith(".pstats")
+
+        url = f"/api/v1/admin/profiles/{name}"
+        assert client.get(url).status_code == 403
+        assert client.get(url, headers={"X-Admin-Token": "wrong"}).status_code == 403
+        assert client.get(url, headers={"X-Admin-Token": "sécret".encode("utf-8")}).status_code == 403
+        download = client.get(url, headers={"X-Admin-Token": TOKEN})
+        assert download.status_code == 200
+        assert download.content == (profiles / name).read_bytes()
+        missing = client.get("/api/v1/admin/profiles/missing.pstats", headers={"X-Admin-Token": TOKEN})
+        assert missing.status_code == 404
+
+    def test_sampling_rate(self, profiles, monkeypatch):
+        """PROFILING_SAMPLE_RATE=N profiles every N-th request with the sampler."""
+        monkeypatch.setattr(settings, "profiling_sample_rate", 2)
+
+        names = [client.get("/api/v1/health").headers.get("X-Profile-Artifact") for _ in range(4)]
+
+        assert names[0] is None and names[2] is None
+        assert names[1].endswith(".speedscope.json") and names[3].endswith(".speedscope.json")
+        with open(profiles / names[1], encoding="utf-8") as f:
+            assert json.load(f)["name"] == "GET /api/v1/health"
+
+    def test_oldest_artifacts_are_deleted(self, profiles, monkeypatch):
+        monkeypatch.setattr(settings, "profiling_max_artifacts", 2)
+        headers = {"X-Profile": "cprofile", "X-Admin-Token": TOKEN}
+
+        names = [client.get("/api/v1/health", headers=headers).headers["X-Profile-Artifact"] for _ in range(3)]
+
+        assert sorted(os.listdir(profiles)) == sorted(names[1:])
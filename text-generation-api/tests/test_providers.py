@@ -0,0 +1,133 @@
+"""
+Tests for the shared provider layer's retry policy.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.config import settings
+from textgen_common.providers import EmptyCompletionError, providers
+
+
+def _retries() -> float:
+    labels = {"provider": "openai", "error_type": "_ServerError"}
+    return REGISTRY.get_sample_value("llm_provider_retries_total", labels) or 0.0
+
+
+class _ServerError(Exception):
+    status_code = 503
+
+
+class _Completions:
+    """Fails with a 503 the first `failures` times, optionally after streaming some text."""
+
+    def __init__(self, failures: int = 0, fail_mid_stream: bool = False, content: str = " Done. "):
+        self.failures = failures
+        self.fail_mid_stream = fail_mid_stream
+        self.content = content
+        self.calls = 0
+
+    async def create(self, stream=False, **kwargs):
+        self.calls += 1
+        failing = self.calls <= self.failures
+        if failing and not self.fail_mid_stream:
+            raise _ServerError("service unavailable")
+        if not stream:
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=self.content), finish_reason="content_filter")],
+                usage=SimpleNamespace(prompt_tokens=12, completion_tokens=2),
+            )
+
+        async def chunks():
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="Part"))])
+            if failing:
+                raise _ServerError("connection reset")
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="ial."))])
+        return chunks()
+
+
+@pytest.fixture
+def completions(monkeypatch):
+    def install(**behaviour):
+        fake = _Completions(**behaviour)
+        monkeypatch.setattr(settings, "ai_provider", "openai")
+        monkeypatch.setattr(settings, "provider_retry_backoff_seconds", 0.0)
+        monkeypatch.setattr(providers, "_initialized", True)
+        monkeypatch.setattr(providers, "openai_client", SimpleNamespace(chat=SimpleNamespace(completions=fake)))
+        return fake
+    return install
+
+
+class TestProviders:
+    """Test cases for Providers.complete."""
+
+    def test_transient_errors_are_retried(self, completions):
+        fake = completions(failures=2)
+        before = _retries()
+
+        text, usage = asyncio.run(providers.complete("test", "write", system="sys", max_tokens=10))
+
+        assert text == "Done."
+        assert fake.calls == 3
+        assert _retries() - before == 2
+        assert (usage.model, usage.prompt_tokens, usage.estimated) == (settings.openai_model, 12, False)
+
+    def test_no_retry_once_text_was_streamed(self, completions):
+        """A retry would repeat text the caller has already received."""
+        fake = completions(failures=1, fail_mid_stream=True)
+        received = []
+
+        async def on_text(text):
+            received.append(text)
+            return False
+
+        with pytest.raises(_ServerError):
+            asyncio.run(providers.complete("test", "write", system="sys", max_tokens=10, on_text=on_text))
+
+        assert fake.calls == 1
+        assert received == ["Part"]
+
+    def test_answer_without_text_fails(self, completions):
+        """A filtered answer (content None) raises, so the caller falls back, and is not retried."""
+        fake = completions(content=None)
+
+        with pytest.raises(EmptyCompletionError, match="content_filter"):
+            asyncio.run(providers.complete("test", "write", system="sys", max_tokens=10))
+
+        assert fake.calls == 1
+
+        from app.services.ai_generator import ai_generator
+
+        description = asyncio.run(ai_generator.generate("issue", {"title": "Leaking pipe"}))
+        assert description and fake.calls == 2
+
+    def test_gemini_gets_the_system_prompt(self, monkeypatch):
+        """The system prompt becomes the Gemini model's system instruction."""
+        built = []
+
+        class _Model:
+            def __init__(self, model_name, system_instruction=None):
+                self.model_name = model_name
+                self.system_instruction = system_instruction
+                built.append(self)
+
+            async def generate_content_async(self, prompt, generation_config=None):
+                return SimpleNamespace(
+                    text=f"{self.system_instruction}|{prompt}",
+                    usage_metadata=SimpleNamespace(prompt_token_count=5, candidates_token_count=3),
+                )
+
+        monkeypatch.setattr(settings, "ai_provider", "gemini")
+        monkeypatch.setattr(settings, "gemini_base_url", None)
+        monkeypatch.setattr(providers, "_initialized", True)
+        monkeypatch.setattr(providers, "_gemini_models", {})
+        monkeypatch.setattr(providers, "gemini_factory", _Model)
+        monkeypatch.setattr(providers, "gemini_model", _Model("models/gemini-test"))
+
+        first, _ = asyncio.run(providers.complete("test", "write", system="sys", max_tokens=10))
+        again, _ = asyncio.run(providers.complete("test", "again", system="sys", max_tokens=10))
+
+        assert (first, again) == ("sys|write", "sys|again")
+        assert [model.system_instruction for model in built] == [None, "sys"]
@@ -0,0 +1,154 @@
+"""
+Tests for the priority-class admission scheduler.
+"""
+import asyncio
+
+import pytest
+from textgen_common.scheduler import (
+    DEFAULT_QUEUE_LIMITS,
+    AdmissionScheduler,
+    PriorityClass,
+    QueueFullError,
+    _parse_class_map,
+)
+
+INTERACTIVE = PriorityClass.INTERACTIVE
+BATCH = PriorityClass.BATCH
+
+
+def make_scheduler(max_in_flight=1, limit=10):
+    return AdmissionScheduler(
+        max_in_flight=max_in_flight,
+        weights={INTERACTIVE: 4, BATCH: 1},
+        queue_limits={cls: limit for cls in PriorityClass},
+    )
+
+
+class TestAdmissionScheduler:
+    """Test cases for AdmissionScheduler."""
+
+    def test_admits_up_to_cap_without_queueing(self):
+        """Calls under the in-flight cap run immediately."""
+        scheduler = make_scheduler(max_in_flight=2)
+
+        async def scenario():
+            async with scheduler.admit("test", "mock", BATCH):
+                async with scheduler.admit("test", "mock", BATCH):
+                    return scheduler.stats("mock")
+
+        stats = asyncio.run(scenario())
+        assert stats["in_flight"] == 2
+        assert scheduler.stats("mock")["in_flight"] == 0
+
+    def test_weighted_fair_order(self):
+        """Queued interactive calls overtake earlier batch calls by weight."""
+        scheduler = make_scheduler(max_in_flight=1)
+        order = []
+
+        async def call(cls, name):
+            async with scheduler.admit("test", "mock", cls):
+                order.append(name)
+                await asyncio.sleep(0)
+
+        async def scenario():
+            async with scheduler.admit("test", "mock", BATCH):
+                tasks = [asyncio.create_task(call(BATCH, f"b{i}")) for i in range(4)]
+                tasks += [asyncio.create_task(call(INTERACTIVE, f"i{i}")) for i in range(4)]
+                await asyncio.sleep(0)
+            await asyncio.gather(*tasks)
+
+        asyncio.run(scenario())
+        assert order == ["i0", "i1", "i2", "i3", "b0", "b1", "b2", "b3"]
+
+    def test_queue_limit_rejects(self):
+        """A full class queue raises immediately; other classes still queue."""
+        scheduler = make_scheduler(max_in_flight=1, limit=1)
+
+        async def scenario():
+            async with scheduler.admit("test", "mock", BATCH):
+                waiting = asyncio.create_task(scheduler.admit("test", "mock", BATCH).__aenter__())
+                await asyncio.sleep(0)
+                with pytest.raises(QueueFullError):
+                    async with scheduler.admit("test", "mock", BATCH):
+                        pass
+                assert scheduler.stats("mock")["batch"] == 1
+                waiting.cancel()
+
+        asyncio.run(scenario())
+
+    def test_cancelled_waiter_releases_nothing(self):
+        """Cancelling a queued call neither leaks nor double-frees a slot."""
+        scheduler = make_scheduler(max_in_flight=1)
+
+        async def scenario():
+            async with scheduler.admit("test", "mock", BATCH):
+                waiting = asyncio.create_task(scheduler.admit("test", "mock", BATCH).__aenter__())
+                await asyncio.sleep(0)
+                waiting.cancel()
+                await asyncio.gather(waiting, return_exceptions=True)
+            stats = scheduler.stats("mock")
+            assert stats["in_flight"] == 0
+            assert stats["batch"] == 0
+
+        asyncio.run(scenario())
+
+    def test_estimated_wait_uses_depth_and_latency(self):
+        """Estimated wait grows with the queue ahead and the rolling latency."""
+        scheduler = make_scheduler(max_in_flight=1)
+
+        async def scenario():
+            async with scheduler.admit("test", "mock", BATCH):
+                await asyncio.sleep(0.02)
+            assert scheduler.estimated_wait("mock", BATCH) == 0.0
+
+            async with scheduler.admit("test", "mock", BATCH):
+                empty = scheduler.estimated_wait("mock", BATCH)
+                waiting = asyncio.create_task(scheduler.admit("test", "mock", BATCH).__aenter__())
+                await asyncio.sleep(0)
+                one_ahead = scheduler.estimated_wait("mock", BATCH)
+                interactive = scheduler.estimated_wait("mock", INTERACTIVE)
+                waiting.cancel()
+            return empty, one_ahead, interactive
+
+        empty, one_ahead, interactive = asyncio.run(scenario())
+        assert empty >= 0.02
+        assert one_ahead > empty
+        assert interactive < one_ahead
+
+    def test_partial_spec_keeps_defaults(self):
+        """A class missing from the queue limits keeps its default instead of 0."""
+        scheduler = AdmissionScheduler(
+            max_in_flight=1,
+            weights=_parse_class_map("interactive=16", float),
+            queue_limits=_parse_class_map("interactive=8", int),
+        )
+
+        assert scheduler.queue_limits[INTERACTIVE] == 8
+        assert scheduler.queue_limits[BATCH] == DEFAULT_QUEUE_LIMITS[BATCH] > 0
+        assert scheduler.weights[INTERACTIVE] == 16
+        assert scheduler.weights[BATCH] == 2
+
+        async def scenario():
+            async with scheduler.admit("test", "mock", INTERACTIVE):
+                queued = asyncio.create_task(scheduler.admit("test", "mock", BATCH).__aenter__())
+                await asyncio.sleep(0)
+                depth = scheduler.stats("mock")["batch"]
+                queued.cancel()
+            return depth
+
+        assert asyncio.run(scenario()) == 1
+
+    def test_box_wide_cap_is_split_over_workers(self, monkeypatch):
+        """SCHEDULER_MAX_IN_FLIGHT is shared out over WEB_CONCURRENCY unless set per worker."""
+        from app.config import Settings
+
+        monkeypatch.delenv("SCHEDULER_MAX_IN_FLIGHT_PER_WORKER", raising=False)
+        monkeypatch.setenv("SCHEDULER_MAX_IN_FLIGHT", "32")
+        monkeypatch.setenv("WEB_CONCURRENCY", "4")
+        assert Settings().scheduler_max_in_flight_per_worker == 8
+
+        monkeypatch.setenv("WEB_CONCURRENCY", "64")
+        assert Settings().scheduler_max_in_flight_per_worker == 1
+
+        monkeypatch.setenv("SCHEDULER_MAX_IN_FLIGHT_PER_WORKER", "5")
+        assert Settings().scheduler_max_in_flight_per_worker == 5
@@ -0,0 +1,89 @@
+"""
+Tests for the box-local shared store.
+"""
+import asyncio
+import multiprocessing
+import sqlite3
+import time
+
+import pytest
+from textgen_common import shared_store
+from textgen_common.shared_store import SharedStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SharedStore(str(tmp_path / "shared.sqlite3"))
+
+
+def _write_from_child(path):
+    SharedStore(path).set("cache", "from-child", {"pid": "child"}, ttl=60)
+
+
+class TestSharedStore:
+    """Test cases for SharedStore."""
+
+    def test_set_and_get(self, store):
+        """Values round-trip as JSON within their namespace."""
+        store.set("cache", "key", {"text": "hello", "n": 1}, ttl=60)
+
+        assert store.get("cache", "key") == {"text": "hello", "n": 1}
+        assert store.get("other", "key") is None
+
+    def test_expired_entries_are_missing(self, store):
+        """Entries are invisible after their TTL and removed by purge."""
+        store.set("cache", "key", "value", ttl=0.01)
+        time.sleep(0.02)
+
+        assert store.get("cache", "key") is None
+        assert store.purge_expired() == 1
+
+    def test_writes_purge_expired_entries(self, store, monkeypatch):
+        """Expired entries are deleted by later writes once the purge interval has passed."""
+        monkeypatch.setattr(shared_store, "PURGE_INTERVAL_SECONDS", 0)
+        store.set("typeahead", "old", "token", ttl=0.01)
+        time.sleep(0.02)
+        store.set("typeahead", "new", "token", ttl=60)
+
+        with sqlite3.connect(store.path) as conn:
+            assert conn.execute("SELECT key FROM entries").fetchall() == [("new",)]
+
+    def test_async_calls_leave_event_loop_free(self, store):
+        """While another process holds the write lock, the event loop keeps running."""
+        store.set("locks", "warm", "up", ttl=60)
+        blocker = sqlite3.connect(store.path, isolation_level=None)
+        blocker.execute("BEGIN IMMEDIATE")
+
+        async def run():
+            ticks = 0
+            asyncio.get_running_loop().call_later(0.2, blocker.execute, "COMMIT")
+            claim = asyncio.ensure_future(store.aadd("locks", "key", "first", ttl=60))
+            while not claim.done():
+                ticks += 1
+                await asyncio.sleep(0.01)
+            return ticks, claim.result()
+
+        ticks, claimed = asyncio.run(run())
+        blocker.close()
+
+        assert claimed is True
+        assert ticks >= 10
+        assert asyncio.run(store.aget("locks", "key")) == "first"
+
+    def test_add_only_when_absent(self, store):
+        """add() refuses to overwrite a live entry but replaces an expired one."""
+        assert store.add("locks", "key", "first", ttl=60) is True
+        assert store.add("locks", "key", "second", ttl=60) is False
+        assert store.get("locks", "key") == "first"
+
+        store.set("locks", "stale", "old", ttl=0.01)
+        time.sleep(0.02)
+        assert store.add("locks", "stale", "new", ttl=60) is True
+
+    def test_shared_across_processes(self, store):
+        """A value written by another process is visible here."""
+        process = multiprocessing.get_context("spawn").Process(target=_write_from_child, args=(store.path,))
+        process.start()
+        process.join(30)
+
+        assert store.get("cache", "from-child") == {"pid": "child"}
@@ -0,0 +1,55 @@
+"""
+Tests for request tracing to the local JSONL export.
+"""
+import json
+import os
+import subprocess
+import sys
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in a fresh interpreter: the tracer provider is installed once per process at app import
+TRACED_REQUEST_SCRIPT = """
+from fastapi.testclient import TestClient
+from opentelemetry import trace
+from app.main import app
+
+response = TestClient(app).get("/api/v1/health")
+assert response.status_code == 200
+trace.get_tracer_provider().shutdown()  # flush the batch processor
+"""
+
+
+def _traced_request(tmp_path, sample_rate: str):
+    export_path = tmp_path / "spans.jsonl"
+    env = dict(
+        os.environ,
+        TRACING_ENABLED="true",
+        TRACING_SAMPLE_RATE=sample_rate,
+        TRACING_EXPORT_PATH=str(export_path),
+    )
+    subprocess.run(
+        [sys.executable, "-c", TRACED_REQUEST_SCRIPT],
+        cwd=SERVICE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    if not export_path.exists():
+        return []
+    return [json.loads(line) for line in export_path.read_text().splitlines()]
+
+
+class TestTracing:
+    """Test cases for the JSONL span export."""
+
+    def test_request_span_is_exported(self, tmp_path):
+        """A traced request writes its server span with route and status."""
+        spans = _traced_request(tmp_path, "1.0")
+
+        server = next(span for span in spans if span["kind"] == "SERVER")
+        assert server["name"] == "GET /api/v1/health"
+        assert server["attributes"]["http.route"] == "/api/v1/health"
+        assert server["attributes"]["http.status_code"] == 200
+        assert server["service"] == "text-generation-api"
+        assert server["status"] == "UNSET"
+
+    def test_nothing_is_written_at_sample_rate_zero(self, tmp_path):
+        assert _traced_request(tmp_path, "0") == []
@@ -0,0 +1,77 @@
+"""
+Tests for lazy imports and the startup warm-up.
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from app import warmup
+from app.config import settings
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in a fresh interpreter so nothing is imported or built yet
+WARM_UP_SCRIPT = """
+import json
+import sys
+
+import app.main
+from textgen_common.providers import providers
+from app.warmup import warm_up
+
+
+def loaded():
+    return {"sdk": "openai" in sys.modules, "client": providers.openai_client is not None}
+
+
+before = loaded()
+warm_up()
+# Not stdout: the logging thread writes there too
+with open(sys.argv[1], "w") as f:
+    json.dump({"before": before, "after": loaded()}, f)
+"""
+
+
+class TestWarmup:
+    """Test cases for lazy loading and the warm-up."""
+
+    def test_import_is_lazy_and_warm_up_loads(self, tmp_path):
+        """Importing the app loads no provider SDK; warm_up() imports it and builds the client."""
+        env = dict(os.environ, AI_PROVIDER="openai", OPENAI_API_KEY="test-key", WARMUP_ON_STARTUP="false")
+        result = tmp_path / "state.json"
+        subprocess.run(
+            [sys.executable, "-c", WARM_UP_SCRIPT, str(result)],
+            cwd=SERVICE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+
+        state = json.loads(result.read_text())
+        assert state["before"] == {"sdk": False, "client": False}
+        assert state["after"] == {"sdk": True, "client": True}
+
+    def test_lifespan_does_not_wait_for_warm_up(self, monkeypatch):
+        """Startup completes while the warm-up is still running in the background."""
+        release = threading.Event()
+        finished = threading.Event()
+
+        def slow_warm_up():
+            release.wait(5)
+            finished.set()
+
+        monkeypatch.setattr(settings, "warmup_on_startup", True)
+        monkeypatch.setattr(warmup, "warm_up", slow_warm_up)
+
+        async def start():
+            started = time.perf_counter()
+            async with warmup.lifespan(None):
+                return time.perf_counter() - started
+
+        elapsed = asyncio.run(start())
+
+        assert elapsed < 0.5
+        assert not finished.is_set()
+        release.set()
+        assert finished.wait(1)
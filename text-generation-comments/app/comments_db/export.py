@@ -0,0 +1,299 @@
+"""
+Streaming columnar export of comment requests, suggestions and feedback.
+
+A dataset is read in keyset batches of EXPORT_BATCH_ROWS rows (`id > last
+id`) and each batch is written as one Parquet row group or Arrow IPC record
+batch, so memory use depends on the batch size and not on the table size.
+The database is opened read-only and every batch is its own short read, so
+an export never holds a write lock and never keeps the service's writers
+waiting for longer than one batch.
+
+Exports are incremental: the highest id at the start is the watermark.
+Rows above it that are added during the export are left for the next run,
+which passes the watermark back as `after_id`. `since` additionally keeps
+only rows created at or after a time.
+
+Datasets are `requests`, `suggestions` and `feedback`. With `joined`,
+suggestions carry their request's columns (`request_*`) and feedback
+carries its suggestion's and request's columns (`suggestion_*`,
+`request_*`); all joins are primary-key lookups.
+
+Writing uses `pyarrow` (in requirements.txt), imported on first use:
+
+    python -m app.comments_db.export suggestions --joined -o suggestions.parquet
+    python -m app.comments_db.export feedback --format arrow --after-id 1200
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+
+FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+PARQUET_COMPRESSION = "zstd"
+
+# (output column, SQL expression, Arrow type)
+_REQUEST_COLUMNS = (
+    ("input_text", "r.input_text", "string"),
+    ("status", "r.status", "string"),
+    ("input_type", "r.input_type", "string"),
+    ("created_at", "r.created_at", "timestamp"),
+)
+_SUGGESTION_COLUMNS = (
+    ("request_id", "s.request_id", "int64"),
+    ("text", "s.text", "string"),
+    ("style", "s.style", "string"),
+    ("confidence", "s.confidence", "float64"),
+    ("provider", "s.provider", "string"),
+    ("created_at", "s.created_at", "timestamp"),
+)
+_FEEDBACK_COLUMNS = (
+    ("suggestion_id", "f.suggestion_id", "int64"),
+    ("is_helpful", "f.is_helpful", "bool"),
+    ("comment", "f.comment", "string"),
+    ("created_at", "f.created_at", "timestamp"),
+)
+
+
+class ExportUnavailableError(RuntimeError):
+    """pyarrow is not installed."""
+
+    def __init__(self):
+        super().__init__("Export needs the pyarrow package (pip install pyarrow)")
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """A table read in id order, with its columns and those of joined parents."""
+    table: str
+    alias: str
+    columns: Tuple[Tuple[str, str, str], ...]
+    parents: Tuple[Tuple[str, Tuple[Tuple[str, str, str], ...]], ...] = ()
+    joins: str = ""
+
+    def select(self, joined: bool) -> Tuple[List[str], List[Tuple[str, str]]]:
+        """SQL expressions and (name, Arrow type) of the exported columns."""
+        columns = [("id", f"{self.alias}.id", "int64")] + list(self.columns)
+        if joined:
+            for prefix, parent_columns in self.parents:
+                columns += [(f"{prefix}_{name}", sql, kind) for name, sql, kind in parent_columns]
+        return [sql for _, sql, _ in columns], [(name, kind) for name, _, kind in columns]
+
+
+DATASETS = {
+    "requests": Dataset("comment_requests", "r", _REQUEST_COLUMNS),
+    "suggestions": Dataset(
+        "comment_suggestions", "s", _SUGGESTION_COLUMNS,
+        parents=(("request", _REQUEST_COLUMNS),),
+        joins="LEFT JOIN comment_requests r ON r.id = s.request_id",
+    ),
+    "feedback": Dataset(
+        "comment_feedback", "f", _FEEDBACK_COLUMNS,
+        parents=(("suggestion", _SUGGESTION_COLUMNS[:-1]), ("request", _REQUEST_COLUMNS)),
+        joins=(
+            "LEFT JOIN comment_suggestions s ON s.id = f.suggestion_id "
+            "LEFT JOIN comment_requests r ON r.id = s.request_id"
+        ),
+    ),
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ExportUnavailableError()
+    return pyarrow
+
+
+def connect_read_only(path: str) -> sqlite3.Connection:
+    """A read-only connection in autocommit mode, usable from the thread pool's threads."""
+    connection = sqlite3.connect(
+        f"file:{os.path.abspath(path)}?mode=ro", uri=True, isolation_level=None, check_same_thread=False
+    )
+    connection.execute("PRAGMA query_only = ON")
+    return connection
+
+
+class _Chunks:
+    """Write-only file object whose written bytes are taken out after each batch."""
+    closed = False
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class Export:
+    """
+    One export of a dataset: `watermark` is fixed when it is created,
+    iterating yields the encoded file in pieces (one per batch).
+    """
+
+    def __init__(
+        self,
+        connection: sqlite3.Connection,
+        dataset: str,
+        format: str = "parquet",
+        joined: bool = False,
+        after_id: int = 0,
+        since: Optional[datetime] = None,
+        batch_rows: int = 10000,
+    ):
+        if dataset not in DATASETS:
+            raise ValueError(f"Unknown dataset {dataset!r}; expected one of {', '.join(DATASETS)}")
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format {format!r}; expected one of {', '.join(FORMATS)}")
+        self.pa = _pyarrow()
+        self.connection = connection
+        self.dataset = DATASETS[dataset]
+        self.name = dataset
+        self.format = format
+        self.joined = joined
+        self.after_id = after_id
+        if since is not None and since.tzinfo is not None:
+            # created_at is naive UTC
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        self.since = since
+        self.batch_rows = batch_rows
+        self.rows = 0
+        table = self.dataset.table
+        self.watermark = connection.execute(f"SELECT coalesce(max(id), 0) FROM {table}").fetchone()[0]
+
+    @property
+    def media_type(self) -> str:
+        return FORMATS[self.format][0]
+
+    @property
+    def filename(self) -> str:
+        return f"{self.name}.{FORMATS[self.format][1]}"
+
+    def _schema(self, fields: List[Tuple[str, str]]):
+        pa = self.pa
+        types = {"int64": pa.int64(), "string": pa.string(), "float64": pa.float64(),
+                 "bool": pa.bool_(), "timestamp": pa.timestamp("us")}
+        metadata = {
+            "dataset": self.name,
+            "joined": str(self.joined).lower(),
+            "after_id": str(self.after_id),
+            "watermark": str(self.watermark),
+        }
+        return pa.schema([pa.field(name, types[kind]) for name, kind in fields], metadata=metadata)
+
+    def _batches(self, expressions: List[str]) -> Iterator[List[tuple]]:
+        alias = self.dataset.alias
+        conditions = [f"{alias}.id > ?", f"{alias}.id <= ?"]
+        since = []
+        if self.since is not None:
+            # created_at is stored as "YYYY-MM-DD HH:MM:SS.ffffff"
+            conditions.append(f"{alias}.created_at >= ?")
+            since.append(self.since.isoformat(sep=" "))
+        sql = (
+            f"SELECT {', '.join(expressions)} FROM {self.dataset.table} {alias} {self.dataset.joins} "
+            f"WHERE {' AND '.join(conditions)} ORDER BY {alias}.id LIMIT ?"
+        )
+        last = self.after_id
+        while last < self.watermark:
+            # fetchall ends the statement, so the read lock is released between batches
+            rows = self.connection.execute(sql, [last, self.watermark, *since, self.batch_rows]).fetchall()
+            if not rows:
+                return
+            yield rows
+            last = rows[-1][0]
+
+    def _record_batch(self, schema, rows: List[tuple]):
+        pa = self.pa
+        arrays = []
+        for field, values in zip(schema, zip(*rows)):
+            # SQLite hands timestamps back as text and booleans as 0/1
+            if pa.types.is_timestamp(field.type):
+                arrays.append(pa.array(values, pa.string()).cast(field.type))
+            elif pa.types.is_boolean(field.type):
+                arrays.append(pa.array(values, pa.int64()).cast(field.type))
+            else:
+                arrays.append(pa.array(values, field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def __iter__(self) -> Iterator[bytes]:
+        expressions, fields = self.dataset.select(self.joined)
+        schema = self._schema(fields)
+        sink = _Chunks()
+        if self.format == "parquet":
+            writer = self.pa.parquet.ParquetWriter(
+                self.pa.PythonFile(sink, mode="w"), schema, compression=PARQUET_COMPRESSION
+            )
+        else:
+            writer = self.pa.ipc.new_stream(self.pa.PythonFile(sink, mode="w"), schema)
+        for rows in self._batches(expressions):
+            writer.write_batch(self._record_batch(schema, rows))
+            self.rows += len(rows)
+            yield sink.take()
+        writer.close()
+        yield sink.take()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export comment data as Parquet or Arrow IPC")
+    parser.add_argument("dataset", choices=list(DATASETS))
+    parser.add_argument("--format", choices=list(FORMATS), default="parquet")
+    parser.add_argument("--joined", action="store_true", help="add parent request/suggestion columns")
+    parser.add_argument("--after-id", type=int, default=0, help="watermark of the previous export")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="only rows created at or after this time")
+    parser.add_argument("--batch-rows", type=int, default=None)
+    parser.add_argument("-o", "--output", help="file to write (default: <dataset>.<format extension>)")
+    args = parser.parse_args(argv)
+
+    from app.config import settings
+
+    start = time.perf_counter()
+    connection = connect_read_only(settings.comments_db_path)
+    try:
+        export = Export(
+            connection, args.dataset, args.format, args.joined, args.after_id, args.since,
+            args.batch_rows or settings.export_batch_rows,
+        )
+        output = args.output or export.filename
+        with open(output, "wb") as file:
+            for chunk in export:
+                file.write(chunk)
+    finally:
+        connection.close()
+    print(
+        f"{args.dataset}: {export.rows} rows to {output} in {time.perf_counter() - start:.2f}s, "
+        f"watermark {export.watermark} (pass --after-id {export.watermark} next time)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    # Same as app/comments_db/tables.py: runnable as a script from the service directory
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+    sys.exit(main())
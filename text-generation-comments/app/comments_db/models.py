@@ -43,10 +43,13 @@ class CommentSuggestionDB(Base):
         cascade="all, delete-orphan"
     )
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
+from sqlalchemy import event
 from app.comments_db.base import Base
+from app.comments_db.fingerprints import FINGERPRINT_TABLE, create_cleanup_trigger, write_fingerprint
+from app.comments_db.search import create_search_index
 
 
 class CommentFeedbackDB(Base):
@@ -83,3 +86,48 @@ class ReviewCommentDB(Base):
         backref="replies"
     )
 
+
+# Full-text index and its sync triggers are created along with the table
+event.listen(ReviewCommentDB.__table__, "after_create", create_search_index)
+
+
+class ReviewCommentFingerprintDB(Base):
+    """MinHash signature of a review comment and its LSH band keys (see comments_db/fingerprints.py)."""
+    __tablename__ = FINGERPRINT_TABLE
+
+    comment_id = Column(Integer, ForeignKey("review_comments.id"), primary_key=True)
+    signature = Column(LargeBinary, nullable=True)  # NULL for a comment without words
+
+    band0 = Column(Integer, index=True)
+    band1 = Column(Integer, index=True)
+    band2 = Column(Integer, index=True)
+    band3 = Column(Integer, index=True)
+    band4 = Column(Integer, index=True)
+    band5 = Column(Integer, index=True)
+    band6 = Column(Integer, index=True)
+    band7 = Column(Integer, index=True)
+    band8 = Column(Integer, index=True)
+    band9 = Column(Integer, index=True)
+
+
+# Fingerprints follow the comment text on every ORM flush and go when the comment is deleted
+event.listen(ReviewCommentDB, "after_insert", write_fingerprint)
+event.listen(ReviewCommentDB, "after_update", write_fingerprint)
+event.listen(ReviewCommentFingerprintDB.__table__, "after_create", create_cleanup_trigger)
+
+
+
+class TokenUsageDB(Base):
+    __tablename__ = "token_usage"
+
+    id = Column(Integer, primary_key=True)
+    request_id = Column(Integer, ForeignKey("comment_requests.id"), nullable=True)
+
+    pipeline = Column(String, nullable=False)
+    provider = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    prompt_tokens = Column(Integer, nullable=False)
+    completion_tokens = Column(Integer, nullable=False)
+    estimated = Column(Boolean, nullable=False, default=False)  # counted locally, not reported by the provider
+
+    created_at = Column(DateTime, default=datetime.utcnow)
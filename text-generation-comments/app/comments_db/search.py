@@ -0,0 +1,117 @@
+"""
+Full-text search index over review comments (SQLite FTS5).
+
+`review_comments_fts` is an external-content FTS5 table: it indexes
+`review_comments.text` and reads column values back from `review_comments`
+by rowid, so comment text is stored once. Filters on review_id, status and
+workflow_step go through the join with review_comments (a review's comments
+through `ix_review_comments_review_id`). Triggers keep the index in step
+with every insert, update and delete.
+
+The index is created together with the review_comments table. On a
+database from before it, the service builds it at startup (`create_index`;
+writes wait for the build, about 17 s per million comments). It can also
+be rebuilt by hand:
+
+    python -m app.comments_db.search rebuild
+
+`optimize` merges the index into a single b-tree, which keeps queries fast
+after a large import:
+
+    python -m app.comments_db.search optimize
+"""
+import argparse
+import os
+import sys
+import time
+
+FTS_TABLE = "review_comments_fts"
+
+
+class SearchIndexMissingError(RuntimeError):
+    """The database has no search index yet."""
+
+    def __init__(self):
+        super().__init__("Search index is not built yet: it is built at startup, retry shortly")
+
+
+# Porter stemming so "membranes" finds "membrane"; prefix indexes for "water*"
+SEARCH_DDL = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text,
+        content='review_comments',
+        content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON review_comments BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON review_comments BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF text ON review_comments BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_review_comments_review_id ON review_comments (review_id)",
+)
+
+
+def create_search_index(target, connection, **kw) -> None:
+    """Create the FTS table and its triggers (an `after_create` listener of review_comments)."""
+    for statement in SEARCH_DDL:
+        connection.exec_driver_sql(statement)
+
+
+def rebuild(connection) -> None:
+    """Create the index if needed and re-index every comment."""
+    create_search_index(None, connection)
+    connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def create_index(engine) -> bool:
+    """Create and fill the index if the database has none; True when built."""
+    from sqlalchemy import inspect
+
+    if inspect(engine).has_table(FTS_TABLE):
+        return False
+    with engine.begin() as connection:
+        rebuild(connection)
+    return True
+
+
+def optimize(connection) -> None:
+    """Merge the index segments into one b-tree."""
+    connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Maintain the review comment search index")
+    parser.add_argument("command", choices=["rebuild", "optimize"])
+    args = parser.parse_args(argv)
+
+    from app.comments_db.session import sync_engine
+
+    start = time.perf_counter()
+    with sync_engine.begin() as connection:
+        (rebuild if args.command == "rebuild" else optimize)(connection)
+        comments = connection.exec_driver_sql("SELECT count(*) FROM review_comments").scalar()
+    print(f"{args.command}: {comments} comments in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    # Same as app/comments_db/tables.py: runnable as a script from the service directory
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+    sys.exit(main())
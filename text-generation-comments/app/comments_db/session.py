@@ -1,24 +1,50 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from sqlalchemy import create_engine
-
-DATABASE_URL_ASYNC = "sqlite+aiosqlite:///./comments.db"
-DATABASE_URL_SYNC = "sqlite:///./comments.db"
-
-# Async engine (used by app)
-engine = create_async_engine(
-    DATABASE_URL_ASYNC,
-    echo=False,
-    future=True,
-)
-
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    expire_on_commit=False,
-)
-
-# Sync engine (ONLY for table creation)
-sync_engine = create_engine(
-    DATABASE_URL_SYNC,
-    echo=False,
-    future=True,
-)
+"""
+Database engines and session factory.
+
+Engines are built on first use rather than at import, so starting the
+service does not pay for SQLAlchemy's async machinery until the first
+request (or the startup warm-up) touches the database. `engine`,
+`AsyncSessionLocal` and `sync_engine` are still importable by name.
+"""
+import threading
+
+from app.config import settings
+
+DATABASE_URL_ASYNC = f"sqlite+aiosqlite:///{settings.comments_db_path}"
+DATABASE_URL_SYNC = f"sqlite:///{settings.comments_db_path}"
+
+_lock = threading.RLock()
+_lazy = {}
+
+
+def _build(name: str):
+    if name == "engine":
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        # Async engine (used by app)
+        return create_async_engine(DATABASE_URL_ASYNC, echo=False, future=True)
+    if name == "AsyncSessionLocal":
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        return async_sessionmaker(get("engine"), expire_on_commit=False)
+    if name == "sync_engine":
+        from sqlalchemy import create_engine
+
+        # Sync engine (table creation and blocking reads off the event loop)
+        return create_engine(DATABASE_URL_SYNC, echo=False, future=True)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get(name: str):
+    """Return the named engine/session factory, creating it on first use."""
+    value = _lazy.get(name)
+    if value is None:
+        with _lock:
+            value = _lazy.get(name)
+            if value is None:
+                value = _lazy[name] = _build(name)
+    return value
+
+
+def __getattr__(name: str):
+    return get(name)
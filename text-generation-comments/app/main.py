@@ -2,11 +2,19 @@
 FastAPI application entry point for Comment Rephrasing Service.
 """
 import os
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 
+from app.config import SERVICE_NAME, settings
+from textgen_common.logging_config import request_logging_middleware, setup_logging
+from textgen_common.serialization import FastJSONResponse
+from app.warmup import lifespan
+
+setup_logging()
+logger = logging.getLogger(__name__)
 
 
 # -------------------------------------------------
@@ -19,10 +27,12 @@ app = FastAPI(
     """,
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
-print("🚀 FastAPI app created")
+logger.debug("FastAPI app created")
 
 # -------------------------------------------------
 # MIDDLEWARE
@@ -35,20 +45,55 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-print("🧩 Middleware loaded")
+from textgen_common.compression import CompressionMiddleware
+from textgen_common.metrics import metrics_middleware
+from textgen_common.profiling import profiling_middleware
+from textgen_common.tracing import setup_tracing, tracing_middleware
+
+setup_tracing()
+
+# Opt-in traffic capture, inside compression and access logging: it sees plain
+# bodies and the outcome the handlers put in the access log context
+if settings.capture_dir:
+    from textgen_common.capture import CaptureMiddleware, CaptureWriter
+
+    app.add_middleware(
+        CaptureMiddleware,
+        writer=CaptureWriter(settings.capture_dir, SERVICE_NAME, settings.capture_max_bytes, settings.capture_backups),
+        sample_rate=settings.capture_sample_rate,
+    )
+
+# br/gzip for large responses; inside the metrics and logging middlewares, so they see its cost
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_bytes)
+
+# Last added runs first: access logging, then the trace span, wrap metrics and profiling
+app.middleware("http")(profiling_middleware)
+app.middleware("http")(metrics_middleware)
+app.middleware("http")(tracing_middleware)
+app.middleware("http")(request_logging_middleware)
+
+logger.debug("Middleware loaded")
 
 # -------------------------------------------------
 # ROUTERS (IMPORT AFTER APP + MIDDLEWARE)
 # -------------------------------------------------
 from app.routers.rephrase import router as rephrase_router
 from app.routers.feedback import router as feedback_router
+from app.routers.realtime import router as realtime_router
 from app.routers import review_comments
+from textgen_common.metrics import router as metrics_router
+from app.routers.export import router as export_router
+from textgen_common.profiling import router as profiling_router
 
 app.include_router(review_comments.router)
 app.include_router(rephrase_router)
 app.include_router(feedback_router)
+app.include_router(realtime_router)
+app.include_router(metrics_router)
+app.include_router(export_router)
+app.include_router(profiling_router)
 
-print("✅ Routers registered")
+logger.debug("Routers registered")
 
 # -------------------------------------------------
 # STATIC FILES
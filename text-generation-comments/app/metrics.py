@@ -0,0 +1,45 @@
+"""
+Prometheus metrics of the Comment Rephrasing Service.
+
+Request latency, pipeline stages, provider calls and the other metrics
+both services have are in textgen_common.metrics; these are the ones only
+this service records.
+"""
+from prometheus_client import Counter, Gauge
+
+TYPEAHEAD_SUPERSEDED = Counter(
+    "typeahead_superseded_total",
+    "Typeahead requests replaced by a newer keystroke, by the stage they reached",
+    ["stage"],
+)
+
+RETRIEVAL_LOOKUPS = Counter(
+    "retrieval_lookups_total",
+    "Lookups in the past-suggestion index, by outcome (hit, miss or not_ready)",
+    ["outcome"],
+)
+
+STYLE_CALLS = Counter(
+    "rephrase_style_calls_total",
+    "Single-style provider calls of parallel rephrasing, by outcome "
+    "(used, unused, malformed, error or cancelled)",
+    ["outcome"],
+)
+
+RETRIEVAL_INDEX_SIZE = Gauge(
+    "retrieval_index_entries",
+    "Distinct inputs in the past-suggestion index",
+    multiprocess_mode="livemax",
+)
+
+WS_CONNECTIONS = Gauge(
+    "ws_connections",
+    "Open WebSocket connections",
+    multiprocess_mode="livesum",
+)
+
+WS_MESSAGES = Counter(
+    "ws_messages_total",
+    "WebSocket messages by direction and type",
+    ["direction", "type"],
+)
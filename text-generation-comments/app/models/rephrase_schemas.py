@@ -14,6 +14,19 @@ class ReviewStatus(str, Enum):
     REVISE = "revise"
 
 
+class RephraseMode(str, Enum):
+    """How suggestions are produced."""
+    AUTO = "auto"    # Past suggestions, then AI provider, rule-based when unconfigured or failing
+    AI = "ai"        # AI provider only
+    RULES = "rules"  # Offline rule-based rephraser only
+
+
+class RephraseStrategy(str, Enum):
+    """How AI suggestions are requested from the provider."""
+    COMBINED = "combined"  # One call returning every suggestion
+    PARALLEL = "parallel"  # One call per style, run concurrently
+
+
 class WorkflowContext(BaseModel):
     """Optional context about the workflow for better generation."""
     workflow_name: Optional[str] = Field(None, description="Name of the workflow")
@@ -44,6 +57,15 @@ class CommentRephraseRequest(BaseModel):
         le=5,
         description="Number of alternative suggestions to generate (1-5)"
     )
+    generation_mode: RephraseMode = Field(
+        default=RephraseMode.AUTO,
+        description="Generation mode: auto, ai or rules (offline, deterministic)"
+    )
+    strategy: Optional[RephraseStrategy] = Field(
+        default=None,
+        description="AI calls: combined (one call) or parallel (one call per style, first to finish win); "
+                    "defaults to REPHRASE_STRATEGY"
+    )
     
     class Config:
         json_schema_extra = {
@@ -62,7 +84,7 @@ class CommentRephraseRequest(BaseModel):
 class CommentSuggestion(BaseModel):
     """A single rephrased comment suggestion."""
     text: str = Field(..., description="The rephrased comment text")
-    style: str = Field(..., description="Style of this suggestion (formal, concise, friendly)")
+    style: str = Field(..., description="Style of this suggestion (formal, friendly, concise, detailed, actionable)")
     confidence: float = Field(
         default=0.9, 
         ge=0.0, 
@@ -97,6 +119,14 @@ class CommentRephraseResponse(BaseModel):
         default="expand", 
         description="Type of processing applied: expand, correct, or polish"
     )
+    generation_mode: str = Field(
+        default="ai",
+        description="Engine that produced the suggestions: ai, retrieval or rules"
+    )
+    degraded: bool = Field(
+        default=False,
+        description="True when overload forced fast non-LLM suggestions"
+    )
     error: Optional[str] = Field(None, description="Error message if rephrasing failed")
     
     class Config:
@@ -121,6 +151,35 @@ class CommentRephraseResponse(BaseModel):
                     "terms_expanded": ["rebar -> reinforcement bar"]
                 },
                 "original_input": "rebar spacing wrong",
-                "input_type": "expand"
+                "input_type": "expand",
+                "generation_mode": "ai"
             }
         }
+
+
+class TypeaheadRequest(CommentRephraseRequest):
+    """Request model for suggestions while typing."""
+    session_id: str = Field(
+        ...,
+        description="Editor session id; a newer request supersedes older ones for the same session",
+        min_length=1,
+        max_length=128
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "session_id": "3f6c0a9e-editor-1",
+                "input": "rebar spacing wro",
+                "status": "reject"
+            }
+        }
+
+
+class TypeaheadResponse(CommentRephraseResponse):
+    """Response model for suggestions while typing."""
+    session_id: str = Field(..., description="Editor session id from the request")
+    superseded: bool = Field(
+        default=False,
+        description="True when a newer keystroke for the session replaced this request; ignore the result"
+    )
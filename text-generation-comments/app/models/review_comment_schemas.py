@@ -1,5 +1,6 @@
+from datetime import datetime
 from pydantic import BaseModel
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 
 class ReviewCommentRequest(BaseModel):
     review_id: int
@@ -10,3 +11,49 @@ class ReviewCommentRequest(BaseModel):
     text: str
 
     parent_id: Optional[int] = None
+
+
+class ReviewCommentHit(BaseModel):
+    id: int
+    review_id: int
+    workflow_step: int
+    status: str
+    user_name: str
+    snippet: str  # HTML-escaped, matched terms wrapped in <mark>
+    score: float  # BM25, lower is better
+    created_at: Optional[datetime] = None
+
+
+class ReviewCommentSearchResponse(BaseModel):
+    results: List[ReviewCommentHit]
+    next_cursor: Optional[str] = None  # pass as `cursor` for the next page
+    candidate_limit: Optional[int] = None  # set when only this many most recent matches were ranked
+
+
+class NearDuplicateHit(BaseModel):
+    id: int
+    review_id: int
+    workflow_step: int
+    status: str
+    user_name: str
+    text: str
+    similarity: float  # estimated Jaccard similarity of character 3-grams
+    created_at: Optional[datetime] = None
+
+
+class NearDuplicatesResponse(BaseModel):
+    comment_id: int
+    results: List[NearDuplicateHit]
+
+
+class ReviewCommentCluster(BaseModel):
+    size: int
+    representative_id: int  # oldest comment of the cluster
+    text: str
+    comment_ids: List[int]
+
+
+class ReviewCommentClustersResponse(BaseModel):
+    review_id: int
+    comments: int
+    clusters: List[ReviewCommentCluster]  # largest first
@@ -0,0 +1,67 @@
+"""
+Columnar export of comment data for analysis (see app/comments_db/export.py).
+"""
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.comments_db.export import Export, ExportUnavailableError, connect_read_only
+from app.config import settings
+from textgen_common.auth import is_admin
+
+router = APIRouter(prefix="/api/v1/export", tags=["Export"])
+
+WATERMARK_HEADER = "X-Export-Watermark"
+
+
+def _stream(export: Export):
+    try:
+        yield from export
+    finally:
+        export.connection.close()
+
+
+@router.get("/{dataset}")
+async def export_dataset(
+    dataset: Literal["requests", "suggestions", "feedback"],
+    format: Literal["parquet", "arrow"] = "parquet",
+    joined: bool = False,
+    after_id: int = 0,
+    since: Optional[datetime] = None,
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Stream a table as Parquet or an Arrow IPC stream.
+
+    Rows with ids above `after_id` (and created at or after `since`) up to
+    the current highest id are exported. That id is returned in
+    `X-Export-Watermark`: pass it as `after_id` next time to get only new
+    rows. `joined=true` adds the parent request/suggestion columns.
+    Requires `X-Admin-Token` (EXPORT_ADMIN_TOKEN).
+    """
+    if not is_admin(x_admin_token, settings.export_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+    connection = await run_in_threadpool(connect_read_only, settings.comments_db_path)
+    try:
+        export = await run_in_threadpool(
+            Export, connection, dataset, format, joined, after_id, since, settings.export_batch_rows
+        )
+    except ExportUnavailableError as e:
+        connection.close()
+        raise HTTPException(status_code=501, detail=str(e))
+    except BaseException:
+        connection.close()
+        raise
+
+    return StreamingResponse(
+        _stream(export),
+        media_type=export.media_type,
+        headers={
+            WATERMARK_HEADER: str(export.watermark),
+            "Content-Disposition": f'attachment; filename="{export.filename}"',
+        },
+    )
@@ -0,0 +1,20 @@
+"""
+WebSocket channel for the comment editor.
+"""
+from fastapi import APIRouter, WebSocket
+from app.services.realtime import RealtimeConnection
+
+router = APIRouter(prefix="/api/v1", tags=["Realtime"])
+
+
+@router.websocket("/ws")
+async def realtime_channel(websocket: WebSocket):
+    """
+    One connection for rephrase, typeahead and feedback requests.
+    
+    Messages are JSON objects `{"id", "type", "payload", "priority_class"?}`
+    with type rephrase, typeahead, feedback, cancel or ping; every reply carries
+    the request id. Rephrase and typeahead stream `partial` suggestions
+    before their `result`. See app/services/realtime.py for the protocol.
+    """
+    await RealtimeConnection(websocket).serve()
@@ -1,15 +1,32 @@
 """
 API routes for comment rephrasing (Quillbot-style).
 """
-from fastapi import APIRouter, HTTPException
-from app.models.rephrase_schemas import CommentRephraseRequest, CommentRephraseResponse
-from app.services.comment_rephraser import comment_rephraser
+import math
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from textgen_common.cancellation import CLIENT_CLOSED_REQUEST, ClientDisconnected, run_cancellable
+from textgen_common.idempotency import IdempotencyError, idempotency_keys
+from app.models.rephrase_schemas import (
+    CommentRephraseRequest,
+    CommentRephraseResponse,
+    TypeaheadRequest,
+    TypeaheadResponse,
+)
+from textgen_common.scheduler import OverloadedError, PriorityClass
+from textgen_common.serialization import model_response
+from app.services.comment_rephraser import PIPELINE, comment_rephraser
+from app.services.typeahead import PIPELINE as TYPEAHEAD_PIPELINE, typeahead_service
 
 router = APIRouter(prefix="/api/v1", tags=["Comment Rephrasing"])
 
 
 @router.post("/rephrase-comment", response_model=CommentRephraseResponse)
-async def rephrase_comment(request: CommentRephraseRequest) -> CommentRephraseResponse:
+async def rephrase_comment(
+    request: CommentRephraseRequest,
+    http_request: Request,
+    priority_class: PriorityClass = Header(PriorityClass.INTERACTIVE, alias="X-Priority-Class"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+) -> CommentRephraseResponse:
     """
     Rephrase a short comment into professional, grammatically correct alternatives.
     
@@ -20,8 +37,21 @@ async def rephrase_comment(request: CommentRephraseRequest) -> CommentRephraseRe
     - **status**: Review status (submit, reject, revise) - determines tone
     - **context**: Optional workflow context for better suggestions
     - **num_suggestions**: Number of alternatives to generate (1-5, default 3)
+    - **generation_mode**: auto (default), ai, or rules (offline, deterministic)
+    - **strategy**: combined (one AI call) or parallel (one call per style)
+    - **X-Priority-Class** header: interactive (default), batch or background
+    - **Idempotency-Key** header: retries with the same key get the first
+      response (`Idempotent-Replayed: true`) instead of a new AI call
     
-    Returns 2-3 professional alternatives with different styles (formal, concise, friendly).
+    Returns up to num_suggestions alternatives, one per style (formal, friendly,
+    concise, detailed, actionable).
+    Under overload the response is either marked `degraded` with rule-based
+    suggestions or a 503 with Retry-After (SHED_REPHRASE_ACTION). If the
+    client disconnects first, the provider call is cancelled and nothing is
+    stored.
+    In auto mode a near-duplicate of an input the AI has already answered is
+    served from past suggestions (`generation_mode: "retrieval"`) without a
+    provider call.
     
     **Example Use Cases:**
     - User types "wrong dimensions" with status "reject"
@@ -35,20 +65,70 @@ async def rephrase_comment(request: CommentRephraseRequest) -> CommentRephraseRe
                 detail="Input text cannot be empty"
             )
         
-        # Rephrase the comment
-        response = await comment_rephraser.rephrase(request)
+        # Rephrase the comment, once per idempotency key
+        result = await run_cancellable(
+            http_request,
+            PIPELINE,
+            idempotency_keys.run(
+                PIPELINE,
+                idempotency_key,
+                request,
+                lambda: comment_rephraser.rephrase(request, priority_class),
+                CommentRephraseResponse
+            )
+        )
         
-        return response
+        return result.response()
         
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except IdempotencyError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers)
+    except OverloadedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        return CommentRephraseResponse(
+        return model_response(CommentRephraseResponse(
             success=False,
             suggestions=[],
             original_input=request.input,
             input_type="expand",
             error=str(e)
+        ))
+
+
+@router.post("/rephrase-typeahead", response_model=TypeaheadResponse)
+async def rephrase_typeahead(
+    request: TypeaheadRequest,
+    http_request: Request,
+    priority_class: PriorityClass = Header(PriorityClass.INTERACTIVE, alias="X-Priority-Class")
+) -> TypeaheadResponse:
+    """
+    Suggestions while typing, keyed by an editor session id.
+    
+    Requests are debounced server-side (TYPEAHEAD_DEBOUNCE_MS). A newer
+    request for the same `session_id` supersedes the previous one: it never
+    reaches the provider, or its in-flight provider call is cancelled, and
+    it answers with `superseded: true` and no suggestions. Suggestions are
+    not stored. Accepts the same fields as `/rephrase-comment` plus
+    `session_id`.
+    """
+    try:
+        return model_response(await run_cancellable(
+            http_request, TYPEAHEAD_PIPELINE, typeahead_service.suggest(request, priority_class)
+        ))
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except OverloadedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
         )
 
 
@@ -58,5 +138,5 @@ async def rephrase_health_check():
     return {
         "status": "healthy",
         "service": "comment-rephrasing",
-        "features": ["expansion", "grammar_correction", "tone_based_generation"]
+        "features": ["expansion", "grammar_correction", "tone_based_generation", "typeahead", "websocket"]
     }
@@ -1,6 +1,16 @@
-from fastapi import APIRouter, HTTPException
-from app.models.review_comment_schemas import ReviewCommentRequest
-from app.services.review_comment_service import add_review_comment
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from app.comments_db.search import SearchIndexMissingError
+from app.models.review_comment_schemas import (
+    NearDuplicatesResponse,
+    ReviewCommentClustersResponse,
+    ReviewCommentRequest,
+    ReviewCommentSearchResponse,
+)
+from textgen_common.serialization import model_response
+from app.services.near_duplicate_service import cluster_review_comments, find_near_duplicates
+from app.services.review_comment_service import add_review_comment, search_review_comments
 
 router = APIRouter(prefix="/api/v1/review-comments", tags=["Review Comments"])
 
@@ -12,3 +22,64 @@ async def add_comment(request: ReviewCommentRequest):
         return {"success": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/search", response_model=ReviewCommentSearchResponse)
+async def search_comments(
+    q: str = Query(..., min_length=1, max_length=500),
+    review_id: Optional[int] = None,
+    status: Optional[str] = None,
+    workflow_step: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+) -> ReviewCommentSearchResponse:
+    """
+    Full-text search over review comments, best match first.
+
+    All words in `q` must occur (stemmed: "membranes" finds "membrane");
+    "quoted words" match as a phrase and `water*` as a prefix. Narrow with
+    `review_id`, `status` and `workflow_step`. Each hit has an HTML-escaped
+    `snippet` with the matches in `<mark>`. Pass `next_cursor` back as
+    `cursor` for the next page.
+
+    Without `review_id`, only the SEARCH_MAX_CANDIDATES most recent matches
+    are ranked; `candidate_limit` is set when a search hit that limit, and
+    older matches are then left out.
+    """
+    try:
+        return model_response(await search_review_comments(
+            q, review_id=review_id, status=status, workflow_step=workflow_step, limit=limit, cursor=cursor
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SearchIndexMissingError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/clusters", response_model=ReviewCommentClustersResponse)
+async def comment_clusters(
+    review_id: int,
+    min_similarity: Optional[float] = Query(None, gt=0, le=1),
+    min_size: int = Query(2, ge=1)
+) -> ReviewCommentClustersResponse:
+    """
+    Groups of near-identical comments in a review, largest first.
+
+    Comments are near-identical when the estimated Jaccard similarity of
+    their character 3-grams reaches `min_similarity` (default
+    NEAR_DUPLICATE_MIN_SIMILARITY). `min_size=1` also lists unique comments.
+    """
+    return model_response(await cluster_review_comments(review_id, min_similarity, min_size))
+
+
+@router.get("/{comment_id}/near-duplicates", response_model=NearDuplicatesResponse)
+async def near_duplicates(
+    comment_id: int,
+    min_similarity: Optional[float] = Query(None, gt=0, le=1),
+    limit: int = Query(20, ge=1, le=100)
+) -> NearDuplicatesResponse:
+    """Comments in any review that are near-identical to this one, most similar first."""
+    result = await find_near_duplicates(comment_id, min_similarity, limit)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Review comment not found")
+    return model_response(result)
@@ -2,75 +2,127 @@
 Comment rephraser service.
 Provides Quillbot-style text expansion and rephrasing for review comments.
 """
-from app.comments_db.models import CommentRequestDB, CommentSuggestionDB
-from app.comments_db.session import AsyncSessionLocal
-from typing import List, Tuple
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
 import asyncio
+import logging
 from app.config import settings
 from app.models.rephrase_schemas import (
     CommentRephraseRequest,
     CommentRephraseResponse,
     CommentSuggestion,
     CorrectionsInfo,
+    RephraseMode,
+    RephraseStrategy,
     ReviewStatus,
 )
 from app.services.construction_terms import (
     expand_abbreviations,
     get_tone_context,
     detect_issue_category,
-    find_relevant_glossary_terms,
+    rank_glossary_terms,
     TERM_EXPANSIONS,
 )
+from app.services.prompt_optimizer import (
+    END_MARKER,
+    GENERATION_LIMITS,
+    LABELED_LINES,
+    GenerationLimits,
+    prompt_optimizer,
+)
+from app.services.rule_rephraser import rule_rephraser
+from app.metrics import RETRIEVAL_LOOKUPS, STYLE_CALLS
+from textgen_common.logging_config import set_log_context
+from textgen_common.metrics import PROVIDER_FALLBACKS, REQUESTS_SHED, stage_timer
+from textgen_common.providers import providers
+from textgen_common.scheduler import OverloadedError, PriorityClass, QueueFullError, scheduler
+from textgen_common.tokens import TokenUsage
+
+PIPELINE = "rephrase"
+SYSTEM_PROMPT = "You are a professional technical writer for construction projects."
+
+# Style label -> (style, confidence) in the provider's labelled output.
+# A request for n suggestions asks for the first n styles.
+STYLE_LABELS = {
+    "[FORMAL]": ("formal", 0.95),
+    "[FRIENDLY]": ("friendly", 0.85),
+    "[CONCISE]": ("concise", 0.90),
+    "[DETAILED]": ("detailed", 0.85),
+    "[ACTIONABLE]": ("actionable", 0.85),
+}
+
+STYLE_DESCRIPTIONS = {
+    "[FORMAL]": "Professional, corporate, standard construction language",
+    "[FRIENDLY]": "Polite, constructive, softer tone",
+    "[CONCISE]": "Direct, short, punchy (good for mobile)",
+    "[DETAILED]": "Specific about what is wrong and where, naming the affected element",
+    "[ACTIONABLE]": "Leads with the exact action the submitter must take",
+}
+
+FEW_SHOT_EXAMPLES = """FEW-SHOT EXAMPLES:
+Input: "wall paint bd" -> Output: "The wall paint finish is unsatisfactory."
+Input: "iim colum wrong" -> Output: "The BIM column model contains errors."
+Input: "site cleared ok" -> Output: "Site clearance has been verified and is acceptable."
+Input: "rfa for rnf" -> Output: "Request for Approval regarding reinforcement details."
+
+"""
+
+SuggestionCallback = Callable[[CommentSuggestion], Awaitable[None]]
+LineCallback = Callable[[str], Awaitable[None]]
+
+logger = logging.getLogger(__name__)
+
+
+class _LineStream:
+    """
+    Collects streamed text and hands each completed line to a callback.
+
+    `done` turns true once `lines` labelled lines or END_MARKER have been
+    seen, after which the caller stops reading the stream.
+    """
+
+    def __init__(self, on_line: Optional[LineCallback] = None, lines: int = LABELED_LINES):
+        self.on_line = on_line
+        self.lines = lines
+        self.parts: List[str] = []
+        self.pending = ""
+        self.labeled = 0
+        self.ended = False
+
+    @property
+    def done(self) -> bool:
+        return self.ended or self.labeled >= self.lines
+
+    async def feed(self, text: str) -> bool:
+        """Take the next piece of text; returns `done`."""
+        self.parts.append(text)
+        *complete, self.pending = (self.pending + text).split("\n")
+        for line in complete:
+            await self._line(line)
+        return self.done
+
+    async def _line(self, line: str) -> None:
+        if END_MARKER in line:
+            self.ended = True
+        elif line.strip().upper().startswith(tuple(STYLE_LABELS)):
+            self.labeled += 1
+        if self.on_line is not None:
+            await self.on_line(line)
+
+    async def close(self) -> str:
+        """Flush the last line and return the full text."""
+        if self.pending:
+            await self._line(self.pending)
+            self.pending = ""
+        return "".join(self.parts)
 
 
 class CommentRephraser:
     """
     Rephrases short comments into professional, grammatically correct sentences.
-    Supports multiple AI providers (Groq, OpenAI, Gemini).
+    Supports multiple AI providers (Groq, OpenAI, Gemini), with the offline
+    rule-based rephraser as explicit mode and fallback.
     """
     
-    def __init__(self):
-        """Initialize AI clients."""
-        self.openai_client = None
-        self.groq_client = None
-        self.gemini_model = None
-        self._initialized = False
-    
-    def _initialize_clients(self):
-        """Initialize AI provider clients (lazy initialization)."""
-        if self._initialized:
-            return
-        
-        self._initialized = True
-        
-        if settings.ai_provider == "openai" and settings.openai_api_key:
-            try:
-                from openai import OpenAI
-                self.openai_client = OpenAI(api_key=settings.openai_api_key)
-                print("✅ Comment Rephraser: OpenAI client initialized")
-            except Exception as e:
-                print(f"❌ Comment Rephraser: Failed to initialize OpenAI: {e}")
-        
-        elif settings.ai_provider == "groq" and settings.groq_api_key:
-            try:
-                from openai import OpenAI
-                self.groq_client = OpenAI(
-                    api_key=settings.groq_api_key,
-                    base_url="https://api.groq.com/openai/v1"
-                )
-                print("✅ Comment Rephraser: Groq client initialized")
-            except Exception as e:
-                print(f"❌ Comment Rephraser: Failed to initialize Groq: {e}")
-        
-        elif settings.ai_provider == "gemini" and settings.gemini_api_key:
-            try:
-                import google.generativeai as genai
-                genai.configure(api_key=settings.gemini_api_key)
-                self.gemini_model = genai.GenerativeModel("gemini-2.0-flash")
-                print("✅ Comment Rephraser: Gemini client initialized")
-            except Exception as e:
-                print(f"❌ Comment Rephraser: Failed to initialize Gemini: {e}")
-    
     def _detect_input_type(self, text: str) -> str:
         """
         Detect what type of processing the input needs.
@@ -96,10 +148,16 @@ class CommentRephraser:
         status: ReviewStatus, 
         expanded_text: str,
         context: dict = None,
-        glossary_terms: str = ""
+        glossary_terms: str = "",
+        few_shot: bool = True,
+        labels: Optional[Sequence[str]] = None
     ) -> str:
-        """Build the AI prompt for comment rephrasing."""
+        """Build the AI prompt for comment rephrasing, one suggestion per style label."""
         
+        labels = list(labels or list(STYLE_LABELS)[:LABELED_LINES])
+        count = len(labels)
+        alternatives = "alternative" if count == 1 else "alternatives"
+        style_lines = "\n".join(f"{label} <{STYLE_DESCRIPTIONS[label]}>" for label in labels)
         tone_context = get_tone_context(status.value)
         issue_category = detect_issue_category(input_text)
         
@@ -133,7 +191,7 @@ class CommentRephraser:
         
         prompt = f"""You are a professional comment writer for Krion 6D, a construction project management system.
 
-TASK: Expand and rephrase the following short comment into {3} professional alternatives.
+TASK: Expand and rephrase the following short comment into {count} professional {alternatives}.
 
 USER INPUT: "{input_text}"
 EXPANDED TERMS: "{expanded_text}"
@@ -154,93 +212,123 @@ CRITICAL DOMAIN RULES:
    - "iim colum bad" -> "The BIM column model is incorrect."
    - "rfa rnf wrong" -> "Request for Approval for reinforcement details contains errors."
 
-FEW-SHOT EXAMPLES:
-Input: "wall paint bd" -> Output: "The wall paint finish is unsatisfactory."
-Input: "iim colum wrong" -> Output: "The BIM column model contains errors."
-Input: "site cleared ok" -> Output: "Site clearance has been verified and is acceptable."
-Input: "rfa for rnf" -> Output: "Request for Approval regarding reinforcement details."
-
-TONE REQUIREMENTS:
-- The content must reflect the STATUS ({status.value.upper()}) but providing 3 distinct phrasing styles.
+{FEW_SHOT_EXAMPLES if few_shot else ''}TONE REQUIREMENTS:
+- The content must reflect the STATUS ({status.value.upper()}) {f"but providing {count} distinct phrasing styles" if count > 1 else "in the requested phrasing style"}.
 {status_instructions[status]}
 
 OUTPUT FORMAT:
-Generate exactly 3 alternatives, each on a new line, with these specific style labels:
-[FORMAL] <Professional, corporate, standard construction language>
-[FRIENDLY] <Polite, constructive, softer tone>
-[CONCISE] <Direct, short, punchy (good for mobile)>
+{f"Generate exactly {count} alternatives, each on a new line, with these specific style labels:" if count > 1 else "Generate exactly 1 alternative with this specific style label:"}
+{style_lines}
 
 Rules:
 - Fix any spelling or grammar errors
 - Expand abbreviations naturally
 - Each suggestion should be 1-2 sentences
 - Do not include asterisks, bullet points, or special formatting
-- Output ONLY the 3 labeled suggestions, nothing else"""
+- Output ONLY the {count} labeled {"suggestions" if count > 1 else "suggestion"}, nothing else
+- Write {END_MARKER} on its own line after the last suggestion"""
 
         return prompt
     
-    async def rephrase(self, request: CommentRephraseRequest) -> CommentRephraseResponse:
+    async def rephrase(
+        self,
+        request: CommentRephraseRequest,
+        priority_class: PriorityClass = PriorityClass.INTERACTIVE,
+        persist: bool = True,
+        on_suggestion: Optional[SuggestionCallback] = None
+    ) -> CommentRephraseResponse:
         """
         Main method to rephrase a comment.
         
         Args:
             request: The rephrase request with input text and status
+            priority_class: Scheduling class for the provider call
+            persist: Store the request and suggestions (off for typeahead)
+            on_suggestion: Streams the provider response and is awaited with
+                each suggestion as soon as its line is complete
             
         Returns:
             CommentRephraseResponse with suggestions and corrections info
         """
-        # Lazy initialization
-        self._initialize_clients()
+        providers.initialize()
+        provider = settings.ai_provider
+        set_log_context(provider=provider)
+        
+        if request.generation_mode == RephraseMode.RULES:
+            return await self._rephrase_with_rules(request, "rules", persist)
+        if request.generation_mode == RephraseMode.AUTO and settings.retrieval_min_similarity:
+            response = await self._retrieve(request)
+            if response is not None:
+                if persist:
+                    await self._save(request, response.input_type, response.suggestions, "retrieval")
+                set_log_context(outcome="retrieved", suggestions=len(response.suggestions))
+                return response
+        if request.generation_mode == RephraseMode.AUTO and not providers.ready(provider):
+            logger.warning("AI not configured, using rule-based rephraser", extra={"provider": provider})
+            PROVIDER_FALLBACKS.labels(provider, "not_configured").inc()
+            return await self._rephrase_with_rules(request, "fallback_not_configured", persist)
+        
+        # Shed before doing any work when the provider queue is already too long
+        wait = scheduler.estimated_wait(provider, priority_class)
+        if settings.shed_rephrase_wait_seconds and wait > settings.shed_rephrase_wait_seconds:
+            return self._shed(request, "estimated_wait", wait)
         
         try:
             # Detect input type
             input_type = self._detect_input_type(request.input)
             
             # Expand abbreviations
-            expanded_text, expansions = expand_abbreviations(request.input)
+            with stage_timer(PIPELINE, "expand_abbreviations"):
+                expanded_text, expansions = expand_abbreviations(request.input)
             
             # Get context dict
             context = request.context.model_dump() if request.context else None
             
-            # Get relevant glossary terms
-            glossary_matches = find_relevant_glossary_terms(request.input)
+            # Rank relevant glossary terms
+            with stage_timer(PIPELINE, "find_relevant_glossary_terms"):
+                glossary_matches = rank_glossary_terms(request.input)
             
-            # Build prompt
-            prompt = self._build_prompt(
-                request.input, 
-                request.status, 
-                expanded_text,
-                context,
-                glossary_matches
-            )
+            def build(glossary_terms: str, few_shot: bool, labels: Optional[Sequence[str]] = None) -> str:
+                return self._build_prompt(
+                    request.input,
+                    request.status,
+                    expanded_text,
+                    context,
+                    glossary_terms,
+                    few_shot,
+                    labels
+                )
             
             # Generate suggestions using AI
-            raw_response = await self._generate_with_ai(prompt)
-            
-            # Parse suggestions from response
-            suggestions = self._parse_suggestions(raw_response)
-
-            async with AsyncSessionLocal() as db:
-               request_row = CommentRequestDB(
-                    input_text=request.input,
-                    status=request.status.value,
-                    input_type=input_type
-                )
-            db.add(request_row)
-            await db.flush()
-
-            for s in suggestions:
-                db.add(
-                    CommentSuggestionDB(
-                        request_id=request_row.id,
-                        text=s.text,
-                        style=s.style,
-                        confidence=s.confidence,
-                        provider=settings.ai_provider
+            strategy = request.strategy or RephraseStrategy(settings.rephrase_strategy)
+            set_log_context(strategy=strategy.value)
+            try:
+                if strategy == RephraseStrategy.PARALLEL:
+                    suggestions, usages = await self._generate_parallel(
+                        request, build, glossary_matches, input_type, priority_class, on_suggestion
                     )
-                )          
+                else:
+                    suggestions, usages = await self._generate_combined(
+                        request, build, glossary_matches, input_type, priority_class, on_suggestion
+                    )
+            except QueueFullError:
+                return self._shed(
+                    request, "queue_full", scheduler.estimated_wait(provider, priority_class)
+                )
+            except Exception as e:
+                if request.generation_mode != RephraseMode.AUTO:
+                    raise
+                logger.warning(
+                    "AI rephrasing failed, falling back to rules",
+                    extra={"provider": provider, "error": str(e), "error_type": type(e).__name__},
+                )
+                PROVIDER_FALLBACKS.labels(provider, "error").inc()
+                return await self._rephrase_with_rules(request, "fallback_error", persist)
 
-            await db.commit()
+            if persist:
+                await self._save(request, input_type, suggestions, provider, usages)
+            
+            set_log_context(outcome="success", suggestions=len(suggestions))
             
             # Build corrections info
             corrections = CorrectionsInfo(
@@ -257,8 +345,14 @@ Rules:
                 input_type=input_type
             )
             
+        except OverloadedError:
+            raise
         except Exception as e:
-            print(f"❌ Comment rephrasing failed: {e}")
+            logger.error(
+                "Comment rephrasing failed",
+                extra={"provider": provider, "error": str(e), "error_type": type(e).__name__},
+            )
+            set_log_context(outcome="error")
             # Return fallback response
             return CommentRephraseResponse(
                 success=False,
@@ -269,100 +363,364 @@ Rules:
                 error=str(e)
             )
     
-    async def _generate_with_ai(self, prompt: str) -> str:
-        """Generate response using configured AI provider."""
+    async def _generate_combined(
+        self,
+        request: CommentRephraseRequest,
+        build: Callable[..., str],
+        glossary_matches: List[Tuple[float, str]],
+        input_type: str,
+        priority_class: PriorityClass,
+        on_suggestion: Optional[SuggestionCallback]
+    ) -> Tuple[List[CommentSuggestion], List[TokenUsage]]:
+        """All suggestions from one provider call."""
+        labels = list(STYLE_LABELS)[:request.num_suggestions]
+        with stage_timer(PIPELINE, "build_prompt"):
+            optimized = prompt_optimizer.optimize(
+                lambda glossary_terms, few_shot: build(glossary_terms, few_shot, labels),
+                glossary_matches,
+                input_type,
+                len(labels)
+            )
+        set_log_context(glossary_terms=optimized.glossary_terms, few_shot=optimized.few_shot)
         
-        if settings.ai_provider == "openai" and self.openai_client:
-            return await self._generate_openai(prompt)
-        elif settings.ai_provider == "groq" and self.groq_client:
-            return await self._generate_groq(prompt)
-        elif settings.ai_provider == "gemini" and self.gemini_model:
-            return await self._generate_gemini(prompt)
-        else:
-            raise ValueError("No AI provider configured")
+        on_line = self._suggestion_lines(on_suggestion, len(labels)) if on_suggestion else None
+        raw_response, usage = await self._generate_with_ai(
+            optimized.prompt, priority_class, on_line, optimized.limits
+        )
+        
+        with stage_timer(PIPELINE, "parse_suggestions"):
+            suggestions = self._parse_suggestions(raw_response, len(labels))
+        return suggestions, [usage]
     
-    async def _generate_openai(self, prompt: str) -> str:
-        """Generate using OpenAI API."""
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a professional technical writer for construction projects."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.7
+    async def _generate_parallel(
+        self,
+        request: CommentRephraseRequest,
+        build: Callable[..., str],
+        glossary_matches: List[Tuple[float, str]],
+        input_type: str,
+        priority_class: PriorityClass,
+        on_suggestion: Optional[SuggestionCallback]
+    ) -> Tuple[List[CommentSuggestion], List[TokenUsage]]:
+        """
+        One single-style provider call per suggestion, run concurrently.
+
+        REPHRASE_PARALLEL_SPARE more styles than requested are started;
+        the first `num_suggestions` to succeed are returned (in style order)
+        and the rest are cancelled, so one slow or malformed style does not
+        hold up the answer. Raises the first error if no style succeeds.
+        """
+        wanted = request.num_suggestions
+        labels = list(STYLE_LABELS)[:wanted + settings.rephrase_parallel_spare]
+        with stage_timer(PIPELINE, "build_prompt"):
+            # The prompts differ only in the style label: fit the budget once
+            optimized = prompt_optimizer.optimize(
+                lambda glossary_terms, few_shot: build(glossary_terms, few_shot, labels[:1]),
+                glossary_matches,
+                input_type,
+                1
+            )
+            prompts = [build(optimized.glossary, optimized.few_shot, [label]) for label in labels]
+        set_log_context(glossary_terms=optimized.glossary_terms, few_shot=optimized.few_shot)
+        
+        tasks = {
+            asyncio.ensure_future(self._generate_style(label, prompt, priority_class, optimized.limits)): order
+            for order, (label, prompt) in enumerate(zip(labels, prompts))
+        }
+        pending = set(tasks)
+        results: Dict[int, CommentSuggestion] = {}
+        usages: List[TokenUsage] = []
+        errors: List[Exception] = []
+        try:
+            while pending and len(results) < wanted:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=tasks.get):
+                    try:
+                        suggestion, usage = task.result()
+                    except Exception as e:
+                        STYLE_CALLS.labels("error").inc()
+                        errors.append(e)
+                        continue
+                    usages.append(usage)
+                    if suggestion is None or any(s.text == suggestion.text for s in results.values()):
+                        STYLE_CALLS.labels("malformed").inc()
+                        continue
+                    if len(results) == wanted:
+                        STYLE_CALLS.labels("unused").inc()
+                        continue
+                    STYLE_CALLS.labels("used").inc()
+                    results[tasks[task]] = suggestion
+                    if on_suggestion is not None:
+                        await on_suggestion(suggestion)
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                STYLE_CALLS.labels("cancelled").inc(len(pending))
+                await asyncio.gather(*pending, return_exceptions=True)
+        
+        if not results:
+            raise errors[0] if errors else ValueError("No style produced a suggestion")
+        if len(results) < wanted:
+            logger.warning(
+                "Fewer suggestions than requested",
+                extra={"requested": wanted, "generated": len(results), "errors": len(errors)},
             )
+        return [results[order] for order in sorted(results)], usages
+    
+    async def _generate_style(
+        self,
+        label: str,
+        prompt: str,
+        priority_class: PriorityClass,
+        limits: GenerationLimits
+    ) -> Tuple[Optional[CommentSuggestion], TokenUsage]:
+        """One style's suggestion, or None when the response has no line with its label."""
+        raw_response, usage = await self._generate_with_ai(prompt, priority_class, limits=limits)
+        style, _ = STYLE_LABELS[label]
+        for suggestion in self._parse_suggestions(raw_response, 1, fallback=False):
+            if suggestion.style == style:
+                return suggestion, usage
+        return None, usage
+    
+    def _shed(self, request: CommentRephraseRequest, reason: str, wait: float) -> CommentRephraseResponse:
+        """
+        Handle an overloaded request without calling the LLM.
+
+        SHED_REPHRASE_ACTION=fallback answers with fast non-LLM suggestions
+        marked `degraded`; `reject` raises OverloadedError (503 + Retry-After).
+        """
+        action = "rejected" if settings.shed_rephrase_action == "reject" else "fallback"
+        REQUESTS_SHED.labels(PIPELINE, reason, action).inc()
+        set_log_context(outcome=f"shed_{reason}")
+        logger.warning(
+            "Rephrase shed",
+            extra={"reason": reason, "action": action, "estimated_wait_s": round(wait, 3)},
         )
-        return response.choices[0].message.content.strip()
+        if action == "rejected":
+            raise OverloadedError(reason, wait)
+        return self._fallback_response(request)
+    
+    def _fallback_response(self, request: CommentRephraseRequest) -> CommentRephraseResponse:
+        """Rule-based suggestions, not persisted, for a shed request."""
+        response = self._rules_response(request)
+        response.degraded = True
+        return response
     
-    async def _generate_groq(self, prompt: str) -> str:
-        """Generate using Groq API (OpenAI-compatible)."""
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: self.groq_client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[
-                    {"role": "system", "content": "You are a professional technical writer for construction projects."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.7
+    async def _retrieve(self, request: CommentRephraseRequest) -> Optional[CommentRephraseResponse]:
+        """Past AI suggestions for a near-duplicate input, or None on a miss."""
+        # Deferred: NumPy is only loaded once retrieval is used
+        from app.services.suggestion_index import suggestion_index
+
+        if not suggestion_index.ready:
+            # Built in the background (normally by the startup warm-up); never waited for
+            suggestion_index.start_build()
+            RETRIEVAL_LOOKUPS.labels("not_ready").inc()
+            return None
+        with stage_timer(PIPELINE, "retrieval"):
+            try:
+                await suggestion_index.refresh()
+            except Exception as e:
+                logger.warning(
+                    "Retrieval index refresh failed",
+                    extra={"error": str(e), "error_type": type(e).__name__},
+                )
+            suggestions, similarity = suggestion_index.search(
+                request.input,
+                request.status,
+                request.num_suggestions,
+                settings.retrieval_min_similarity,
+                settings.retrieval_helpful_boost
             )
+        RETRIEVAL_LOOKUPS.labels("hit" if suggestions else "miss").inc()
+        if not suggestions:
+            return None
+        set_log_context(retrieval_similarity=round(similarity, 3))
+        _, expansions = expand_abbreviations(request.input)
+        return CommentRephraseResponse(
+            success=True,
+            suggestions=suggestions,
+            corrections=CorrectionsInfo(terms_expanded=expansions),
+            original_input=request.input,
+            input_type=self._detect_input_type(request.input),
+            generation_mode="retrieval"
         )
-        return response.choices[0].message.content.strip()
     
-    async def _generate_gemini(self, prompt: str) -> str:
-        """Generate using Google Gemini API."""
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: self.gemini_model.generate_content(prompt)
+    def _rules_response(self, request: CommentRephraseRequest) -> CommentRephraseResponse:
+        """Suggestions from the offline rule-based rephraser."""
+        input_type = self._detect_input_type(request.input)
+        with stage_timer(PIPELINE, "rules"):
+            suggestions, expansions = rule_rephraser.suggest(
+                request.input,
+                request.status,
+                request.context,
+                request.num_suggestions,
+                input_type
+            )
+        return CommentRephraseResponse(
+            success=True,
+            suggestions=suggestions,
+            corrections=CorrectionsInfo(terms_expanded=expansions),
+            original_input=request.input,
+            input_type=input_type,
+            generation_mode="rules"
         )
-        return response.text.strip()
     
-    def _parse_suggestions(self, raw_response: str) -> List[CommentSuggestion]:
-        """Parse the AI response into structured suggestions."""
+    async def _rephrase_with_rules(
+        self,
+        request: CommentRephraseRequest,
+        outcome: str,
+        persist: bool = True
+    ) -> CommentRephraseResponse:
+        """Answer with rule-based suggestions, persisted like AI ones."""
+        response = self._rules_response(request)
+        if persist:
+            await self._save(request, response.input_type, response.suggestions, "rules")
+        set_log_context(outcome=outcome, suggestions=len(response.suggestions))
+        return response
+    
+    async def _save(
+        self,
+        request: CommentRephraseRequest,
+        input_type: str,
+        suggestions: List[CommentSuggestion],
+        provider: str,
+        usages: Sequence[TokenUsage] = ()
+    ) -> None:
+        """Persist the request, its suggestions and the provider call's token usage."""
+        with stage_timer(PIPELINE, "db_write", {"db.system": "sqlite"}):
+            # Deferred: SQLAlchemy is only loaded once something is persisted
+            from app.comments_db.models import CommentRequestDB, CommentSuggestionDB, TokenUsageDB
+            from app.comments_db.session import AsyncSessionLocal
+
+            async with AsyncSessionLocal() as db:
+                request_row = CommentRequestDB(
+                    input_text=request.input,
+                    status=request.status.value,
+                    input_type=input_type
+                )
+                db.add(request_row)
+                await db.flush()
+
+                for s in suggestions:
+                    db.add(
+                        CommentSuggestionDB(
+                            request_id=request_row.id,
+                            text=s.text,
+                            style=s.style,
+                            confidence=s.confidence,
+                            provider=provider
+                        )
+                    )
+
+                await db.commit()
+
+                if usages:
+                    # Own commit: a database created before the token_usage
+                    # table must not lose the suggestions over it
+                    try:
+                        for usage in usages:
+                            db.add(
+                                TokenUsageDB(
+                                    request_id=request_row.id,
+                                    pipeline=PIPELINE,
+                                    provider=usage.provider,
+                                    model=usage.model,
+                                    prompt_tokens=usage.prompt_tokens,
+                                    completion_tokens=usage.completion_tokens,
+                                    estimated=usage.estimated
+                                )
+                            )
+                        await db.commit()
+                    except Exception as e:
+                        await db.rollback()
+                        logger.warning(
+                            "Token usage not stored",
+                            extra={"error": str(e), "error_type": type(e).__name__},
+                        )
+    
+    def _suggestion_lines(self, on_suggestion: SuggestionCallback, limit: int = LABELED_LINES) -> LineCallback:
+        """Line callback that parses labelled lines and forwards up to `limit` suggestions."""
+        sent = []
+
+        async def on_line(line: str) -> None:
+            suggestion = self._parse_line(line)
+            if suggestion is not None and len(sent) < limit:
+                sent.append(suggestion)
+                await on_suggestion(suggestion)
+
+        return on_line
+    
+    async def _generate_with_ai(
+        self,
+        prompt: str,
+        priority_class: PriorityClass = PriorityClass.INTERACTIVE,
+        on_line: Optional[LineCallback] = None,
+        limits: Optional[GenerationLimits] = None
+    ) -> Tuple[str, TokenUsage]:
+        """
+        Generate response using configured AI provider.
+
+        With `on_line` the response is streamed and the stream is closed as
+        soon as the suggestions are complete, which also ends the generation.
+        """
+        limits = limits or GENERATION_LIMITS["polish"]
+        lines = _LineStream(on_line, limits.lines) if on_line is not None else None
+        text, usage = await providers.complete(
+            PIPELINE,
+            prompt,
+            system=SYSTEM_PROMPT,
+            max_tokens=limits.max_tokens,
+            stop=limits.stop,
+            priority_class=priority_class,
+            on_text=lines.feed if lines is not None else None
+        )
+        if lines is not None:
+            await lines.close()
+        return text, usage
+    
+    def _parse_line(self, line: str) -> Optional[CommentSuggestion]:
+        """Parse one labelled line of the AI response, or None if it has no label."""
+        line = line.strip()
+        for label, (style, confidence) in STYLE_LABELS.items():
+            if line.upper().startswith(label):
+                text = line[len(label):].strip()
+                # Clean up any remaining formatting
+                text = text.strip('*').strip()
+                if text:
+                    return CommentSuggestion(
+                        text=text,
+                        style=style,
+                        confidence=confidence
+                    )
+                return None
+        return None
+    
+    def _parse_suggestions(
+        self, raw_response: str, limit: int = LABELED_LINES, fallback: bool = True
+    ) -> List[CommentSuggestion]:
+        """
+        Parse the AI response into at most `limit` structured suggestions.
+
+        With `fallback`, an unlabelled response becomes one formal suggestion.
+        """
         suggestions = []
+        # Providers that ignore the stop sequence echo the marker; drop it and anything after
+        raw_response = raw_response.split(END_MARKER)[0]
         
-        lines = raw_response.strip().split('\n')
-        
-        style_map = {
-            "[FORMAL]": ("formal", 0.95),
-            "[CONCISE]": ("concise", 0.90),
-            "[FRIENDLY]": ("friendly", 0.85),
-        }
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            for label, (style, confidence) in style_map.items():
-                if line.upper().startswith(label):
-                    text = line[len(label):].strip()
-                    # Clean up any remaining formatting
-                    text = text.strip('*').strip()
-                    if text:
-                        suggestions.append(CommentSuggestion(
-                            text=text,
-                            style=style,
-                            confidence=confidence
-                        ))
-                    break
+        for line in raw_response.strip().split('\n'):
+            suggestion = self._parse_line(line)
+            if suggestion is not None:
+                suggestions.append(suggestion)
         
         # If parsing failed, treat entire response as one suggestion
-        if not suggestions and raw_response.strip():
+        if fallback and not suggestions and raw_response.strip():
             suggestions.append(CommentSuggestion(
                 text=raw_response.strip(),
                 style="formal",
                 confidence=0.8
             ))
         
-        return suggestions[:3]  # Return max 3 suggestions
+        return suggestions[:limit]
 
 
 # Singleton instance
@@ -5,8 +5,12 @@ Maps abbreviations and short terms to their full professional forms.
 
 import os
 import difflib
+from functools import lru_cache
+import logging
 from typing import Dict, List, Tuple
 
+logger = logging.getLogger(__name__)
+
 # Construction-specific abbreviations and terms
 TERM_EXPANSIONS = {
     # Structural terms
@@ -135,6 +139,19 @@ COMMON_ISSUES = {
     "cost": ["cost overrun", "budget issue", "variation", "additional cost"],
 }
 
+# Follow-up request per issue category, added to rejections and revision requests
+ISSUE_FOLLOW_UPS = {
+    "dimension": "Please verify the dimensions against the design drawings.",
+    "spacing": "Please check the spacing and cover against the structural details.",
+    "clash": "Please coordinate with the affected trades to resolve the conflict.",
+    "missing": "Please provide the missing information.",
+    "wrong": "Please correct the errors noted.",
+    "quality": "Please ensure the work meets the specified quality standard.",
+    "safety": "Please address the safety concern before work proceeds.",
+    "delay": "Please provide an updated schedule.",
+    "cost": "Please provide a cost breakdown for review.",
+}
+
 # Professional sentence structures by status
 SENTENCE_STRUCTURES = {
     "submit": [
@@ -218,13 +235,15 @@ def load_glossary():
         file_path = os.path.join(base_dir, "construction-terms.txt")
         
         if not os.path.exists(file_path):
-            print(f"⚠️ Glossary file not found at: {file_path}")
+            logger.warning("Glossary file not found", extra={"path": file_path})
             return
 
-        print(f"📚 Loading glossary from: {file_path}")
+        logger.debug("Loading glossary", extra={"path": file_path})
         with open(file_path, "r", encoding="utf-8") as f:
             lines = f.readlines()
             
+        # Built aside and swapped in whole, so a concurrent reader never sees a partial glossary
+        glossary = {}
         current_term = None
         for line in lines:
             line = line.strip()
@@ -235,16 +254,27 @@ def load_glossary():
             # Simple heuristic: If line is short (< 40 chars) and doesn't end with period
             if len(line) < 40 and not line.endswith("."):
                 current_term = line.lower()
-                if current_term not in GLOSSARY_CACHE:
-                    GLOSSARY_CACHE[current_term] = ""
+                if current_term not in glossary:
+                    glossary[current_term] = ""
             elif current_term:
                 # Append definition to current term
-                GLOSSARY_CACHE[current_term] += line + " "
+                glossary[current_term] += line + " "
                 
-        print(f"✅ Loaded {len(GLOSSARY_CACHE)} terms from glossary.")
+        GLOSSARY_CACHE = glossary
+        _close_matches.cache_clear()
+        logger.info("Glossary loaded", extra={"terms": len(GLOSSARY_CACHE)})
         
-    except Exception as e:
-        print(f"❌ Failed to load glossary: {e}")
+    except Exception:
+        logger.exception("Failed to load glossary")
+
+
+@lru_cache(maxsize=4096)
+def _close_matches(word: str) -> tuple:
+    """
+    Fuzzy glossary matches for one word. Cached: typeahead re-sends the
+    same leading words on every keystroke.
+    """
+    return tuple(difflib.get_close_matches(word, GLOSSARY_CACHE.keys(), n=2, cutoff=0.7))
 
 
 def find_relevant_glossary_terms(user_input: str, limit: int = 3) -> str:
@@ -266,9 +296,7 @@ def find_relevant_glossary_terms(user_input: str, limit: int = 3) -> str:
             continue
             
         # Get close matches from glossary keys
-        matches = difflib.get_close_matches(word, GLOSSARY_CACHE.keys(), n=2, cutoff=0.7)
-        
-        for match in matches:
+        for match in _close_matches(word):
             if match not in seen_terms:
                 definition = GLOSSARY_CACHE[match].strip()
                 # formatting: "Term: Definition"
@@ -285,3 +313,31 @@ def find_relevant_glossary_terms(user_input: str, limit: int = 3) -> str:
                 seen_terms.add(corrected.lower())
 
     return "\n".join(results[:limit])
+
+
+def rank_glossary_terms(user_input: str) -> List[Tuple[float, str]]:
+    """
+    Glossary snippets relevant to the input as (relevance, snippet), best first.
+
+    Same matching as `find_relevant_glossary_terms`; a fuzzy match scores
+    its similarity to the input word and a typo correction scores 1.0.
+    """
+    if not GLOSSARY_CACHE:
+        load_glossary()
+
+    scores: Dict[str, Tuple[float, str]] = {}
+    for word in user_input.split():
+        word = word.lower().strip(".,!?")
+        if len(word) < 2:
+            continue
+        for match in _close_matches(word):
+            score = difflib.SequenceMatcher(None, word, match).ratio()
+            if score > scores.get(match, (0.0, ""))[0]:
+                definition = GLOSSARY_CACHE[match].strip()
+                scores[match] = (score, f"- {match.title()}: {definition[:150]}...")
+        if word in TYPO_MAPPINGS:
+            corrected = TYPO_MAPPINGS[word]
+            if corrected.lower() not in scores:
+                scores[corrected.lower()] = (1.0, f"- {corrected}: (Corrected from '{word}')")
+
+    return sorted(scores.values(), key=lambda item: -item[0])
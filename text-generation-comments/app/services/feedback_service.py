@@ -1,5 +1,4 @@
-from app.comments_db.models import CommentFeedbackDB
-from app.comments_db.session import AsyncSessionLocal
+from textgen_common.tracing import start_span
 from typing import Optional
 
 async def save_feedback(
@@ -7,11 +6,15 @@ async def save_feedback(
     is_helpful: Optional[bool],
     comment: Optional[str] = None
 ):
-    async with AsyncSessionLocal() as db:
-        feedback = CommentFeedbackDB(
-            suggestion_id=suggestion_id,
-            is_helpful=is_helpful,
-            comment=comment
-        )
-        db.add(feedback)
-        await db.commit()
+    from app.comments_db.models import CommentFeedbackDB
+    from app.comments_db.session import AsyncSessionLocal
+
+    with start_span("db.feedback.insert", {"db.system": "sqlite", "db.table": "comment_feedback"}):
+        async with AsyncSessionLocal() as db:
+            feedback = CommentFeedbackDB(
+                suggestion_id=suggestion_id,
+                is_helpful=is_helpful,
+                comment=comment
+            )
+            db.add(feedback)
+            await db.commit()
@@ -0,0 +1,158 @@
+"""
+Near-duplicate review comments, from the MinHash fingerprints in
+`review_comment_fingerprints` (see app/comments_db/fingerprints.py).
+
+Both lookups only compare comments that share an LSH band, so their cost
+follows the number of similar comments rather than the size of the table
+or review. A comment still missing its fingerprint (written outside the
+ORM, not yet backfilled) is fingerprinted on the fly but cannot be found
+by others until the backfill has run.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from app.comments_db.fingerprints import BANDS, FINGERPRINT_TABLE, fingerprint_row, similarity
+from app.config import settings
+from app.models.review_comment_schemas import (
+    NearDuplicateHit,
+    NearDuplicatesResponse,
+    ReviewCommentCluster,
+    ReviewCommentClustersResponse,
+)
+from textgen_common.tracing import start_span
+
+_BANDS = ", ".join(f"f.band{i}" for i in range(BANDS))
+
+
+def _fingerprint(comment_id: int, text: str, stored: Tuple) -> Dict[str, object]:
+    """The stored fingerprint row (signature, band0...) or one computed from the text."""
+    if stored[0] is None and stored[1] is None:
+        return fingerprint_row(comment_id, text)
+    row = {"comment_id": comment_id, "signature": stored[0]}
+    row.update((f"band{i}", key) for i, key in enumerate(stored[1:]))
+    return row
+
+
+async def find_near_duplicates(
+    comment_id: int,
+    min_similarity: Optional[float] = None,
+    limit: int = 20
+) -> Optional[NearDuplicatesResponse]:
+    """Comments similar to `comment_id` in any review, most similar first; None if there is no such comment."""
+    from sqlalchemy import text
+
+    from app.comments_db.session import AsyncSessionLocal
+
+    if min_similarity is None:
+        min_similarity = settings.near_duplicate_min_similarity
+
+    with start_span("db.review_comment.near_duplicates", {"db.system": "sqlite", "db.table": FINGERPRINT_TABLE}):
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(
+                text(
+                    f"SELECT c.text, f.signature, {_BANDS} FROM review_comments c "
+                    f"LEFT JOIN {FINGERPRINT_TABLE} f ON f.comment_id = c.id WHERE c.id = :id"
+                ),
+                {"id": comment_id},
+            )).first()
+            if row is None:
+                return None
+            fingerprint = _fingerprint(comment_id, row[0], tuple(row[1:]))
+            if fingerprint["signature"] is None:
+                return NearDuplicatesResponse(comment_id=comment_id, results=[])
+
+            # One index lookup per band; SQLite unions them (multi-index OR)
+            buckets = " OR ".join(f"f.band{i} = :band{i}" for i in range(BANDS))
+            candidates = (await db.execute(
+                text(
+                    f"SELECT f.comment_id, f.signature, c.review_id, c.workflow_step, c.status, "
+                    f"c.user_name, c.text, c.created_at "
+                    f"FROM {FINGERPRINT_TABLE} f JOIN review_comments c ON c.id = f.comment_id "
+                    f"WHERE ({buckets}) AND f.comment_id != :comment_id LIMIT :candidates"
+                ),
+                dict(fingerprint, candidates=settings.near_duplicate_max_candidates),
+            )).all()
+
+    hits = []
+    for candidate in candidates:
+        score = similarity(fingerprint["signature"], candidate[1])
+        if score >= min_similarity:
+            hits.append(NearDuplicateHit(
+                id=candidate[0],
+                similarity=score,
+                review_id=candidate[2],
+                workflow_step=candidate[3],
+                status=candidate[4],
+                user_name=candidate[5],
+                text=candidate[6],
+                created_at=candidate[7],
+            ))
+    hits.sort(key=lambda hit: (-hit.similarity, hit.id))
+    return NearDuplicatesResponse(comment_id=comment_id, results=hits[:limit])
+
+
+async def cluster_review_comments(
+    review_id: int,
+    min_similarity: Optional[float] = None,
+    min_size: int = 2
+) -> ReviewCommentClustersResponse:
+    """
+    Groups of near-duplicate comments within a review, largest first.
+
+    Each comment is compared only with the first comment seen in each of
+    its LSH buckets, and similar pairs are merged with union-find, so a
+    review of n comments takes O(n * BANDS) comparisons. Similarity is
+    transitive within a cluster: A ~ B and B ~ C put A and C together.
+    """
+    from sqlalchemy import text
+
+    from app.comments_db.session import AsyncSessionLocal
+
+    if min_similarity is None:
+        min_similarity = settings.near_duplicate_min_similarity
+
+    with start_span("db.review_comment.clusters", {"db.system": "sqlite", "db.table": FINGERPRINT_TABLE}):
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                text(
+                    f"SELECT c.id, c.text, f.signature, {_BANDS} FROM review_comments c "
+                    f"LEFT JOIN {FINGERPRINT_TABLE} f ON f.comment_id = c.id "
+                    f"WHERE c.review_id = :review_id ORDER BY c.id"
+                ),
+                {"review_id": review_id},
+            )).all()
+
+    fingerprints = [_fingerprint(row[0], row[1], tuple(row[2:])) for row in rows]
+    parent = list(range(len(rows)))
+
+    def root(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    first_in_bucket: Dict[Tuple[int, int], int] = {}
+    for i, fingerprint in enumerate(fingerprints):
+        if fingerprint["signature"] is None:
+            continue
+        for band in range(BANDS):
+            j = first_in_bucket.setdefault((band, fingerprint[f"band{band}"]), i)
+            if j == i or root(i) == root(j):
+                continue
+            if similarity(fingerprint["signature"], fingerprints[j]["signature"]) >= min_similarity:
+                parent[root(i)] = root(j)
+
+    members: Dict[int, List[int]] = {}
+    for i in range(len(rows)):
+        members.setdefault(root(i), []).append(i)
+    clusters = [
+        ReviewCommentCluster(
+            size=len(group),
+            representative_id=rows[group[0]][0],
+            text=rows[group[0]][1],
+            comment_ids=[rows[i][0] for i in group],
+        )
+        for group in members.values()
+        if len(group) >= min_size
+    ]
+    clusters.sort(key=lambda cluster: (-cluster.size, cluster.representative_id))
+    return ReviewCommentClustersResponse(review_id=review_id, comments=len(rows), clusters=clusters)
@@ -0,0 +1,116 @@
+"""
+Prompt and completion budgets for rephrase calls.
+
+The rephrase prompt is mostly fixed instructions; what varies is the
+glossary context. Sending every matched glossary snippet, and letting the
+provider run to a generous `max_tokens`, pays for tokens that do not change
+the three suggestions. `PromptOptimizer` keeps the prompt within
+REPHRASE_PROMPT_TOKEN_BUDGET (estimated tokens, 0 disables):
+
+1. Glossary snippets are ranked by relevance (typo corrections, then
+   closest fuzzy matches) and added best first while they fit.
+2. If the instructions alone exceed the budget, the few-shot examples are
+   dropped first.
+
+`GENERATION_LIMITS` caps the completion of a LABELED_LINES-suggestion
+prompt per input type (an expanded two-word comment needs far fewer
+tokens than a polished paragraph) and is scaled to the number of
+suggestions asked for. The prompt asks the model to finish with
+END_MARKER, which is also sent as a stop sequence, and streamed calls stop
+reading once the requested suggestions are complete.
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple
+
+from app.config import settings
+from textgen_common.tokens import estimate_tokens
+
+END_MARKER = "[END]"
+LABELED_LINES = 3
+MIN_MAX_TOKENS = 64
+MAX_GLOSSARY_SNIPPETS = 3
+
+PromptBuilder = Callable[[str, bool], str]  # (glossary terms, few-shot) -> prompt
+
+
+@dataclass(frozen=True)
+class GenerationLimits:
+    """Completion limits sent with a provider call."""
+    max_tokens: int
+    stop: Tuple[str, ...] = (END_MARKER,)
+    lines: int = LABELED_LINES  # labelled suggestion lines expected
+
+
+GENERATION_LIMITS: Dict[str, GenerationLimits] = {
+    "expand": GenerationLimits(max_tokens=150),
+    "correct": GenerationLimits(max_tokens=200),
+    "polish": GenerationLimits(max_tokens=320),
+}
+
+
+@dataclass
+class OptimizedPrompt:
+    """A prompt fitted to the budget and the limits to generate with."""
+    prompt: str
+    prompt_tokens: int
+    limits: GenerationLimits
+    glossary_terms: int
+    few_shot: bool
+    glossary: str = ""  # the snippets included, to build sibling prompts with
+
+
+def generation_limits(input_type: str, suggestions: int = LABELED_LINES) -> GenerationLimits:
+    """Completion limits for `suggestions` labelled lines of the given input type."""
+    base = GENERATION_LIMITS.get(input_type, GENERATION_LIMITS["polish"])
+    if suggestions == base.lines:
+        return base
+    max_tokens = -(-base.max_tokens * suggestions // base.lines)
+    return GenerationLimits(max(max_tokens, MIN_MAX_TOKENS), base.stop, suggestions)
+
+
+class PromptOptimizer:
+    """Fits glossary context into a prompt token budget."""
+
+    def __init__(self, budget: int = 0):
+        self.budget = budget
+
+    def optimize(
+        self,
+        build: PromptBuilder,
+        ranked_glossary: List[Tuple[float, str]],
+        input_type: str,
+        suggestions: int = LABELED_LINES,
+    ) -> OptimizedPrompt:
+        """Build the largest prompt within budget from the ranked glossary snippets."""
+        limits = generation_limits(input_type, suggestions)
+        snippets = [snippet for _, snippet in ranked_glossary[:MAX_GLOSSARY_SNIPPETS]]
+        if self.budget <= 0:
+            glossary = "\n".join(snippets)
+            prompt = build(glossary, True)
+            return OptimizedPrompt(prompt, estimate_tokens(prompt), limits, len(snippets), True, glossary)
+
+        few_shot = True
+        used = estimate_tokens(build("", True))
+        if used > self.budget:
+            few_shot = False
+            used = estimate_tokens(build("", False))
+        if not snippets:
+            return OptimizedPrompt(build("", few_shot), used, limits, 0, few_shot)
+
+        # The glossary block is newline-separated from the rest of the prompt,
+        # so its tokens add up: price the block heading once, then each snippet
+        costs = [estimate_tokens(snippet) for snippet in snippets]
+        heading = estimate_tokens(build(snippets[0], few_shot)) - used - costs[0]
+        chosen: List[str] = []
+        for snippet, cost in zip(snippets, costs):
+            extra = cost + (0 if chosen else heading)
+            if used + extra > self.budget:
+                continue  # a shorter, less relevant snippet may still fit
+            chosen.append(snippet)
+            used += extra
+        glossary = "\n".join(chosen)
+        return OptimizedPrompt(build(glossary, few_shot), used, limits, len(chosen), few_shot, glossary)
+
+
+# Singleton instance
+prompt_optimizer = PromptOptimizer(settings.rephrase_prompt_token_budget)
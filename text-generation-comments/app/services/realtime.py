@@ -0,0 +1,225 @@
+"""
+Persistent WebSocket channel for the comment editor.
+
+One long-lived connection carries rephrase, typeahead and feedback requests,
+so the editor pays the TCP/TLS and HTTP overhead once instead of per
+keystroke. Every client message has an `id` that the server echoes on every
+reply, which lets many requests share the connection and finish out of
+order:
+
+    client: {"id": "7", "type": "rephrase", "payload": {...}, "priority_class": "interactive"}
+    server: {"id": "7", "type": "partial", "suggestion": {...}}     (0-3, as the provider streams)
+    server: {"id": "7", "type": "result", "payload": {...}}         (same body as the REST endpoint)
+    server: {"id": "7", "type": "error", "status": 422, "detail": ...}
+    client: {"id": "7", "type": "cancel"}  ->  server: {"id": "7", "type": "cancelled"}
+    client: {"id": "8", "type": "ping"}    ->  server: {"id": "8", "type": "pong"}
+
+Typeahead requests default their `session_id` to the connection, so a new
+keystroke supersedes the previous one exactly like the REST endpoint.
+
+Backpressure: the server always reads, so cancel and ping are handled at
+once. At most WS_MAX_IN_FLIGHT rephrase/typeahead requests per connection
+run at once; the rest wait for a slot, and past WS_MAX_PENDING open
+requests a new one is refused with 429. Replies go through a bounded queue
+of WS_SEND_QUEUE_SIZE messages; when a client reads slowly, the request
+tasks wait on the queue instead of buffering without limit. A disconnect
+cancels everything the connection still has running.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Dict, Optional, Set
+
+from fastapi import WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from app.config import settings
+from app.metrics import WS_CONNECTIONS, WS_MESSAGES
+from app.models.feedback_schemas import FeedbackRequest
+from app.models.rephrase_schemas import CommentRephraseRequest, CommentSuggestion, TypeaheadRequest
+from textgen_common.scheduler import OverloadedError, PriorityClass
+from textgen_common.serialization import dumps
+from app.services.comment_rephraser import comment_rephraser
+from app.services.feedback_service import save_feedback
+from app.services.typeahead import typeahead_service
+
+REQUEST_TYPES = ("rephrase", "typeahead", "feedback")
+CONTROL_TYPES = ("cancel", "ping")
+# Requests that call the provider and so hold one of the WS_MAX_IN_FLIGHT slots
+SLOT_TYPES = ("rephrase", "typeahead")
+
+logger = logging.getLogger(__name__)
+
+
+class _RequestError(Exception):
+    """A request failed in a way the client should see as an error reply."""
+
+    def __init__(self, status: int, detail: Any):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+class RealtimeConnection:
+    """Multiplexes requests over one WebSocket with bounded concurrency and buffering."""
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.connection_id = uuid.uuid4().hex
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=settings.ws_send_queue_size)
+        self.slots = asyncio.Semaphore(settings.ws_max_in_flight)
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.cancelled: Set[str] = set()  # ids the client cancelled, as opposed to a disconnect
+        self.handled = 0
+
+    async def serve(self) -> None:
+        """Accept the connection and handle messages until the client leaves."""
+        await self.websocket.accept()
+        WS_CONNECTIONS.inc()
+        start = time.perf_counter()
+        sender = asyncio.ensure_future(self._send_loop())
+        try:
+            while True:
+                try:
+                    raw = await self.websocket.receive_text()
+                except WebSocketDisconnect:
+                    break
+                self._dispatch(raw)
+        finally:
+            for task in self.tasks.values():
+                task.cancel()
+            sender.cancel()
+            WS_CONNECTIONS.dec()
+            logger.info(
+                "WebSocket closed",
+                extra={
+                    "connection_id": self.connection_id,
+                    "requests": self.handled,
+                    "abandoned": len(self.tasks),
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                },
+            )
+
+    def _dispatch(self, raw: str) -> None:
+        """Answer a control message, or start a task for a request."""
+        try:
+            message = json.loads(raw)
+            message_id = str(message["id"])
+            kind = message["type"]
+        except (ValueError, KeyError, TypeError):
+            self._post_nowait({"id": None, "type": "error", "status": 400, "detail": "Invalid message"})
+            return
+        WS_MESSAGES.labels("in", kind if kind in (*REQUEST_TYPES, *CONTROL_TYPES) else "unknown").inc()
+
+        if kind == "cancel":
+            task = self.tasks.get(message_id)
+            if task is not None:
+                self.cancelled.add(message_id)
+                task.cancel()
+            return
+        if kind == "ping":
+            self._post_nowait({"id": message_id, "type": "pong"})
+            return
+        if kind not in REQUEST_TYPES:
+            self._post_nowait(self._error(message_id, 400, f"Unknown message type: {kind}"))
+            return
+        if message_id in self.tasks:
+            self._post_nowait(self._error(message_id, 409, "A request with this id is in flight"))
+            return
+        if len(self.tasks) >= settings.ws_max_pending:
+            self._post_nowait(self._error(message_id, 429, "Too many open requests on this connection"))
+            return
+
+        self.tasks[message_id] = asyncio.ensure_future(self._handle(message_id, kind, message))
+        self.handled += 1
+
+    async def _handle(self, message_id: str, kind: str, message: dict) -> None:
+        try:
+            try:
+                priority_class = self._priority_class(message)
+                payload = message.get("payload") or {}
+                handler = getattr(self, f"_{kind}")
+                if kind in SLOT_TYPES:
+                    async with self.slots:
+                        result = await handler(message_id, payload, priority_class)
+                else:
+                    result = await handler(message_id, payload, priority_class)
+                reply = {"id": message_id, "type": "result", "payload": result}
+            except ValidationError as e:
+                reply = self._error(message_id, 422, json.loads(e.json()))
+            except ValueError as e:
+                reply = self._error(message_id, 400, str(e))
+            except OverloadedError as e:
+                reply = self._error(message_id, 503, str(e))
+                reply["retry_after"] = e.retry_after
+            except _RequestError as e:
+                reply = self._error(message_id, e.status, e.detail)
+            except asyncio.CancelledError:
+                if message_id not in self.cancelled:
+                    raise  # disconnected: nobody to tell
+                reply = {"id": message_id, "type": "cancelled"}
+            except Exception as e:
+                logger.exception("WebSocket request failed", extra={"type": kind})
+                reply = self._error(message_id, 500, str(e))
+            await self._post(reply)
+        finally:
+            del self.tasks[message_id]
+            self.cancelled.discard(message_id)
+
+    def _priority_class(self, message: dict) -> PriorityClass:
+        try:
+            return PriorityClass(message.get("priority_class") or PriorityClass.INTERACTIVE)
+        except ValueError:
+            raise _RequestError(422, f"Invalid priority_class: {message.get('priority_class')}")
+
+    async def _rephrase(self, message_id: str, payload: dict, priority_class: PriorityClass) -> dict:
+        request = CommentRephraseRequest.model_validate(payload)
+        response = await comment_rephraser.rephrase(
+            request, priority_class, on_suggestion=self._partials(message_id)
+        )
+        return response.model_dump(mode="json")
+
+    async def _typeahead(self, message_id: str, payload: dict, priority_class: PriorityClass) -> dict:
+        request = TypeaheadRequest.model_validate({"session_id": self.connection_id, **payload})
+        response = await typeahead_service.suggest(
+            request, priority_class, on_suggestion=self._partials(message_id)
+        )
+        return response.model_dump(mode="json")
+
+    async def _feedback(self, message_id: str, payload: dict, priority_class: PriorityClass) -> dict:
+        request = FeedbackRequest.model_validate(payload)
+        try:
+            await save_feedback(request.suggestion_id, request.is_helpful, request.comment)
+        except Exception as e:
+            raise _RequestError(500, str(e))
+        return {"success": True}
+
+    def _partials(self, message_id: str):
+        async def on_suggestion(suggestion: CommentSuggestion) -> None:
+            await self._post({"id": message_id, "type": "partial", "suggestion": suggestion.model_dump()})
+        return on_suggestion
+
+    def _error(self, message_id: Optional[str], status: int, detail: Any) -> dict:
+        return {"id": message_id, "type": "error", "status": status, "detail": detail}
+
+    async def _post(self, reply: dict) -> None:
+        """Queue a reply, waiting while the client is behind on reading."""
+        await self.outbox.put(reply)
+
+    def _post_nowait(self, reply: dict) -> None:
+        """Queue a protocol error from the read loop; dropped if the client is not reading."""
+        try:
+            self.outbox.put_nowait(reply)
+        except asyncio.QueueFull:
+            pass
+
+    async def _send_loop(self) -> None:
+        while True:
+            reply = await self.outbox.get()
+            try:
+                await self.websocket.send_text(dumps(reply).decode("utf-8"))
+            except Exception:
+                return  # the read loop sees the disconnect and cleans up
+            WS_MESSAGES.labels("out", reply["type"]).inc()
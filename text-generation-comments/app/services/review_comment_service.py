@@ -1,17 +1,173 @@
-from app.comments_db.session import AsyncSessionLocal
-from app.comments_db.models import ReviewCommentDB
-from app.models.review_comment_schemas import ReviewCommentRequest
+import base64
+import html
+import json
+import re
+from typing import Optional, Tuple
+
+from app.comments_db.search import FTS_TABLE, SearchIndexMissingError
+from app.config import settings
+from app.models.review_comment_schemas import (
+    ReviewCommentHit,
+    ReviewCommentRequest,
+    ReviewCommentSearchResponse,
+)
+from textgen_common.tracing import start_span
+
+# "quoted phrase" or a bare term; words inside either
+_QUERY_PARTS = re.compile(r'"([^"]*)"|(\S+)')
+_WORDS = re.compile(r"\w+")
+MAX_QUERY_TERMS = 16
+SNIPPET_TOKENS = 16
+# Control characters mark matches in snippet() so the text can be escaped before adding <mark>
+_MARK_START, _MARK_END = "\x02", "\x03"
 
 
 async def add_review_comment(request: ReviewCommentRequest):
-    async with AsyncSessionLocal() as db:
-        comment = ReviewCommentDB(
-            review_id=request.review_id,
-            workflow_step=request.workflow_step,
-            user_name=request.user_name,
-            status=request.status,
-            text=request.text,
-            parent_id=request.parent_id
+    from app.comments_db.session import AsyncSessionLocal
+    from app.comments_db.models import ReviewCommentDB
+
+    with start_span("db.review_comment.insert", {"db.system": "sqlite", "db.table": "review_comments"}):
+        async with AsyncSessionLocal() as db:
+            comment = ReviewCommentDB(
+                review_id=request.review_id,
+                workflow_step=request.workflow_step,
+                user_name=request.user_name,
+                status=request.status,
+                text=request.text,
+                parent_id=request.parent_id
+            )
+            db.add(comment)
+            await db.commit()
+
+
+def build_match(query: str) -> str:
+    """
+    FTS5 MATCH expression for a free-text query.
+
+    Every term must occur; "quoted words" must occur as a phrase and a term
+    ending in * matches as a prefix. Operators and punctuation are treated
+    as text, so user input cannot produce an FTS5 syntax error.
+    """
+    parts = []
+    for phrase, term in _QUERY_PARTS.findall(query):
+        words = _WORDS.findall(phrase or term)
+        if not words:
+            continue
+        expression = '"' + " ".join(words) + '"'
+        if term.endswith("*"):
+            expression += "*"
+        parts.append(expression)
+    return " ".join(parts[:MAX_QUERY_TERMS])
+
+
+def _encode_cursor(score: float, comment_id: int, floor: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([score, comment_id, floor]).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, int, int]:
+    try:
+        score, comment_id, floor = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(score), int(comment_id), int(floor)
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError("Invalid cursor")
+
+
+def _snippet(marked: str) -> str:
+    return html.escape(marked).replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+
+async def search_review_comments(
+    query: str,
+    review_id: Optional[int] = None,
+    status: Optional[str] = None,
+    workflow_step: Optional[int] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> ReviewCommentSearchResponse:
+    """
+    Review comments matching `query`, best BM25 score first.
+
+    Without a review_id, only the SEARCH_MAX_CANDIDATES most recent matches
+    are ranked (the response's `candidate_limit` says so): the first page finds the id of the oldest of them (walking
+    the index newest first, without scoring) and later pages keep it in the
+    cursor. Pages are keyset-paginated on (score, id), so deep pages cost the
+    same as the first. Raises ValueError for a query without words or an
+    invalid cursor, SearchIndexMissingError before the index is built.
+    """
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+
+    from app.comments_db.session import AsyncSessionLocal
+
+    match = build_match(query)
+    if not match:
+        raise ValueError("Search query has no words")
+
+    conditions = [f"{FTS_TABLE} MATCH :match"]
+    params = {"match": match, "limit": limit + 1}
+    if review_id is not None:
+        # A review has few comments: start from them rather than from the matches
+        conditions.append(f"{FTS_TABLE}.rowid IN (SELECT id FROM review_comments WHERE review_id = :review_id)")
+        params["review_id"] = review_id
+    for column, value in (("status", status), ("workflow_step", workflow_step)):
+        if value is not None:
+            conditions.append(f"c.{column} = :{column}")
+            params[column] = value
+    floor = 0
+    if cursor:
+        params["score"], params["after"], floor = _decode_cursor(cursor)
+    joined = f"FROM {FTS_TABLE} JOIN review_comments c ON c.id = {FTS_TABLE}.rowid"
+
+    try:
+        with start_span("db.review_comment.search", {"db.system": "sqlite", "db.table": FTS_TABLE}):
+            async with AsyncSessionLocal() as db:
+                if not cursor and review_id is None and settings.search_max_candidates > 0:
+                    floor = (await db.execute(
+                        text(
+                            f"SELECT {FTS_TABLE}.rowid {joined} WHERE {' AND '.join(conditions)} "
+                            f"ORDER BY {FTS_TABLE}.rowid DESC LIMIT 1 OFFSET :candidates"
+                        ),
+                        dict(params, candidates=settings.search_max_candidates - 1),
+                    )).scalar() or 0
+
+                if floor:
+                    conditions.append(f"{FTS_TABLE}.rowid >= :floor")
+                    params["floor"] = floor
+                if cursor:
+                    conditions.append(f"({FTS_TABLE}.rank, {FTS_TABLE}.rowid) > (:score, :after)")
+                rows = (await db.execute(
+                    text(
+                        f"SELECT {FTS_TABLE}.rowid, {FTS_TABLE}.rank, c.review_id, c.workflow_step, c.status, "
+                        f"c.user_name, c.created_at, "
+                        f"snippet({FTS_TABLE}, 0, char(2), char(3), '…', {SNIPPET_TOKENS}) "
+                        f"{joined} WHERE {' AND '.join(conditions)} "
+                        f"ORDER BY {FTS_TABLE}.rank, {FTS_TABLE}.rowid LIMIT :limit"
+                    ),
+                    params,
+                )).all()
+    except OperationalError as e:
+        if f"no such table: {FTS_TABLE}" in str(e):
+            raise SearchIndexMissingError() from e
+        raise
+
+    results = [
+        ReviewCommentHit(
+            id=row[0],
+            score=row[1],
+            review_id=row[2],
+            workflow_step=row[3],
+            status=row[4],
+            user_name=row[5],
+            created_at=row[6],
+            snippet=_snippet(row[7]),
         )
-        db.add(comment)
-        await db.commit()
+        for row in rows[:limit]
+    ]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = _encode_cursor(results[-1].score, results[-1].id, floor)
+    return ReviewCommentSearchResponse(
+        results=results,
+        next_cursor=next_cursor,
+        candidate_limit=settings.search_max_candidates if floor else None,
+    )
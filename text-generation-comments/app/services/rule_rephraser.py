@@ -0,0 +1,300 @@
+"""
+Offline rule-based comment rephraser.
+
+Builds formal, friendly and concise suggestions from the construction term
+tables alone: abbreviations and typos are expanded, a verdict word
+("wrong", "missing", "ok", ...) is turned into a proper clause - keeping a
+negation ("not ok") and the comment's own verb ("is wrong") - and the
+result is slotted into the status-specific SENTENCE_STRUCTURES and
+TONE_TEMPLATES phrases. For rejections and revision requests the issue
+category (COMMON_ISSUES) adds a matching follow-up to the formal wording.
+No network, no model, same output for the same input - used when no AI
+provider is configured, when the provider fails, and when the request asks
+for `generation_mode=rules`.
+"""
+import re
+import zlib
+from typing import List, Optional, Tuple
+
+from app.models.rephrase_schemas import CommentSuggestion, ReviewStatus, WorkflowContext
+from app.services.construction_terms import (
+    ISSUE_FOLLOW_UPS,
+    SENTENCE_STRUCTURES,
+    TONE_TEMPLATES,
+    detect_issue_category,
+    expand_abbreviations,
+)
+
+RULES_CONFIDENCE = 0.6
+
+# Verdict word -> (predicate for a singular subject, adjective, adverb for a
+# verdict on work done - "site cleared ok" - or None when there is none)
+_VERDICTS = {
+    "wrong": ("is incorrect", "incorrect", "incorrectly"),
+    "incorrect": ("is incorrect", "incorrect", "incorrectly"),
+    "correct": ("is correct", "correct", "correctly"),
+    "error": ("contains errors", "erroneous", None),
+    "errors": ("contains errors", "erroneous", None),
+    "bad": ("is unsatisfactory", "unsatisfactory", "unsatisfactorily"),
+    "bd": ("is unsatisfactory", "unsatisfactory", "unsatisfactorily"),
+    "poor": ("is unsatisfactory", "unsatisfactory", "unsatisfactorily"),
+    "missing": ("is missing", "missing", None),
+    "incomplete": ("is incomplete", "incomplete", None),
+    "unclear": ("is unclear", "unclear", None),
+    "insufficient": ("is insufficient", "insufficient", None),
+    "ok": ("is acceptable", "acceptable", "satisfactorily"),
+    "okay": ("is acceptable", "acceptable", "satisfactorily"),
+    "good": ("is acceptable", "acceptable", "satisfactorily"),
+    "fine": ("is acceptable", "acceptable", "satisfactorily"),
+    "approved": ("has been approved", "approved", None),
+    "done": ("has been completed", "completed", None),
+    "complete": ("is complete", "completed", None),
+    "completed": ("has been completed", "completed", None),
+}
+_PLURAL_VERBS = {"is": "are", "has": "have", "contains": "contain"}
+_PREPOSITIONS = {"on", "in", "at", "for", "of", "to", "with", "per", "from", "near", "along"}
+_DETERMINERS = {"the", "a", "an", "this", "that", "these", "those", "all", "some", "no", "our", "your"}
+_NEGATORS = {"not", "no", "never"}
+_COPULAS = {"is", "are", "was", "were"}
+_NEGATED_COPULAS = {
+    "isn't": "is", "isnt": "is", "aren't": "are", "arent": "are",
+    "wasn't": "was", "wasnt": "was", "weren't": "were", "werent": "were",
+}
+_CONJUNCTIONS = {"and", "but"}
+# Words ending in -ed that are not past participles
+_NOT_PARTICIPLES = {"embed", "speed", "bleed", "breed", "steed"}
+# Stands in for the subject of a negated verdict with nothing else ("not ok")
+_DEFAULT_SUBJECT = ["the", "submission"]
+
+# What a reason-less comment means for each status
+_DEFAULT_REASONS = {
+    "reject": "the submission does not meet the requirements",
+    "revise": "the submission needs minor updates",
+}
+_FRIENDLY_CLOSINGS = {
+    "submit": "Thank you for the submission.",
+    "reject": "Please revise and resubmit when ready.",
+    "revise": "Thank you, and please resubmit once updated.",
+}
+
+_SPACE_BEFORE_PUNCT = re.compile(r" ([.,:])")
+_REPEATED_STOPS = re.compile(r"[.:]+\.")
+_SENTENCE_START = re.compile(r"([.!?] )([a-z])")
+
+
+def _word(word: str) -> str:
+    return word.lower().strip(",;")
+
+
+def _is_participle(word: str) -> bool:
+    word = _word(word)
+    return len(word) > 4 and word.endswith("ed") and word not in _NOT_PARTICIPLES
+
+
+def _negate(predicate: str, negator: str) -> str:
+    """'is acceptable' -> 'is not acceptable', 'contains errors' -> 'contains no errors'."""
+    verb, _, rest = predicate.partition(" ")
+    if verb in ("contains", "contain"):
+        return f"{verb} no {rest}"
+    return f"{verb} {'never' if negator == 'never' else 'not'} {rest}"
+
+
+def _is_plural(words: List[str]) -> bool:
+    """Guess number from the head noun: the last word before a preposition."""
+    head = words[0]
+    for word in words:
+        if word.lower() in _PREPOSITIONS:
+            break
+        head = word
+    head = head.lower()
+    return head.endswith("s") and not head.endswith(("ss", "us", "is"))
+
+
+def _sentence(text: str) -> str:
+    """Tidy spacing and punctuation and capitalize each sentence."""
+    text = " ".join(text.split())
+    if not text:
+        return text
+    # The substitutions dominate the cost; skip the ones with nothing to do
+    if " ." in text or " ," in text or " :" in text:
+        text = _SPACE_BEFORE_PUNCT.sub(r"\1", text)
+    if ".." in text or ":." in text:
+        text = _REPEATED_STOPS.sub(".", text)
+    if not text.endswith((".", "!", "?")):
+        text += "."
+    if ". " in text or "! " in text or "? " in text:
+        text = _SENTENCE_START.sub(lambda m: m.group(1) + m.group(2).upper(), text)
+    return text[0].upper() + text[1:]
+
+
+class RuleRephraser:
+    """Deterministic rephrasing from sentence structures and tone templates."""
+
+    def _parse(self, expanded_text: str, input_type: str) -> Tuple[str, str, bool]:
+        """
+        Split the comment into a clause ("the column spacing is incorrect"),
+        a noun phrase ("incorrect column spacing") and whether the verdict is
+        negated ("not ok"). Without a verdict word the text is kept as the
+        clause and there is no noun phrase.
+        """
+        text = expanded_text.strip().rstrip(".!?")
+        words = text.split()
+        if not words:
+            return "", "", False
+        # Longer inputs are already sentences; keep their wording
+        parsed = self._clause(words) if input_type != "polish" else None
+        return parsed if parsed is not None else (text, "", False)
+
+    def _clause(self, words: List[str]) -> Optional[Tuple[str, str, bool]]:
+        """Clause, noun phrase and negation for the first verdict in `words`, or None without one."""
+        verdict_at = next((i for i, word in enumerate(words) if _word(word) in _VERDICTS), None)
+        if verdict_at is None:
+            return None
+        predicate, adjective, adverb = _VERDICTS[_word(words[verdict_at])]
+
+        # "is not wrong", "isn't ok", "never done": the words before the verdict
+        start, negator, copula = verdict_at, None, None
+        if start and _word(words[start - 1]) in _NEGATORS:
+            start -= 1
+            negator = _word(words[start])
+        if start and _word(words[start - 1]) in _NEGATED_COPULAS:
+            start -= 1
+            copula, negator = _NEGATED_COPULAS[_word(words[start])], negator or "not"
+        elif start and _word(words[start - 1]) in _COPULAS:
+            start -= 1
+            copula = _word(words[start])
+        subject, tail = words[:start], words[verdict_at + 1:]
+
+        # "spacing ok and the reinforcement is wrong": the second statement gets its own verdict
+        following = None
+        if len(tail) > 1 and _word(tail[0]) in _CONJUNCTIONS:
+            following = self._clause(tail[1:])
+            if following is not None:
+                following = (tail[0], *following)
+                tail = []
+        if not subject:
+            # "missing dims on dwg": the verdict leads, the rest is the subject
+            subject, tail = tail, []
+        if not subject:
+            if negator is None:
+                # A bare verdict ("approved") is what the status already says
+                return following[1:] if following else ("", "", False)
+            subject = _DEFAULT_SUBJECT
+
+        negated = negator is not None
+        if copula is None and len(subject) > 1 and _is_participle(subject[-1]):
+            # "site cleared ok": the verdict is on the work, not the noun
+            subject, done = subject[:-1], subject[-1]
+            plural = _is_plural(subject)
+            predicate = f"{'have' if plural else 'has'} been {done}"
+            if adverb and not negated:
+                predicate = f"{predicate} {adverb}"
+            else:
+                state = f"{'not ' if negated else ''}{adjective}"
+                predicate = f"{predicate} and {'are' if plural else 'is'} {state}"
+            noun_phrase = ""
+        else:
+            if copula is not None:
+                # Keep the comment's own verb: "the reinforcement is wrong"
+                predicate = f"{copula} {adjective}"
+            elif _is_plural(subject):
+                verb, _, rest = predicate.partition(" ")
+                predicate = f"{_PLURAL_VERBS.get(verb, verb)} {rest}".strip()
+            if negated:
+                predicate = _negate(predicate, negator)
+            described = subject[1:] if _word(subject[0]) in ("the", "a", "an") and len(subject) > 1 else subject
+            noun_phrase = "" if negated else " ".join([adjective, *described, *tail])
+
+        noun = " ".join(subject)
+        if _word(subject[0]) not in _DETERMINERS:
+            noun = f"the {noun}"
+        clause = " ".join([noun, predicate, *tail])
+        if following is not None:
+            conjunction, following_clause, _, following_negated = following
+            clause = f"{clause} {conjunction} {following_clause}"
+            noun_phrase = ""
+            negated = negated or following_negated
+        return clause, noun_phrase, negated
+
+    def _friendly(self, prefix: str, status: str, document: str, action: str, clause: str, noun_phrase: str) -> str:
+        """Attach the comment to a tone prefix according to how the prefix ends."""
+        if prefix.endswith(("due to", "because")) and clause and not noun_phrase:
+            # A bare fragment does not read as a cause; list it instead
+            body = f"{prefix.rsplit(' ', 2 if prefix.endswith('due to') else 1)[0]}: {clause}"
+        elif prefix.endswith("due to"):
+            body = f"{prefix} {noun_phrase or clause}"
+        elif prefix.endswith((":", ",", "because")):
+            body = f"{prefix} {clause or f'the {document} is {action}'}"
+        else:
+            # Verb stems: "The document has been reviewed and" / "The submitted document"
+            stem = f"{prefix} {action}" if prefix.endswith(" and") else f"{prefix} is {action}"
+            body = f"{stem}. {clause}" if clause else stem
+        return _sentence(f"{_sentence(body)} {_FRIENDLY_CLOSINGS[status]}")
+
+    def suggest(
+        self,
+        input_text: str,
+        status: ReviewStatus,
+        context: Optional[WorkflowContext] = None,
+        num_suggestions: int = 3,
+        input_type: str = "expand",
+    ) -> Tuple[List[CommentSuggestion], List[str]]:
+        """
+        Return up to `num_suggestions` suggestions (formal, friendly, concise,
+        then further formal/friendly variants) and the expansions made.
+        """
+        status_key = status.value
+        expanded_text, expansions = expand_abbreviations(input_text)
+        clause, noun_phrase, negated = self._parse(expanded_text, input_type)
+        reason = clause or _DEFAULT_REASONS.get(status_key, "")
+        document = (context.entity_type if context and context.entity_type else "document").lower()
+
+        # Stable per-input choice among the phrase variants
+        seed = zlib.crc32(input_text.strip().lower().encode("utf-8"))
+        tone = TONE_TEMPLATES[status_key]
+        prefixes = tone["prefix_phrases"]
+        action = tone["action_words"][seed % len(tone["action_words"])]
+
+        # Rejections and revision requests say what to do about the kind of issue;
+        # a negated verdict ("no errors") is not an issue
+        follow_up = ""
+        if status_key != "submit" and not negated:
+            follow_up = ISSUE_FOLLOW_UPS.get(detect_issue_category(expanded_text), "")
+
+        structures = SENTENCE_STRUCTURES[status_key]
+        concise_structure = min(structures, key=len)
+        formal_structures = [s for s in structures if s is not concise_structure]
+
+        def render(structure: str) -> str:
+            # "{document} has been reviewed..." needs its article
+            subject = f"the {document}" if structure.startswith("{document}") else document
+            return _sentence(structure.format(document=subject, details=_sentence(clause), reason=reason))
+
+        def formal(structure: str) -> str:
+            return _sentence(f"{render(structure)} {follow_up}") if follow_up else render(structure)
+
+        candidates = [
+            ("formal", formal(formal_structures[0])),
+            ("friendly", self._friendly(
+                prefixes[seed % len(prefixes)], status_key, document, action, reason, noun_phrase
+            )),
+            ("concise", render(concise_structure)),
+        ]
+        for i, structure in enumerate(formal_structures[1:], start=1):
+            candidates.append(("formal", formal(structure)))
+            candidates.append(("friendly", self._friendly(
+                prefixes[(seed + i) % len(prefixes)], status_key, document, action, reason, noun_phrase
+            )))
+
+        suggestions, seen = [], set()
+        for style, text in candidates:
+            if text and text not in seen:
+                seen.add(text)
+                suggestions.append(CommentSuggestion(text=text, style=style, confidence=RULES_CONFIDENCE))
+            if len(suggestions) == num_suggestions:
+                break
+        return suggestions, expansions
+
+
+# Singleton instance
+rule_rephraser = RuleRephraser()
@@ -0,0 +1,361 @@
+"""
+Retrieval index over past AI suggestions.
+
+Every AI-generated suggestion is stored with its request, and
+`comment_feedback` records which ones reviewers found helpful. This index
+maps (expanded input, status) to those suggestions, so a near-duplicate of
+an input the provider has already answered is served from the database
+without an LLM call.
+
+Inputs are vectorized as TF-IDF over character 3-grams hashed into
+RETRIEVAL_DIMENSIONS buckets, L2-normalized and kept as columns of one
+NumPy matrix (one row per n-gram bucket). A query only has a few dozen
+non-zero buckets, so cosine similarity against every entry reads just
+those rows instead of the whole matrix, followed by a top-k partition. A candidate must reach RETRIEVAL_MIN_SIMILARITY; among
+those, entries whose suggestions were rated helpful rank higher
+(RETRIEVAL_HELPFUL_BOOST) and suggestions rated unhelpful are never served.
+
+The index starts empty. `build` fills it from the newest
+RETRIEVAL_MAX_ENTRIES suggestions (and their feedback) in a background
+thread: the startup warm-up runs it, or the first lookup starts it, and
+lookups skip retrieval until it is done, so no request waits for it. From
+then on the index follows the tables incrementally: `refresh` reads only
+suggestion and feedback rows with ids above the last ones seen, at most
+once per RETRIEVAL_REFRESH_SECONDS, so rows written by other workers are
+picked up too. Entry weights use the IDF of the time they were added and
+are recomputed whenever the index has doubled since the last full
+weighting. Beyond RETRIEVAL_MAX_ENTRIES the oldest quarter is dropped; the
+matrix takes RETRIEVAL_DIMENSIONS x RETRIEVAL_MAX_ENTRIES x 4 bytes per
+worker at most (20 MB with the defaults).
+"""
+import asyncio
+import logging
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.metrics import RETRIEVAL_INDEX_SIZE
+from app.models.rephrase_schemas import CommentSuggestion, ReviewStatus
+from app.services.construction_terms import expand_abbreviations
+
+NGRAM = 3
+# Providers whose suggestions are not worth serving again
+EXCLUDED_PROVIDERS = ("rules", "retrieval")
+_EXCLUDED = ", ".join(f"'{provider}'" for provider in EXCLUDED_PROVIDERS)
+_STATUS_CODES = {status.value: code for code, status in enumerate(ReviewStatus)}
+_NON_WORD = re.compile(r"[^\w]+")
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(text: str) -> str:
+    """Expanded, lowercased form without punctuation, used as the index key."""
+    expanded_text, _ = expand_abbreviations(text)
+    return _NON_WORD.sub(" ", expanded_text.lower()).strip()
+
+
+@dataclass
+class _Entry:
+    """One distinct (normalized input, status) and the suggestions made for it."""
+    key: str
+    status: str
+    buckets: np.ndarray  # n-gram buckets, kept to reweight when the IDF changes
+    counts: np.ndarray
+    suggestions: Dict[str, Tuple[int, str, float]] = field(default_factory=dict)  # text -> (id, style, confidence)
+
+
+class SuggestionIndex:
+    """Character n-gram TF-IDF index with cosine top-k and feedback boosting."""
+
+    def __init__(self, dimensions: int = 1024, max_entries: int = 5000):
+        self.dimensions = dimensions
+        self.max_entries = max_entries
+        self._matrix = np.zeros((dimensions, 0), dtype=np.float32)  # bucket x entry
+        self._statuses = np.zeros(0, dtype=np.int8)
+        self._df = np.zeros(dimensions, dtype=np.float32)
+        self._size = 0
+        self._weighted_at = 0
+        self._entries: List[_Entry] = []
+        self._rows: Dict[Tuple[str, str], int] = {}
+        self._feedback: Dict[int, List[int]] = {}  # suggestion id -> [helpful, unhelpful]
+        self.last_suggestion_id = 0
+        self.last_feedback_id = 0
+        self._refreshed_at = 0.0
+        self._refresh_lock = asyncio.Lock()
+        self.ready = False
+        self._build_lock = threading.Lock()
+        self._build_thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _terms(self, key: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Distinct n-gram buckets of a key and their counts."""
+        padded = f" {key} "
+        buckets = [
+            zlib.crc32(padded[i:i + NGRAM].encode("utf-8")) % self.dimensions
+            for i in range(len(padded) - NGRAM + 1)
+        ]
+        unique, counts = np.unique(buckets, return_counts=True)
+        return unique, counts.astype(np.float32)
+
+    def _idf(self) -> np.ndarray:
+        return np.log((1.0 + self._size) / (1.0 + self._df)) + 1.0
+
+    def _weigh(self, buckets: np.ndarray, counts: np.ndarray, idf: np.ndarray) -> np.ndarray:
+        """L2-normalized TF-IDF weights of the given buckets."""
+        weights = np.log1p(counts) * idf[buckets]
+        return weights / max(float(np.linalg.norm(weights)), 1e-12)
+
+    def _grow(self) -> None:
+        capacity = min(max(64, self._matrix.shape[1] * 2), self.max_entries)
+        matrix = np.zeros((self.dimensions, capacity), dtype=np.float32)
+        matrix[:, :self._size] = self._matrix[:, :self._size]
+        self._matrix = matrix
+        statuses = np.zeros(capacity, dtype=np.int8)
+        statuses[:self._size] = self._statuses[:self._size]
+        self._statuses = statuses
+
+    def _evict(self) -> None:
+        """Drop the oldest quarter of the entries."""
+        keep = self._size - self._size // 4
+        start = self._size - keep
+        self._statuses[:keep] = self._statuses[start:self._size]
+        self._matrix[:, keep:self._size] = 0.0  # freed columns are reused by `add`
+        self._entries = self._entries[start:]
+        self._size = keep
+        self._rows = {(e.key, e.status): row for row, e in enumerate(self._entries)}
+        self._df[:] = 0
+        for entry in self._entries:
+            self._df[entry.buckets] += 1
+        self._reweight()
+
+    def _reweight(self) -> None:
+        """Recompute every column with the current IDF."""
+        idf = self._idf()
+        self._matrix[:, :self._size] = 0.0
+        for row, entry in enumerate(self._entries):
+            self._matrix[entry.buckets, row] = self._weigh(entry.buckets, entry.counts, idf)
+        self._weighted_at = self._size
+
+    def add(self, suggestion_id: int, input_text: str, status: str, text: str, style: str,
+            confidence: Optional[float]) -> None:
+        """Index one stored suggestion under its request's input and status."""
+        key = normalize(input_text)
+        if not key:
+            return
+        row = self._rows.get((key, status))
+        if row is None:
+            if self._size >= self.max_entries:
+                self._evict()
+            if self._size == self._matrix.shape[1]:
+                self._grow()
+            row = self._size
+            buckets, counts = self._terms(key)
+            self._df[buckets] += 1
+            self._statuses[row] = _STATUS_CODES.get(status, -1)
+            self._size += 1
+            self._matrix[buckets, row] = self._weigh(buckets, counts, self._idf())
+            self._entries.append(_Entry(key, status, buckets, counts))
+            self._rows[(key, status)] = row
+            if self._size >= 2 * max(self._weighted_at, 32):
+                self._reweight()
+        self._entries[row].suggestions.setdefault(text, (suggestion_id, style, confidence or 0.0))
+
+    def add_feedback(self, suggestion_id: int, is_helpful: Optional[bool]) -> None:
+        if is_helpful is None:
+            return
+        counts = self._feedback.setdefault(suggestion_id, [0, 0])
+        counts[0 if is_helpful else 1] += 1
+
+    def _net_helpful(self, suggestion_id: int) -> int:
+        helpful, unhelpful = self._feedback.get(suggestion_id, (0, 0))
+        return helpful - unhelpful
+
+    def search(
+        self,
+        input_text: str,
+        status: ReviewStatus,
+        num_suggestions: int = 3,
+        min_similarity: float = 0.9,
+        helpful_boost: float = 0.2,
+        top_k: int = 5,
+    ) -> Tuple[List[CommentSuggestion], float]:
+        """
+        Suggestions from the best matching entries and the best similarity
+        of any entry with the same status.
+
+        Returns no suggestions when nothing reaches `min_similarity`.
+        """
+        key = normalize(input_text)
+        if not self._size or not key:
+            return [], 0.0
+        buckets, counts = self._terms(key)
+        query = self._weigh(buckets, counts, self._idf())
+        scores = query @ self._matrix[buckets, :self._size]
+        scores[self._statuses[:self._size] != _STATUS_CODES[status.value]] = -1.0
+
+        k = min(top_k, self._size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        candidates = []
+        for row in top:
+            similarity = float(scores[row])
+            if similarity < min_similarity:
+                continue
+            entry = self._entries[row]
+            rated = [
+                (self._net_helpful(sid), order, text, style, confidence)
+                for order, (text, (sid, style, confidence)) in enumerate(entry.suggestions.items())
+            ]
+            served = [item for item in rated if item[0] >= 0]
+            if not served:
+                continue
+            net = sum(item[0] for item in served)
+            boost = 1.0 + helpful_boost * net / (abs(net) + 1)
+            served.sort(key=lambda item: (-item[0], item[1]))
+            candidates.append((similarity * boost, similarity, served))
+
+        best = max(0.0, float(scores[top].max()))
+        suggestions, seen = [], set()
+        for _, similarity, served in sorted(candidates, key=lambda c: -c[0]):
+            for _, _, text, style, confidence in served:
+                if text in seen:
+                    continue
+                seen.add(text)
+                suggestions.append(CommentSuggestion(
+                    text=text, style=style, confidence=round(min(confidence, similarity), 3)
+                ))
+                if len(suggestions) == num_suggestions:
+                    return suggestions, best
+        return suggestions, best
+
+    def build(self, engine=None) -> None:
+        """
+        Fill the index from the newest `max_entries` suggestions and their feedback.
+
+        Blocking (a query and ~0.1 ms per row): run it off the event loop,
+        from the warm-up thread or through `start_build`. Until it is done
+        `ready` is False and nothing else reads or writes the index.
+        """
+        from sqlalchemy import text
+
+        with self._build_lock:
+            if self.ready:
+                return
+            if engine is None:
+                from app.comments_db import session
+
+                engine = session.get("sync_engine")
+            start = time.perf_counter()
+            with engine.connect() as connection:
+                last_feedback_id = connection.execute(
+                    text("SELECT COALESCE(MAX(id), 0) FROM comment_feedback")
+                ).scalar()
+                suggestions = connection.execute(
+                    text(
+                        "SELECT s.id, r.input_text, r.status, s.text, s.style, s.confidence "
+                        "FROM comment_suggestions s JOIN comment_requests r ON r.id = s.request_id "
+                        f"WHERE COALESCE(s.provider, '') NOT IN ({_EXCLUDED}) "
+                        "ORDER BY s.id DESC LIMIT :limit"
+                    ),
+                    {"limit": self.max_entries},
+                ).all()
+                feedback = connection.execute(
+                    text(
+                        "SELECT suggestion_id, is_helpful FROM comment_feedback "
+                        "WHERE id <= :last AND suggestion_id >= :oldest"
+                    ),
+                    {"last": last_feedback_id, "oldest": suggestions[-1][0] if suggestions else 0},
+                ).all()
+
+            # Oldest first, so eviction order matches incremental refreshes
+            for suggestion_id, input_text, status, suggestion_text, style, confidence in reversed(suggestions):
+                self.add(suggestion_id, input_text, status, suggestion_text, style, confidence)
+            for suggestion_id, is_helpful in feedback:
+                self.add_feedback(suggestion_id, is_helpful)
+            self.last_suggestion_id = suggestions[0][0] if suggestions else 0
+            self.last_feedback_id = last_feedback_id
+            self._refreshed_at = time.monotonic()
+            self.ready = True
+            RETRIEVAL_INDEX_SIZE.set(self._size)
+            logger.info(
+                "Retrieval index built",
+                extra={
+                    "suggestions": len(suggestions),
+                    "entries": self._size,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                },
+            )
+
+    def start_build(self) -> None:
+        """Build in a background thread unless the index is built or being built."""
+        if self.ready or self._build_thread is not None:
+            return
+        self._build_thread = threading.Thread(target=self._build_logged, name="retrieval-index", daemon=True)
+        self._build_thread.start()
+
+    def _build_logged(self) -> None:
+        try:
+            self.build()
+        except Exception as e:
+            logger.warning("Retrieval index build failed", extra={"error": str(e), "error_type": type(e).__name__})
+            self._build_thread = None  # retried by a later lookup
+
+    async def refresh(self, force: bool = False) -> None:
+        """Pull suggestion and feedback rows added since the last refresh (or build)."""
+        if not self.ready:
+            return
+        now = time.monotonic()
+        if not force and now - self._refreshed_at < settings.retrieval_refresh_seconds:
+            return
+        if self._refresh_lock.locked():
+            return  # another request is refreshing; use the index as it is
+        async with self._refresh_lock:
+            self._refreshed_at = now
+            suggestions, feedback = await self._load_new_rows()
+            for suggestion_id, input_text, status, text, style, confidence in suggestions:
+                self.add(suggestion_id, input_text, status, text, style, confidence)
+                self.last_suggestion_id = suggestion_id
+            for feedback_id, suggestion_id, is_helpful in feedback:
+                self.add_feedback(suggestion_id, is_helpful)
+                self.last_feedback_id = feedback_id
+            RETRIEVAL_INDEX_SIZE.set(self._size)
+            if suggestions or feedback:
+                logger.debug(
+                    "Retrieval index refreshed",
+                    extra={"suggestions": len(suggestions), "feedback": len(feedback), "entries": self._size},
+                )
+
+    async def _load_new_rows(self):
+        from sqlalchemy import text
+
+        from app.comments_db.session import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as db:
+            suggestions = (await db.execute(
+                text(
+                    "SELECT s.id, r.input_text, r.status, s.text, s.style, s.confidence "
+                    "FROM comment_suggestions s JOIN comment_requests r ON r.id = s.request_id "
+                    f"WHERE s.id > :last AND COALESCE(s.provider, '') NOT IN ({_EXCLUDED}) "
+                    "ORDER BY s.id"
+                ),
+                {"last": self.last_suggestion_id},
+            )).all()
+            feedback = (await db.execute(
+                text(
+                    "SELECT id, suggestion_id, is_helpful FROM comment_feedback "
+                    "WHERE id > :last ORDER BY id"
+                ),
+                {"last": self.last_feedback_id},
+            )).all()
+        return suggestions, feedback
+
+
+# Singleton instance
+suggestion_index = SuggestionIndex(settings.retrieval_dimensions, settings.retrieval_max_entries)
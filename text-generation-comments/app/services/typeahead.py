@@ -0,0 +1,130 @@
+"""
+Typeahead rephrasing: suggestions while the user types.
+
+Each editor session has at most one live request. A new keystroke
+supersedes the previous one: if that one is still debouncing it never
+reaches the provider, and if its provider call is in flight the call is
+cancelled (the scheduler slot is released at once). The latest keystroke
+per session is also recorded in the shared store, so a request that
+debounced on one worker while a newer keystroke landed on another is
+dropped before it calls the provider.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from typing import Dict, Optional
+
+from app.config import settings
+from textgen_common.logging_config import set_log_context
+from app.metrics import TYPEAHEAD_SUPERSEDED
+from app.models.rephrase_schemas import (
+    CommentRephraseRequest,
+    TypeaheadRequest,
+    TypeaheadResponse,
+)
+from textgen_common.scheduler import PriorityClass
+from app.services.comment_rephraser import SuggestionCallback, comment_rephraser
+from textgen_common.shared_store import shared_store
+
+PIPELINE = "typeahead"
+NAMESPACE = "typeahead"
+SUPERSEDED = "superseded"  # cancel message that tells supersession from a disconnect
+
+logger = logging.getLogger(__name__)
+
+
+class TypeaheadService:
+    """Debounces typeahead requests per session and cancels superseded ones."""
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def suggest(
+        self,
+        request: TypeaheadRequest,
+        priority_class: PriorityClass = PriorityClass.INTERACTIVE,
+        on_suggestion: Optional[SuggestionCallback] = None
+    ) -> TypeaheadResponse:
+        """Return suggestions for the latest input of the session."""
+        session_id = request.session_id
+        set_log_context(typeahead_session=session_id)
+        # Ordered by issue time, so the shared store writes may land in any order
+        token = f"{time.time_ns():020d}-{uuid.uuid4().hex}"
+        await shared_store.aset(NAMESPACE, session_id, token, settings.typeahead_session_ttl_seconds)
+
+        previous = self._tasks.get(session_id)
+        if previous is not None and not previous.done():
+            previous.cancel(SUPERSEDED)
+
+        task = asyncio.ensure_future(self._run(request, token, priority_class, on_suggestion))
+        self._tasks[session_id] = task
+        try:
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            # The client went away; do not keep paying for its result
+            task.cancel()
+            raise
+        finally:
+            if self._tasks.get(session_id) is task:
+                del self._tasks[session_id]
+
+        if task.cancelled():
+            return self._superseded(request)
+        return task.result()
+
+    async def _run(
+        self,
+        request: TypeaheadRequest,
+        token: str,
+        priority_class: PriorityClass,
+        on_suggestion: Optional[SuggestionCallback]
+    ) -> TypeaheadResponse:
+        try:
+            await asyncio.sleep(settings.typeahead_debounce_ms / 1000)
+        except asyncio.CancelledError as e:
+            if e.args == (SUPERSEDED,):
+                TYPEAHEAD_SUPERSEDED.labels("debounce").inc()
+            raise
+        if not await self._is_latest(request.session_id, token):
+            TYPEAHEAD_SUPERSEDED.labels("debounce").inc()
+            return self._superseded(request)
+
+        rephrase_request = CommentRephraseRequest(
+            input=request.input,
+            status=request.status,
+            context=request.context,
+            num_suggestions=request.num_suggestions,
+            generation_mode=request.generation_mode
+        )
+        try:
+            response = await comment_rephraser.rephrase(
+                rephrase_request, priority_class, persist=False, on_suggestion=on_suggestion
+            )
+        except asyncio.CancelledError as e:
+            if e.args == (SUPERSEDED,):
+                TYPEAHEAD_SUPERSEDED.labels("in_flight").inc()
+            raise
+        return TypeaheadResponse(
+            **response.model_dump(),
+            session_id=request.session_id,
+            superseded=not await self._is_latest(request.session_id, token)
+        )
+
+    async def _is_latest(self, session_id: str, token: str) -> bool:
+        """Whether no newer keystroke for the session reached any worker."""
+        latest = await shared_store.aget(NAMESPACE, session_id)
+        return latest is None or latest <= token
+
+    def _superseded(self, request: TypeaheadRequest) -> TypeaheadResponse:
+        set_log_context(outcome="superseded")
+        return TypeaheadResponse(
+            success=True,
+            original_input=request.input,
+            session_id=request.session_id,
+            superseded=True
+        )
+
+
+# Singleton instance
+typeahead_service = TypeaheadService()
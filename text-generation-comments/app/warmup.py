@@ -0,0 +1,112 @@
+"""
+Startup warm-up for the Comment Rephrasing Service.
+
+Heavy dependencies (SQLAlchemy, the selected provider SDK, the glossary) are
+loaded lazily, so the server accepts connections quickly. Right after startup
+a background thread loads them, so the first rephrase does not pay for the
+import either. Disable with WARMUP_ON_STARTUP=false.
+
+The same thread first adds what a database from before newer features
+lacks (`prepare_database`), whether or not the warm-up is enabled.
+
+Under gunicorn (gunicorn.conf.py) `warm_shared` additionally loads the
+read-only data once in the master process, before workers are forked.
+"""
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def prepare_database() -> None:
+    """Create the fingerprint table and build the search index when the database has none."""
+    from app.comments_db import session
+    from app.comments_db.fingerprints import create_table as create_fingerprint_table
+    from app.comments_db.search import create_index as create_search_index
+
+    engine = session.get("sync_engine")
+    if create_fingerprint_table(engine):
+        logger.warning(
+            "Created the review comment fingerprint table; "
+            "run `python -m app.comments_db.fingerprints backfill` for existing comments"
+        )
+    start = time.perf_counter()
+    if create_search_index(engine):
+        logger.info(
+            "Built the review comment search index",
+            extra={"duration_ms": round((time.perf_counter() - start) * 1000, 3)},
+        )
+
+
+def warm_up() -> None:
+    """Load everything the first request would otherwise load lazily."""
+    from app.comments_db import session
+    import app.comments_db.models  # noqa: F401 - maps the tables
+    from textgen_common.providers import providers
+    import app.services.comment_rephraser  # noqa: F401
+    from app.services.construction_terms import load_glossary
+
+    session.get("AsyncSessionLocal")
+    load_glossary()
+    providers.initialize()
+    if settings.retrieval_min_similarity:
+        from app.services.suggestion_index import suggestion_index
+
+        suggestion_index.build()
+
+
+def warm_shared() -> None:
+    """
+    Load read-only state in the gunicorn master before workers fork.
+
+    Workers then share these pages copy-on-write. Nothing that owns threads,
+    sockets or file handles is created here: database engines and provider
+    clients are still built per worker by the lifespan warm-up.
+    """
+    from sqlalchemy.orm import configure_mappers
+
+    import app.comments_db.models  # noqa: F401 - maps the tables
+    import app.services.comment_rephraser  # noqa: F401 - prompt templates
+    from app.services.construction_terms import load_glossary
+
+    load_glossary()
+    configure_mappers()
+
+    # The OpenAI SDK (also used for Groq) is plain Python and fork-safe to
+    # import; the Gemini SDK pulls in gRPC, which must not start before fork.
+    if settings.ai_provider in ("openai", "groq"):
+        import openai  # noqa: F401
+
+
+def _run() -> None:
+    try:
+        prepare_database()
+    except Exception:
+        logger.exception("Database preparation failed")
+    if not settings.warmup_on_startup:
+        return
+    start = time.perf_counter()
+    try:
+        warm_up()
+    except Exception:
+        logger.exception("Startup warm-up failed")
+        return
+    logger.info("Startup warm-up complete", extra={"duration_ms": round((time.perf_counter() - start) * 1000, 3)})
+
+
+def start_warmup() -> threading.Thread:
+    """Prepare the database, then run the warm-up when enabled, in a daemon thread."""
+    thread = threading.Thread(target=_run, name="startup-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """FastAPI lifespan: kick off database preparation and warm-up without delaying startup."""
+    start_warmup()
+    yield
@@ -8,8 +8,134 @@ const suggestionsList = document.getElementById('suggestions-list');
 const typingStatus = document.getElementById('typing-status');
 const toneIndicator = document.getElementById('tone-indicator');
 
+// Typeahead: one editor session; the server debounces and drops superseded keystrokes
+const typeaheadSession = (crypto.randomUUID && crypto.randomUUID()) || String(Date.now());
+const TYPEAHEAD_MIN_CHARS = 8;
+let typeaheadController = null;
+let typeaheadRequestId = null;
+
+// Realtime channel: one WebSocket carries every request; REST is used while it is down
+const realtime = {
+    socket: null,
+    nextId: 0,
+    pending: new Map(),
+
+    connect() {
+        const socket = new WebSocket(API_URL.replace(/^http/, 'ws') + '/ws');
+        socket.onopen = () => { this.socket = socket; };
+        socket.onmessage = (event) => this.dispatch(JSON.parse(event.data));
+        socket.onclose = () => {
+            this.socket = null;
+            this.pending.forEach(({ reject }) => reject(new Error("WebSocket closed")));
+            this.pending.clear();
+            setTimeout(() => this.connect(), 3000);
+        };
+    },
+
+    ready() {
+        return this.socket !== null && this.socket.readyState === WebSocket.OPEN;
+    },
+
+    // Resolves with the result payload; onPartial gets each streamed suggestion
+    request(type, payload, onPartial) {
+        const id = String(++this.nextId);
+        const promise = new Promise((resolve, reject) => {
+            this.pending.set(id, { resolve, reject, onPartial });
+        });
+        promise.id = id;
+        this.socket.send(JSON.stringify({ id, type, payload }));
+        return promise;
+    },
+
+    dispatch(message) {
+        const entry = this.pending.get(message.id);
+        if (!entry) {
+            return;
+        }
+        if (message.type === 'partial') {
+            if (entry.onPartial) entry.onPartial(message.suggestion);
+            return;
+        }
+        this.pending.delete(message.id);
+        if (message.type === 'result') {
+            entry.resolve(message.payload);
+        } else {
+            entry.reject(new Error(message.type === 'error' ? JSON.stringify(message.detail) : message.type));
+        }
+    }
+};
+realtime.connect();
+
 // Event Listeners
-// removed handleTyping and updateToneIndicator
+commentInput.addEventListener('input', handleTyping);
+
+async function handleTyping() {
+    const text = commentInput.value.trim();
+    if (typeaheadController) {
+        typeaheadController.abort();
+        typeaheadController = null;
+    }
+    if (text.length < TYPEAHEAD_MIN_CHARS) {
+        return;
+    }
+
+    if (realtime.ready()) {
+        // The server supersedes the previous keystroke of the session
+        const partials = [];
+        const pending = realtime.request('typeahead', {
+            session_id: typeaheadSession,
+            input: text,
+            status: statusSelect.value,
+            num_suggestions: 3
+        }, (suggestion) => {
+            if (pending.id !== typeaheadRequestId) return;
+            partials.push(suggestion);
+            showSuggestions();
+            renderSuggestions(partials);
+        });
+        typeaheadRequestId = pending.id;
+        try {
+            const data = await pending;
+            if (pending.id === typeaheadRequestId && !data.superseded && data.success) {
+                showSuggestions();
+                renderSuggestions(data.suggestions);
+            }
+        } catch (error) {
+            console.error("Typeahead error:", error);
+        }
+        return;
+    }
+
+    const controller = new AbortController();
+    typeaheadController = controller;
+    try {
+        const response = await fetch(`${API_URL}/rephrase-typeahead`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                session_id: typeaheadSession,
+                input: text,
+                status: statusSelect.value,
+                num_suggestions: 3
+            }),
+            signal: controller.signal
+        });
+        const data = await response.json();
+
+        // A newer keystroke owns the popup now
+        if (controller !== typeaheadController || data.superseded || !data.success) {
+            return;
+        }
+        showSuggestions();
+        renderSuggestions(data.suggestions);
+    } catch (error) {
+        if (error.name !== 'AbortError') {
+            console.error("Typeahead error:", error);
+        }
+    }
+}
 
 async function triggerRephrase() {
     const text = commentInput.value.trim();
@@ -29,20 +155,30 @@ async function triggerRephrase() {
         </div>
     `;
 
+    const payload = {
+        input: text,
+        status: statusSelect.value,
+        num_suggestions: 3
+    };
     try {
-        const response = await fetch(`${API_URL}/rephrase-comment`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                input: text,
-                status: statusSelect.value,
-                num_suggestions: 3
-            })
-        });
-
-        const data = await response.json();
+        let data;
+        if (realtime.ready()) {
+            // Suggestions appear one by one as the provider streams them
+            const partials = [];
+            data = await realtime.request('rephrase', payload, (suggestion) => {
+                partials.push(suggestion);
+                renderSuggestions(partials);
+            });
+        } else {
+            const response = await fetch(`${API_URL}/rephrase-comment`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify(payload)
+            });
+            data = await response.json();
+        }
 
         if (data.success) {
             renderSuggestions(data.suggestions);
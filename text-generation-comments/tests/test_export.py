@@ -0,0 +1,95 @@
+"""
+Tests for the streaming columnar export.
+"""
+import io
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+import app.comments_db.models  # noqa: F401  (registers the tables)
+from app.comments_db.base import Base
+from app.comments_db.export import Export, connect_read_only
+from app.config import settings
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "comments.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO comment_requests (id, input_text, status, input_type, created_at) VALUES "
+            "(1, 'rebar wrong', 'reject', 'expand', '2026-01-05 09:00:00.000000'), "
+            "(2, 'paint ok', 'submit', 'expand', '2026-02-05 09:00:00.000000')"
+        ))
+        connection.execute(text(
+            "INSERT INTO comment_suggestions (id, request_id, text, style, confidence, provider, created_at) VALUES "
+            "(1, 1, 'Rebar spacing is wrong.', 'formal', 0.9, 'openai', '2026-01-05 09:00:01.000000'), "
+            "(2, 1, 'Fix rebar.', 'concise', 0.8, 'openai', '2026-01-05 09:00:01.000000'), "
+            "(3, 2, 'Paint approved.', 'formal', 0.95, 'groq', '2026-02-05 09:00:01.000000')"
+        ))
+        connection.execute(text(
+            "INSERT INTO comment_feedback (id, suggestion_id, is_helpful, comment, created_at) VALUES "
+            "(1, 2, 1, NULL, '2026-01-06 10:00:00.000000'), (2, 3, 0, 'too short', '2026-02-06 10:00:00.000000')"
+        ))
+    engine.dispose()
+    return str(path)
+
+
+def _parquet(export: Export):
+    return pq.read_table(io.BytesIO(b"".join(export)))
+
+
+class TestExport:
+    """Test cases for Export and the export endpoint."""
+
+    def test_batches_joined_columns_and_types(self, db_path):
+        export = Export(connect_read_only(db_path), "feedback", joined=True, batch_rows=1)
+
+        parquet = pq.ParquetFile(io.BytesIO(b"".join(export)))
+        table = parquet.read()
+
+        assert export.rows == 2 and parquet.num_row_groups == 2
+        assert table.column("is_helpful").to_pylist() == [True, False]
+        assert table.column("suggestion_text").to_pylist() == ["Fix rebar.", "Paint approved."]
+        assert table.column("request_input_text").to_pylist() == ["rebar wrong", "paint ok"]
+        assert table.column("created_at")[0].as_py() == datetime(2026, 1, 6, 10)
+
+    def test_incremental_from_watermark(self, db_path):
+        first = Export(connect_read_only(db_path), "suggestions", format="arrow", batch_rows=2)
+        rows = pa.ipc.open_stream(io.BytesIO(b"".join(first))).read_all()
+
+        later = Export(connect_read_only(db_path), "suggestions", after_id=1)
+        since = Export(connect_read_only(db_path), "suggestions", since=datetime(2026, 2, 1))
+
+        assert rows.column("id").to_pylist() == [1, 2, 3] and first.watermark == 3
+        assert _parquet(later).column("id").to_pylist() == [2, 3]
+        assert _parquet(since).column("id").to_pylist() == [3]
+        assert _parquet(Export(connect_read_only(db_path), "suggestions", after_id=3)).num_rows == 0
+
+    def test_endpoint_requires_token_and_streams(self, db_path, monkeypatch):
+        from app.main import app
+
+        monkeypatch.setattr(settings, "comments_db_path", db_path)
+        monkeypatch.setattr(settings, "export_admin_token", "secret")
+        client = TestClient(app)
+
+        denied = client.get("/api/v1/export/requests")
+        non_ascii = client.get("/api/v1/export/requests", headers={"X-Admin-Token": "sécret".encode("utf-8")})
+        response = client.get(
+            "/api/v1/export/suggestions", params={"joined": "true", "after_id": 1},
+            headers={"X-Admin-Token": "secret"},
+        )
+
+        assert denied.status_code == 403
+        assert non_ascii.status_code == 403
+        assert response.headers["x-export-watermark"] == "3"
+        assert response.headers["content-type"] == "application/vnd.apache.parquet"
+        table = pq.read_table(io.BytesIO(response.content))
+        assert table.column("request_status").to_pylist() == ["reject", "submit"]
@@ -0,0 +1,126 @@
+"""
+Tests for Idempotency-Key handling on /rephrase-comment.
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.main import app
+from app.models.rephrase_schemas import CommentRephraseResponse, CommentSuggestion
+from app.services.comment_rephraser import PIPELINE, comment_rephraser
+from textgen_common.idempotency import NAMESPACE, REPLAYED_HEADER, idempotency_keys
+from textgen_common.shared_store import SharedStore
+
+URL = "/api/v1/rephrase-comment"
+BODY = {"input": "rebar spacing wrong", "status": "reject"}
+
+
+@pytest.fixture
+def calls(tmp_path, monkeypatch):
+    """Counts rephraser runs; an input containing `overload` comes back degraded."""
+    calls = []
+
+    async def rephrase(request, priority_class):
+        calls.append(request.input)
+        await asyncio.sleep(0.1)
+        return CommentRephraseResponse(
+            success=True,
+            suggestions=[CommentSuggestion(text=f"Suggestion {len(calls)}.", style="formal")],
+            original_input=request.input,
+            degraded="overload" in request.input,
+        )
+
+    monkeypatch.setattr(idempotency_keys, "store", SharedStore(str(tmp_path / "store.sqlite3")))
+    monkeypatch.setattr(comment_rephraser, "rephrase", rephrase)
+    return calls
+
+
+async def _post(*bodies_and_keys):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*(
+            client.post(URL, json=body, headers={"Idempotency-Key": key})
+            for body, key in bodies_and_keys
+        ))
+
+
+async def _post_and_disconnect(body: dict, key: str, after: float) -> list:
+    """Send a request over raw ASGI and disconnect `after` seconds later; return what was sent back."""
+    payload = json.dumps(body).encode("utf-8")
+    messages = [{"type": "http.request", "body": payload, "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(after)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": URL,
+        "raw_path": URL.encode("ascii"),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"test"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(payload)).encode("ascii")),
+            (b"idempotency-key", key.encode("ascii")),
+        ],
+        "client": ("127.0.0.1", 1234),
+        "server": ("test", 80),
+    }
+    await app(scope, receive, send)
+    return sent
+
+
+class TestRephraseIdempotency:
+    """Test cases for the Idempotency-Key header on /rephrase-comment."""
+
+    def test_replay_carries_header(self, calls):
+        """A retry with the same key gets the stored response, marked as replayed."""
+        (first,) = asyncio.run(_post((BODY, "k1")))
+        (retry,) = asyncio.run(_post((BODY, "k1")))
+
+        assert calls == ["rebar spacing wrong"]
+        assert REPLAYED_HEADER not in first.headers
+        assert retry.headers[REPLAYED_HEADER] == "true"
+        assert retry.json() == first.json()
+
+    def test_key_reused_with_different_body(self, calls):
+        asyncio.run(_post((BODY, "k2")))
+        (reused,) = asyncio.run(_post((dict(BODY, input="column missing"), "k2")))
+
+        assert reused.status_code == 422
+        assert calls == ["rebar spacing wrong"]
+
+    def test_degraded_result_is_not_stored(self, calls):
+        """A degraded answer releases the key, so the retry runs again."""
+        body = dict(BODY, input="overload spacing")
+        (first,) = asyncio.run(_post((body, "k3")))
+        (retry,) = asyncio.run(_post((body, "k3")))
+
+        assert first.json()["degraded"] and retry.json()["degraded"]
+        assert REPLAYED_HEADER not in retry.headers
+        assert calls == ["overload spacing", "overload spacing"]
+
+    def test_disconnect_releases_key(self, calls):
+        """A client that goes away mid-call leaves the key free for its retry."""
+        sent = asyncio.run(_post_and_disconnect(BODY, "k4", after=0.02))
+
+        assert sent[0]["status"] == 499
+        assert idempotency_keys.store.get(NAMESPACE, f"{PIPELINE}:k4") is None
+        (retry,) = asyncio.run(_post((BODY, "k4")))
+        assert retry.status_code == 200
+        assert REPLAYED_HEADER not in retry.headers
+        assert calls == ["rebar spacing wrong", "rebar spacing wrong"]
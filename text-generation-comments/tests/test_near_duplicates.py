@@ -0,0 +1,120 @@
+"""
+Tests for near-duplicate review comments (MinHash fingerprints).
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app.comments_db.models  # noqa: F401  (registers the tables)
+from app.comments_db import session
+from app.comments_db.base import Base
+from app.comments_db.fingerprints import FINGERPRINT_TABLE, backfill, create_table, signature, similarity
+from app.models.review_comment_schemas import ReviewCommentRequest
+from app.services.near_duplicate_service import cluster_review_comments, find_near_duplicates
+from app.services.review_comment_service import add_review_comment
+
+COMMENTS = [
+    (1, "Please resubmit with corrected dimensions"),
+    (1, "Fire rating of the door is not documented."),
+    (1, "please re-submit with the corrected dimensions."),
+    (2, "Please resubmit with corrected dimensions!"),
+    (1, "Fire rating of the doors is not documented"),
+    (1, "Approved."),
+]
+
+
+def _create_engine(tmp_path, monkeypatch, tables=None):
+    path = tmp_path / "comments.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine, tables=tables)
+    monkeypatch.setitem(
+        session._lazy, "AsyncSessionLocal",
+        async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{path}"), expire_on_commit=False),
+    )
+    return engine
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = _create_engine(tmp_path, monkeypatch)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def engine_without_fingerprints(tmp_path, monkeypatch):
+    """A database from before the fingerprint table."""
+    tables = [table for name, table in Base.metadata.tables.items() if name != FINGERPRINT_TABLE]
+    engine = _create_engine(tmp_path, monkeypatch, tables)
+    yield engine
+    engine.dispose()
+
+
+def _add_all():
+    async def add():
+        for review_id, comment in COMMENTS:
+            await add_review_comment(ReviewCommentRequest(
+                review_id=review_id, workflow_step=1, user_name="ana", status="revise", text=comment
+            ))
+    asyncio.run(add())
+
+
+def _fingerprinted(engine):
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT count(*) FROM review_comment_fingerprints")).scalar()
+
+
+class TestNearDuplicates:
+    """Test cases for fingerprints, near-duplicate lookup and clustering."""
+
+    def test_similarity_separates_rewordings_from_other_comments(self):
+        resubmit = signature("Please resubmit with corrected dimensions")
+
+        assert similarity(resubmit, signature("please re-submit with the corrected dimensions.")) > 0.7
+        assert similarity(resubmit, signature("Fire rating of the door is not documented.")) < 0.3
+        assert signature("?!") is None
+
+    def test_near_duplicates_across_reviews(self, engine):
+        _add_all()
+
+        result = asyncio.run(find_near_duplicates(1))
+
+        assert _fingerprinted(engine) == len(COMMENTS)
+        assert [hit.id for hit in result.results] == [4, 3]
+        assert result.results[0].review_id == 2
+        assert asyncio.run(find_near_duplicates(99)) is None
+
+    def test_clusters_within_a_review(self, engine):
+        _add_all()
+
+        result = asyncio.run(cluster_review_comments(1))
+
+        assert result.comments == 5
+        assert [cluster.comment_ids for cluster in result.clusters] == [[1, 3], [2, 5]]
+        assert result.clusters[0].text == "Please resubmit with corrected dimensions"
+
+    def test_backfill_and_delete(self, engine):
+        _add_all()
+        with engine.begin() as connection:
+            connection.execute(text("DELETE FROM review_comment_fingerprints WHERE comment_id > 2"))
+            connection.execute(text("DELETE FROM review_comments WHERE id = 1"))
+
+        assert _fingerprinted(engine) == 1
+        assert backfill(engine.begin, batch_size=2) == 4
+        assert _fingerprinted(engine) == 5
+        assert backfill(engine.begin) == 0
+        assert [hit.id for hit in asyncio.run(find_near_duplicates(3)).results] == [4]
+
+    def test_database_without_fingerprint_table(self, engine_without_fingerprints):
+        """Comments are still stored; the table is created later and backfilled."""
+        engine = engine_without_fingerprints
+        _add_all()
+
+        assert create_table(engine)
+        assert not create_table(engine)
+        assert _fingerprinted(engine) == 0
+        assert backfill(engine.begin) == len(COMMENTS)
+        _add_all()
+        assert _fingerprinted(engine) == 2 * len(COMMENTS)
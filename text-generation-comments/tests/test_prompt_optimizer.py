@@ -0,0 +1,86 @@
+"""
+Tests for prompt budgeting, generation limits and token accounting.
+"""
+import asyncio
+from types import SimpleNamespace
+
+from app.config import settings
+from textgen_common.providers import providers
+from app.services.comment_rephraser import comment_rephraser
+from app.services.prompt_optimizer import END_MARKER, GENERATION_LIMITS, PromptOptimizer
+from textgen_common.tokens import estimate_tokens
+
+RANKED = [
+    (1.0, "- BIM: (Corrected from 'iim')"),
+    (0.8, "- Column: A vertical structural member carrying loads from the beams and slabs above it..."),
+    (0.7, "- Bid: (Corrected from 'bd')"),
+]
+
+
+def _build(glossary_terms: str, few_shot: bool) -> str:
+    return "instructions " * 40 + ("examples " * 30 if few_shot else "") + glossary_terms
+
+
+class _Completions:
+    """A provider that keeps generating after the three suggestions."""
+
+    def __init__(self):
+        self.kwargs = None
+        self.chunks_read = 0
+
+    async def create(self, stream=False, **kwargs):
+        self.kwargs = kwargs
+        text = "[FORMAL] The column is wrong.\n[CONCISE] Column wrong.\n[FRIENDLY] Please check the column.\n"
+        text += "Some extra notes the model should not have written.\n" * 20
+
+        async def chunks():
+            for line in text.splitlines(keepends=True):
+                self.chunks_read += 1
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=line))])
+            yield SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=10, completion_tokens=400))
+        return chunks()
+
+
+class TestPromptOptimizer:
+    """Test cases for PromptOptimizer and the generation cut-off."""
+
+    def test_snippets_fill_the_budget_by_relevance(self):
+        """Snippets that do not fit are skipped; a less relevant shorter one may still fit."""
+        base = estimate_tokens(_build("", True))
+        budget = base + estimate_tokens(RANKED[0][1] + "\n" + RANKED[2][1]) + 1
+        optimized = PromptOptimizer(budget).optimize(_build, RANKED, "expand")
+
+        assert optimized.few_shot
+        assert optimized.prompt == _build(RANKED[0][1] + "\n" + RANKED[2][1], True)
+        assert optimized.prompt_tokens <= budget
+        assert optimized.limits == GENERATION_LIMITS["expand"]
+        assert END_MARKER in optimized.limits.stop
+
+    def test_few_shot_dropped_when_instructions_exceed_budget(self):
+        optimized = PromptOptimizer(estimate_tokens(_build("", False)) + 5).optimize(_build, RANKED, "polish")
+
+        assert not optimized.few_shot
+        assert optimized.glossary_terms == 0
+        assert PromptOptimizer(0).optimize(_build, RANKED, "polish").glossary_terms == 3
+
+    def test_stream_stops_after_three_labelled_lines(self, monkeypatch):
+        """The stream is abandoned once the suggestions are complete; usage is estimated."""
+        completions = _Completions()
+        monkeypatch.setattr(settings, "ai_provider", "openai")
+        monkeypatch.setattr(providers, "_initialized", True)
+        monkeypatch.setattr(providers, "openai_client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+        lines = []
+
+        async def on_line(line):
+            lines.append(line)
+
+        text, usage = asyncio.run(comment_rephraser._generate_with_ai(
+            "rebar spacing wrong", on_line=on_line, limits=GENERATION_LIMITS["expand"]
+        ))
+
+        assert completions.kwargs["max_tokens"] == GENERATION_LIMITS["expand"].max_tokens
+        assert completions.kwargs["stop"] == [END_MARKER]
+        assert completions.chunks_read == 3
+        assert len(comment_rephraser._parse_suggestions(text)) == 3
+        assert usage.estimated
+        assert usage.completion_tokens == estimate_tokens(text)
@@ -0,0 +1,120 @@
+"""
+Tests for the WebSocket channel.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.services import realtime, typeahead
+from textgen_common.providers import providers
+from textgen_common.shared_store import SharedStore
+
+STREAMED = "[FORMAL] The rebar spacing is incorrect.\n[CONCISE] Rebar spacing incorrect.\n[FRIENDLY] Please fix the rebar spacing."
+
+
+class _StreamingCompletions:
+    async def create(self, stream=False, **kwargs):
+        async def chunks():
+            for i in range(0, len(STREAMED), 7):
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=STREAMED[i:i + 7]))])
+            yield SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=10, completion_tokens=20))
+        assert stream
+        return chunks()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "typeahead_debounce_ms", 0)
+    monkeypatch.setattr(typeahead, "shared_store", SharedStore(str(tmp_path / "shared.sqlite3")))
+    return TestClient(app)
+
+
+@pytest.fixture
+def stalled(monkeypatch):
+    """Rephrase calls that never finish, so every slot stays taken."""
+    async def rephrase(request, priority_class, on_suggestion=None):
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(settings, "ws_max_in_flight", 1)
+    monkeypatch.setattr(settings, "ws_max_pending", 2)
+    monkeypatch.setattr(realtime.comment_rephraser, "rephrase", rephrase)
+
+
+def _rephrase(message_id: str) -> dict:
+    return {"id": message_id, "type": "rephrase", "payload": {"input": "rebar spacing wrong", "status": "reject"}}
+
+
+def _typeahead(message_id: str, text: str, mode: str = "rules") -> dict:
+    return {
+        "id": message_id,
+        "type": "typeahead",
+        "payload": {"input": text, "status": "reject", "generation_mode": mode},
+    }
+
+
+class TestRealtime:
+    """Test cases for the /api/v1/ws channel."""
+
+    def test_requests_are_multiplexed(self, client):
+        """Replies carry the request id; protocol errors do not close the socket."""
+        with client.websocket_connect("/api/v1/ws") as ws:
+            ws.send_text("not json")
+            ws.send_json({"id": "x", "type": "unknown"})
+            ws.send_json({"id": "bad", "type": "typeahead", "payload": {"input": "", "status": "reject"}})
+            ws.send_json(_typeahead("t1", "wall paint bd"))
+            replies = {}
+            while len(replies) < 4:
+                reply = ws.receive_json()
+                replies[reply["id"]] = reply
+
+        assert replies[None]["status"] == 400
+        assert replies["x"]["status"] == 400
+        assert replies["bad"]["status"] == 422
+        assert replies["t1"]["type"] == "result"
+        assert replies["t1"]["payload"]["generation_mode"] == "rules"
+        assert replies["t1"]["payload"]["suggestions"]
+
+    def test_partials_stream_before_result(self, client, monkeypatch):
+        """Suggestions are pushed as the provider streams each labelled line."""
+        monkeypatch.setattr(settings, "ai_provider", "openai")
+        monkeypatch.setattr(providers, "_initialized", True)
+        monkeypatch.setattr(
+            providers, "openai_client", SimpleNamespace(chat=SimpleNamespace(completions=_StreamingCompletions()))
+        )
+
+        with client.websocket_connect("/api/v1/ws") as ws:
+            ws.send_json(_typeahead("t1", "rebar spacing wrong", mode="ai"))
+            replies = [ws.receive_json() for _ in range(4)]
+
+        assert [r["type"] for r in replies] == ["partial", "partial", "partial", "result"]
+        assert [r["suggestion"]["style"] for r in replies[:3]] == ["formal", "concise", "friendly"]
+        assert [s["text"] for s in replies[3]["payload"]["suggestions"]] == [
+            r["suggestion"]["text"] for r in replies[:3]
+        ]
+
+    def test_control_messages_are_read_at_the_limit(self, client, stalled):
+        """With every slot taken, ping and cancel are still answered at once."""
+        with client.websocket_connect("/api/v1/ws") as ws:
+            ws.send_json(_rephrase("r1"))
+            ws.send_json(_rephrase("r2"))
+            ws.send_json({"id": "p", "type": "ping"})
+            assert ws.receive_json() == {"id": "p", "type": "pong"}
+
+            ws.send_json({"id": "r2", "type": "cancel"})
+            assert ws.receive_json() == {"id": "r2", "type": "cancelled"}
+            ws.send_json({"id": "r1", "type": "cancel"})
+            assert ws.receive_json() == {"id": "r1", "type": "cancelled"}
+
+    def test_open_requests_are_bounded(self, client, stalled):
+        """Past WS_MAX_PENDING open requests a new one is refused."""
+        with client.websocket_connect("/api/v1/ws") as ws:
+            for message_id in ("r1", "r2", "r3"):
+                ws.send_json(_rephrase(message_id))
+            reply = ws.receive_json()
+
+        assert reply["id"] == "r3"
+        assert reply["status"] == 429
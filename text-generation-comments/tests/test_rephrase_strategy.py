@@ -0,0 +1,84 @@
+"""
+Tests for num_suggestions and the combined/parallel rephrase strategies.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import settings
+from app.models.rephrase_schemas import CommentRephraseRequest
+from textgen_common.providers import providers
+from app.services.comment_rephraser import STYLE_LABELS, comment_rephraser
+
+LINES = {label: f"{label} Suggestion in the {style} style." for label, (style, _) in STYLE_LABELS.items()}
+
+
+class _Completions:
+    """Answers with a line per requested label; per-style behaviour is configurable."""
+
+    def __init__(self, slow=(), malformed=()):
+        self.slow = slow
+        self.malformed = malformed
+        self.prompts = []
+        self.cancelled = []
+
+    async def create(self, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        self.prompts.append(prompt)
+        output_format = prompt.partition("OUTPUT FORMAT:")[2]
+        labels = sorted((label for label in LINES if label in output_format), key=output_format.index)
+        if labels[0] in self.slow:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                self.cancelled.append(labels[0])
+                raise
+        text = "Sure, here you go." if labels[0] in self.malformed else "\n".join(LINES[label] for label in labels)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=20),
+        )
+
+
+@pytest.fixture
+def completions(monkeypatch):
+    def install(**behaviour):
+        fake = _Completions(**behaviour)
+        monkeypatch.setattr(settings, "ai_provider", "openai")
+        monkeypatch.setattr(settings, "retrieval_min_similarity", 0.0)
+        monkeypatch.setattr(providers, "_initialized", True)
+        monkeypatch.setattr(providers, "openai_client", SimpleNamespace(chat=SimpleNamespace(completions=fake)))
+        return fake
+    return install
+
+
+def _rephrase(**fields):
+    request = CommentRephraseRequest(input="rebar spacing wrong", status="reject", generation_mode="ai", **fields)
+    return asyncio.run(comment_rephraser.rephrase(request, persist=False))
+
+
+class TestRephraseStrategy:
+    """Test cases for honouring num_suggestions."""
+
+    def test_combined_asks_for_num_suggestions(self, completions):
+        fake = completions()
+        response = _rephrase(num_suggestions=5, strategy="combined")
+
+        assert len(fake.prompts) == 1
+        assert [s.style for s in response.suggestions] == [style for style, _ in STYLE_LABELS.values()]
+
+    def test_parallel_returns_first_k(self, completions, monkeypatch):
+        """A slow and a malformed style do not hold up the others."""
+        monkeypatch.setattr(settings, "rephrase_parallel_spare", 2)
+        fake = completions(slow=("[FRIENDLY]",), malformed=("[FORMAL]",))
+
+        start = time.perf_counter()
+        response = _rephrase(num_suggestions=2, strategy="parallel")
+
+        assert time.perf_counter() - start < 5
+        assert response.success
+        assert [s.style for s in response.suggestions] == ["concise", "detailed"]
+        assert len(fake.prompts) == 4
+        assert fake.cancelled == ["[FRIENDLY]"]
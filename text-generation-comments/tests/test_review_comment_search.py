@@ -0,0 +1,102 @@
+"""
+Tests for full-text search over review comments.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app.comments_db.models  # noqa: F401  (registers the tables)
+from app.comments_db import session
+from app.comments_db.base import Base
+from app.config import settings
+from app.services.review_comment_service import build_match, search_review_comments
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh comments database; returns a function running SQL against it."""
+    path = tmp_path / "comments.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setitem(
+        session._lazy, "AsyncSessionLocal",
+        async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{path}"), expire_on_commit=False),
+    )
+
+    def execute(sql, rows=()):
+        with engine.begin() as connection:
+            connection.execute(text(sql), list(rows) or {})
+    yield execute
+    engine.dispose()
+
+
+def _add(db, *comments):
+    db(
+        "INSERT INTO review_comments (id, review_id, workflow_step, user_name, status, text) "
+        "VALUES (:id, :review_id, :workflow_step, 'ana', :status, :text)",
+        [dict(zip(("id", "review_id", "workflow_step", "status", "text"), c)) for c in comments],
+    )
+
+
+def _search(query, **filters):
+    return asyncio.run(search_review_comments(query, **filters)).results
+
+
+class TestReviewCommentSearch:
+    """Test cases for search_review_comments."""
+
+    def test_index_follows_inserts_updates_and_deletes(self, db):
+        _add(
+            db,
+            (1, 10, 1, "reject", "Waterproofing membranes are missing at the <b>roof</b>."),
+            (2, 10, 2, "revise", "Membrane overlap too small."),
+            (3, 11, 1, "reject", "Rebar spacing wrong."),
+        )
+        db("UPDATE review_comments SET text = 'Rebar cover insufficient.' WHERE id = 2")
+        db("DELETE FROM review_comments WHERE id = 3")
+
+        assert [hit.id for hit in _search("membrane")] == [1]
+        assert [hit.id for hit in _search("rebar")] == [2]
+        assert _search("water*")[0].snippet == (
+            "<mark>Waterproofing</mark> membranes are missing at the &lt;b&gt;roof&lt;/b&gt;."
+        )
+
+    def test_filters(self, db):
+        _add(
+            db,
+            (1, 10, 1, "reject", "Slab crack near column."),
+            (2, 10, 2, "revise", "Slab crack repaired."),
+            (3, 11, 1, "reject", "Slab crack at the edge."),
+        )
+
+        assert {hit.id for hit in _search("slab crack", review_id=10)} == {1, 2}
+        assert {hit.id for hit in _search("slab crack", status="reject")} == {1, 3}
+        assert [hit.id for hit in _search("slab crack", review_id=10, workflow_step=1)] == [1]
+        assert _search('"crack slab"') == []
+
+    def test_pages_cover_the_most_recent_candidates_once(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "search_max_candidates", 25)
+        _add(db, *((i, 1, 1, "revise", "beam " * (i % 4 + 1) + f"note {i}") for i in range(1, 31)))
+
+        hits, cursor = [], None
+        while True:
+            page = asyncio.run(search_review_comments("beam", limit=7, cursor=cursor))
+            hits += page.results
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        assert sorted(hit.id for hit in hits) == list(range(6, 31))
+        assert page.candidate_limit == 25
+        assert asyncio.run(search_review_comments("beam", review_id=1, limit=7)).candidate_limit is None
+        assert [hit.score for hit in hits] == sorted(hit.score for hit in hits)
+
+    def test_query_syntax_is_text(self, db):
+        _add(db, (1, 1, 1, "revise", "Column NEAR grid OR axis."))
+
+        assert build_match('column AND "near" -grid*') == '"column" "AND" "near" "grid"*'
+        assert [hit.id for hit in _search("NEAR OR (axis")] == [1]
+        with pytest.raises(ValueError):
+            _search("?!")
@@ -0,0 +1,95 @@
+"""
+Tests for the offline rule-based comment rephraser.
+"""
+from app.models.rephrase_schemas import ReviewStatus, WorkflowContext
+from app.services.rule_rephraser import rule_rephraser
+
+
+class TestRuleRephraser:
+    """Test cases for RuleRephraser."""
+
+    def test_reject_expands_terms_and_verdict(self):
+        """Abbreviations are expanded and the verdict becomes a clause."""
+        suggestions, expansions = rule_rephraser.suggest("rebar spacing wrong", ReviewStatus.REJECT)
+
+        assert [s.style for s in suggestions] == ["formal", "friendly", "concise"]
+        assert expansions == ["rebar -> reinforcement bar"]
+        assert "reinforcement bar spacing is incorrect" in suggestions[0].text
+        assert "incorrect reinforcement bar spacing" in suggestions[1].text
+        assert suggestions[2].text.startswith("Rejection:")
+
+    def test_output_is_deterministic(self):
+        """The same input always yields the same suggestions."""
+        first, _ = rule_rephraser.suggest("iim colum bad", ReviewStatus.REVISE)
+        second, _ = rule_rephraser.suggest("iim colum bad", ReviewStatus.REVISE)
+
+        assert [s.text for s in first] == [s.text for s in second]
+        assert "The BIM column is unsatisfactory" in " ".join(s.text for s in first)
+
+    def test_plural_subject_and_context_document(self):
+        """Plural subjects take plural verbs; the entity type names the document."""
+        context = WorkflowContext(entity_type="Drawing")
+        suggestions, _ = rule_rephraser.suggest("missing dims on dwg", ReviewStatus.REVISE, context)
+
+        assert "the dimensions on drawing are missing" in suggestions[0].text
+        assert suggestions[2].text.startswith("Please revise the drawing.")
+
+    def test_submit_without_details(self):
+        """A bare approval still reads as a complete sentence."""
+        suggestions, _ = rule_rephraser.suggest("approved", ReviewStatus.SUBMIT)
+
+        assert suggestions[0].text == "The document has been reviewed and approved."
+        assert suggestions[2].text == "Approved."
+
+    def test_num_suggestions(self):
+        """Up to five distinct suggestions can be requested."""
+        for n in range(1, 6):
+            suggestions, _ = rule_rephraser.suggest("wall paint bd", ReviewStatus.REJECT, num_suggestions=n)
+            assert len(suggestions) == n
+            assert len({s.text for s in suggestions}) == n
+            assert all(s.text[0].isupper() and s.text.endswith(".") for s in suggestions)
+
+    def test_negated_verdict(self):
+        """A negator flips the verdict instead of becoming the subject."""
+        suggestions, _ = rule_rephraser.suggest("not ok", ReviewStatus.SUBMIT)
+        text = " ".join(s.text for s in suggestions)
+
+        assert "The not" not in text
+        assert "the submission is not acceptable" in text.lower()
+
+        suggestions, _ = rule_rephraser.suggest("dims not correct", ReviewStatus.REVISE)
+        assert "the dimensions are not correct" in suggestions[0].text
+
+    def test_copula_is_not_repeated(self):
+        """A comment that already has its verb keeps it once."""
+        suggestions, _ = rule_rephraser.suggest("the reinforcement is wrong", ReviewStatus.REJECT)
+        text = " ".join(s.text for s in suggestions)
+
+        assert "is is" not in text
+        assert "the reinforcement is incorrect" in text.lower()
+
+        suggestions, _ = rule_rephraser.suggest(
+            "rebar spacing ok and the reinforcement is wrong", ReviewStatus.REJECT
+        )
+        assert "is is" not in suggestions[0].text
+        assert (
+            "the reinforcement bar spacing is acceptable and the reinforcement is incorrect"
+            in suggestions[0].text.lower()
+        )
+
+    def test_participle_subject(self):
+        """A verdict on work done describes how it was done."""
+        suggestions, _ = rule_rephraser.suggest("site cleared ok", ReviewStatus.SUBMIT)
+
+        assert "The site has been cleared satisfactorily." in suggestions[0].text
+        assert "site cleared is" not in " ".join(s.text for s in suggestions)
+
+    def test_issue_category_follow_up(self):
+        """Rejections name what to do about the kind of issue; negated verdicts do not."""
+        suggestions, _ = rule_rephraser.suggest("dims wrong", ReviewStatus.REJECT)
+        assert suggestions[0].text.endswith("Please verify the dimensions against the design drawings.")
+        assert "design drawings" not in suggestions[2].text
+
+        suggestions, _ = rule_rephraser.suggest("no errors", ReviewStatus.REVISE)
+        assert "Please correct the errors noted." not in suggestions[0].text
+        assert "the submission contains no errors" in suggestions[0].text
@@ -0,0 +1,111 @@
+"""
+Tests for the past-suggestion retrieval index.
+"""
+import asyncio
+
+from sqlalchemy import create_engine, text
+
+import app.comments_db.models  # noqa: F401  (registers the tables)
+from app.comments_db.base import Base
+from app.models.rephrase_schemas import CommentRephraseRequest, ReviewStatus
+from app.services.comment_rephraser import comment_rephraser
+from app.services.suggestion_index import SuggestionIndex
+
+
+def _index() -> SuggestionIndex:
+    index = SuggestionIndex(dimensions=1024, max_entries=100)
+    index.add(1, "rebar spacing wrong", "reject", "The reinforcement bar spacing is incorrect.", "formal", 0.95)
+    index.add(2, "rebar spacing wrong", "reject", "Rebar spacing incorrect.", "concise", 0.9)
+    index.add(3, "wall paint bd", "revise", "The wall paint finish is unsatisfactory.", "formal", 0.95)
+    index.add(4, "rebar spacing wrong", "revise", "Please adjust the rebar spacing.", "friendly", 0.85)
+    return index
+
+
+class TestSuggestionIndex:
+    """Test cases for SuggestionIndex."""
+
+    def test_near_duplicate_hits_same_status_only(self):
+        """A reworded input finds the stored suggestions for its status."""
+        suggestions, similarity = _index().search("Rebar  spacing wrong.", ReviewStatus.REJECT)
+
+        assert similarity > 0.9
+        assert [s.style for s in suggestions] == ["formal", "concise"]
+
+    def test_unrelated_input_misses(self):
+        suggestions, _ = _index().search("site cleared ok", ReviewStatus.REJECT)
+
+        assert suggestions == []
+
+    def test_feedback_orders_and_filters(self):
+        """Helpful suggestions come first; unhelpful ones are not served."""
+        index = _index()
+        index.add_feedback(2, True)
+        index.add_feedback(1, False)
+
+        suggestions, _ = index.search("rebar spacing wrong", ReviewStatus.REJECT)
+
+        assert [s.text for s in suggestions] == ["Rebar spacing incorrect."]
+
+    def test_eviction_keeps_index_consistent(self):
+        index = SuggestionIndex(dimensions=256, max_entries=8)
+        for i in range(20):
+            index.add(i, f"item {i} missing", "reject", f"Item {i} is missing.", "formal", 0.9)
+
+        suggestions, _ = index.search("item 19 missing", ReviewStatus.REJECT, min_similarity=0.99)
+
+        assert len(index) <= 8
+        assert [s.text for s in suggestions] == ["Item 19 is missing."]
+
+    def test_reused_column_matches_only_its_entry(self):
+        """A column freed by eviction keeps none of its previous weights."""
+        index = SuggestionIndex(dimensions=1024, max_entries=8)
+        inputs = ["golf pipe burst", "tile cracked", "door frame warped", "roof leak found",
+                  "paint peeling off", "window seal gone", "beam undersized", "floor uneven"]
+        for i, input_text in enumerate(inputs):
+            index.add(i, input_text, "reject", f"answer for {input_text}", "formal", 0.9)
+        index.add(8, "x", "reject", "answer for x", "formal", 0.9)
+
+        evicted, _ = index.search("golf pipe burst", ReviewStatus.REJECT, min_similarity=0.5)
+        kept, _ = index.search("beam undersized", ReviewStatus.REJECT, min_similarity=0.5)
+
+        assert evicted == []
+        assert [s.text for s in kept] == ["answer for beam undersized"]
+
+    def test_build_loads_newest_rows_only(self, tmp_path):
+        """The initial build reads at most max_entries suggestions, newest first."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'comments.db'}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            for i in range(1, 11):
+                connection.execute(text(
+                    "INSERT INTO comment_requests (id, input_text, status, input_type) "
+                    "VALUES (:id, :input, 'reject', 'expand')"
+                ), {"id": i, "input": f"item {i} missing"})
+                connection.execute(text(
+                    "INSERT INTO comment_suggestions (id, request_id, text, style, confidence, provider) "
+                    "VALUES (:id, :id, :text, 'formal', 0.9, :provider)"
+                ), {"id": i, "text": f"Item {i} is missing.", "provider": "rules" if i == 10 else "groq"})
+            connection.execute(text(
+                "INSERT INTO comment_feedback (id, suggestion_id, is_helpful) VALUES (1, 9, 0), (2, 2, 0)"
+            ))
+        index = SuggestionIndex(dimensions=256, max_entries=4)
+
+        index.build(engine)
+
+        assert index.ready and len(index) == 4
+        assert (index.last_suggestion_id, index.last_feedback_id) == (9, 2)
+        assert index.search("item 8 missing", ReviewStatus.REJECT, min_similarity=0.99)[0]
+        assert index.search("item 9 missing", ReviewStatus.REJECT, min_similarity=0.99)[0] == []  # unhelpful
+        assert index.search("item 5 missing", ReviewStatus.REJECT, min_similarity=0.99)[0] == []  # not loaded
+
+    def test_lookup_skips_retrieval_until_built(self, monkeypatch):
+        """A lookup before the build starts it in the background and does not wait."""
+        from app.services.suggestion_index import suggestion_index
+
+        started = []
+        monkeypatch.setattr(suggestion_index, "ready", False)
+        monkeypatch.setattr(suggestion_index, "start_build", lambda: started.append(True))
+        request = CommentRephraseRequest(input="rebar spacing wrong", status=ReviewStatus.REJECT)
+
+        assert asyncio.run(comment_rephraser._retrieve(request)) is None
+        assert started == [True]
@@ -0,0 +1,88 @@
+"""
+Tests for typeahead debounce and supersession.
+"""
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.metrics import TYPEAHEAD_SUPERSEDED
+from app.models.rephrase_schemas import CommentRephraseResponse, TypeaheadRequest
+from app.services import typeahead
+from textgen_common.shared_store import SharedStore
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "typeahead_debounce_ms", 20)
+    monkeypatch.setattr(typeahead, "shared_store", SharedStore(str(tmp_path / "shared.sqlite3")))
+    return typeahead.TypeaheadService()
+
+
+def _request(session_id: str, text: str) -> TypeaheadRequest:
+    return TypeaheadRequest(session_id=session_id, input=text, status="reject", generation_mode="rules")
+
+
+class TestTypeahead:
+    """Test cases for TypeaheadService."""
+
+    def test_newer_keystroke_supersedes(self, service):
+        """Only the latest request of a session produces suggestions."""
+        async def run():
+            first = asyncio.ensure_future(service.suggest(_request("s1", "rebar spacing")))
+            await asyncio.sleep(0.005)
+            second = await service.suggest(_request("s1", "rebar spacing wrong"))
+            return await first, second
+
+        first, second = asyncio.run(run())
+
+        assert first.superseded and not first.suggestions
+        assert not second.superseded
+        assert second.session_id == "s1"
+        assert "reinforcement bar spacing is incorrect" in second.suggestions[0].text
+
+    def test_sessions_are_independent(self, service):
+        """Requests from different sessions do not supersede each other."""
+        async def run():
+            return await asyncio.gather(
+                service.suggest(_request("a", "wall paint bd")),
+                service.suggest(_request("b", "missing dims on dwg")),
+            )
+
+        a, b = asyncio.run(run())
+
+        assert not a.superseded and a.suggestions
+        assert not b.superseded and b.suggestions
+        assert not service._tasks
+
+    def test_newer_keystroke_cancels_in_flight_call(self, service, monkeypatch):
+        """A keystroke during the provider call cancels that call."""
+        started = asyncio.Event()
+        cancelled = []
+
+        async def rephrase(request, priority_class, persist=True, on_suggestion=None):
+            if request.input == "rebar spacing":
+                started.set()
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.append(request.input)
+                    raise
+            return CommentRephraseResponse(success=True, original_input=request.input)
+
+        monkeypatch.setattr(typeahead.comment_rephraser, "rephrase", rephrase)
+        in_flight = TYPEAHEAD_SUPERSEDED.labels("in_flight")
+        before = in_flight._value.get()
+
+        async def run():
+            first = asyncio.ensure_future(service.suggest(_request("s1", "rebar spacing")))
+            await asyncio.wait_for(started.wait(), 1)
+            second = await service.suggest(_request("s1", "rebar spacing wrong"))
+            return await asyncio.wait_for(first, 1), second
+
+        first, second = asyncio.run(run())
+
+        assert cancelled == ["rebar spacing"]
+        assert first.superseded
+        assert not second.superseded and second.original_input == "rebar spacing wrong"
+        assert in_flight._value.get() == before + 1
@@ -0,0 +1,126 @@
+"""
+Tests for lazy imports and the startup warm-up.
+"""
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import warmup
+from app.comments_db import session
+from app.comments_db.search import SearchIndexMissingError
+from app.config import settings
+from app.models.review_comment_schemas import ReviewCommentRequest
+from app.services.review_comment_service import add_review_comment, search_review_comments
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in a fresh interpreter so nothing is imported or built yet
+WARM_UP_SCRIPT = """
+import json
+import sys
+
+import app.main
+from app.comments_db import session
+from app.services import construction_terms
+from app.warmup import warm_up
+
+
+def loaded():
+    return {
+        "sdk": "openai" in sys.modules,
+        "engine": "engine" in session._lazy,
+        "glossary": bool(construction_terms.GLOSSARY_CACHE),
+    }
+
+
+before = loaded()
+warm_up()
+# Not stdout: the logging thread writes there too
+with open(sys.argv[1], "w") as f:
+    json.dump({"before": before, "after": loaded()}, f)
+"""
+
+
+class TestWarmup:
+    """Test cases for lazy loading and the warm-up."""
+
+    def test_import_is_lazy_and_warm_up_loads(self, tmp_path):
+        """Importing the app loads no provider SDK, engine or glossary; warm_up() loads them."""
+        db_path = tmp_path / "comments.db"
+        shutil.copyfile(os.path.join(SERVICE_DIR, "comments.db"), db_path)
+        env = dict(
+            os.environ,
+            AI_PROVIDER="openai",
+            OPENAI_API_KEY="test-key",
+            COMMENTS_DB_PATH=str(db_path),
+            WARMUP_ON_STARTUP="false",
+        )
+        result = tmp_path / "state.json"
+        subprocess.run(
+            [sys.executable, "-c", WARM_UP_SCRIPT, str(result)],
+            cwd=SERVICE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+
+        state = json.loads(result.read_text())
+        assert state["before"] == {"sdk": False, "engine": False, "glossary": False}
+        assert state["after"] == {"sdk": True, "engine": True, "glossary": True}
+
+    def test_lifespan_does_not_wait_for_warm_up(self, monkeypatch):
+        """Startup completes while the warm-up is still running in the background."""
+        release = threading.Event()
+        finished = threading.Event()
+
+        def slow_warm_up():
+            release.wait(5)
+            finished.set()
+
+        monkeypatch.setattr(settings, "warmup_on_startup", True)
+        monkeypatch.setattr(warmup, "prepare_database", lambda: None)
+        monkeypatch.setattr(warmup, "warm_up", slow_warm_up)
+
+        async def start():
+            started = time.perf_counter()
+            async with warmup.lifespan(None):
+                return time.perf_counter() - started
+
+        elapsed = asyncio.run(start())
+
+        assert elapsed < 0.5
+        assert not finished.is_set()
+        release.set()
+        assert finished.wait(1)
+
+    def test_prepare_database_upgrades_an_old_database(self, tmp_path, monkeypatch):
+        """The shipped database has no search index or fingerprint table; startup adds both."""
+        db_path = tmp_path / "comments.db"
+        shutil.copyfile(os.path.join(SERVICE_DIR, "comments.db"), db_path)
+        engine = create_engine(f"sqlite:///{db_path}")
+        monkeypatch.setitem(session._lazy, "sync_engine", engine)
+        monkeypatch.setitem(
+            session._lazy, "AsyncSessionLocal",
+            async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{db_path}"), expire_on_commit=False),
+        )
+        with pytest.raises(SearchIndexMissingError):
+            asyncio.run(search_review_comments("exceeds"))
+
+        warmup.prepare_database()
+        warmup.prepare_database()
+        asyncio.run(add_review_comment(ReviewCommentRequest(
+            review_id=102, workflow_step=1, user_name="ana", status="revise", text="Slab exceeds tolerance."
+        )))
+
+        hits = asyncio.run(search_review_comments("exceeds")).results
+        assert sorted(hit.id for hit in hits) == [1, 3, 5, 7]
+        with engine.connect() as connection:
+            fingerprinted = connection.execute(text("SELECT comment_id FROM review_comment_fingerprints")).all()
+        assert fingerprinted == [(7,)]
+        engine.dispose()
@@ -0,0 +1,9 @@
+"""
+Code shared by the Text Generation API and the Comment Rephrasing Service:
+the AI provider layer, admission scheduler, idempotency keys, shared store,
+metrics, logging, tracing, profiling, admin tokens, capture, compression
+and serialization. Each service passes its own settings in with `configure()`.
+"""
+from textgen_common.config import configure
+
+__all__ = ["configure"]
@@ -0,0 +1,18 @@
+"""
+Admin token check for the operator-only endpoints (profiling, export).
+"""
+import hmac
+from typing import Optional
+
+
+def is_admin(token: Optional[str], expected: str) -> bool:
+    """
+    Compare a request's admin token with the configured one in constant time.
+
+    False when no token is configured, which turns the endpoint off. The
+    tokens are compared as UTF-8 bytes, so a header with non-ASCII
+    characters is simply a wrong token.
+    """
+    if not expected or not token:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8"))
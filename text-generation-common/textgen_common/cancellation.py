@@ -0,0 +1,69 @@
+"""
+Client-disconnect cancellation for long-running endpoints.
+
+`run_cancellable` runs the endpoint's work as a task next to a blocking
+read of the ASGI receive channel. Once the body has been read, the next
+message is `http.disconnect`, so the read completing first means the
+client went away. (`Request.is_disconnected()` cannot be used here: its
+non-blocking check is cancelled by the task groups of the `http`
+middlewares before a disconnect can come through.)
+
+On a disconnect the task is cancelled: the provider request is aborted
+(the async provider clients close the HTTP call), a queued call leaves
+the scheduler, and nothing after the cancelled await - persistence
+included - runs. Abandoned work is counted in `requests_cancelled_total`
+and `cancelled_work_seconds`.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, TypeVar
+
+from fastapi import Request
+
+from textgen_common.logging_config import set_log_context
+from textgen_common.metrics import CANCELLED_WORK, REQUESTS_CANCELLED
+
+# nginx's "client closed request"; only ever seen in logs and metrics
+CLIENT_CLOSED_REQUEST = 499
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class ClientDisconnected(Exception):
+    """The client disconnected before the response was ready."""
+
+
+async def run_cancellable(request: Request, pipeline: str, work: Awaitable[T]) -> T:
+    """Await `work`, cancelling it if the client disconnects first."""
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(request.receive())
+    start = time.perf_counter()
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        if not watcher.done():
+            watcher.cancel()
+    if task.done() or watcher.result().get("type") != "http.disconnect":
+        return await task
+
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass  # nobody is waiting for the result or an error raised while unwinding
+
+    elapsed = time.perf_counter() - start
+    REQUESTS_CANCELLED.labels(pipeline).inc()
+    CANCELLED_WORK.labels(pipeline).observe(elapsed)
+    set_log_context(outcome="client_disconnected")
+    logger.info(
+        "Client disconnected, request cancelled",
+        extra={"pipeline": pipeline, "elapsed_ms": round(elapsed * 1000, 3)},
+    )
+    raise ClientDisconnected()
@@ -0,0 +1,229 @@
+"""
+Opt-in traffic capture for replay.
+
+With CAPTURE_DIR set, a CAPTURE_SAMPLE_RATE share of the HTTP requests
+under /api/ is written as one JSON line each: arrival time, method, path,
+query, the replay-relevant headers, the sanitized request body, status,
+server-side duration and the outcome fields the request put in its access
+log context (outcome, provider, tokens, ...). `perf.replay` re-issues them.
+
+Sanitizing keeps the text the models see but drops what identifies
+people: values of REDACTED_KEYS are replaced, and e-mail addresses, phone
+numbers and API-key-like strings inside any string are masked. Query
+parameters go through the same rules as body fields.
+
+Records are handed to a writer thread, so the event loop never touches the
+file. Each worker writes its own gzip files,
+`<service>-<pid>-<timestamp>.jsonl.gz`, starting a new one after
+CAPTURE_MAX_BYTES of uncompressed JSON and keeping the newest
+CAPTURE_BACKUPS per worker. Lines are flushed in batches, so an open file
+is readable up to the last flush. When the writer falls behind, records
+are dropped rather than queued without bound (`capture_records_total`).
+"""
+import gzip
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, List, Optional
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from textgen_common.logging_config import request_context
+from textgen_common.metrics import CAPTURE_RECORDS
+
+REDACTED = "[redacted]"
+REDACTED_KEYS = {"user_name", "email", "password", "api_key", "token", "authorization", "secret"}
+CAPTURED_HEADERS = ("content-type", "x-priority-class", "accept-encoding")
+CONTEXT_FIELDS = (
+    "request_id", "outcome", "provider", "strategy", "suggestions", "degraded",
+    "prompt_tokens", "completion_tokens", "idempotency",
+)
+MAX_BODY_BYTES = 64 * 1024
+QUEUE_SIZE = 10000
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PHONE = re.compile(r"(?<!\w)\+?\d[\d ().-]{8,}\d(?!\w)")
+_KEY = re.compile(r"\b(?:sk|gsk|AIza|Bearer)[-_ ]?[A-Za-z0-9_-]{16,}")
+
+logger = logging.getLogger(__name__)
+
+
+def _mask_phone(match: re.Match) -> str:
+    # Dates and grid references have fewer digits than a phone number
+    return "<phone>" if sum(c.isdigit() for c in match.group()) >= 10 else match.group()
+
+
+def sanitize(value: Any, key: str = "") -> Any:
+    """Copy of a JSON value with personal data and secrets removed."""
+    if key.lower() in REDACTED_KEYS and value is not None:
+        return REDACTED
+    if isinstance(value, dict):
+        return {k: sanitize(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [sanitize(v) for v in value]
+    if isinstance(value, str):
+        value = _EMAIL.sub("<email>", value)
+        value = _KEY.sub("<secret>", value)
+        return _PHONE.sub(_mask_phone, value)
+    return value
+
+
+def sanitize_query(query: str) -> str:
+    """Query string with each parameter sanitized like a body field of the same name."""
+    if not query:
+        return query
+    pairs = parse_qsl(query, keep_blank_values=True)
+    return urlencode([(name, sanitize(value, name)) for name, value in pairs])
+
+
+class CaptureWriter:
+    """Writes records to rotating gzip JSONL files from a background thread."""
+
+    def __init__(self, directory: str, service: str, max_bytes: int = 64 * 1024 * 1024, backups: int = 5):
+        self.directory = directory
+        self.service = service
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue: "queue.Queue[dict]" = queue.Queue(QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._pid = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._written = 0
+
+    def write(self, record: dict) -> None:
+        """Queue a record; drops it if the writer is behind."""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            CAPTURE_RECORDS.labels("dropped").inc()
+
+    def _ensure_thread(self) -> None:
+        # Started lazily, and again in each forked worker (threads do not survive fork)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._file = None
+                self._thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _run(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+                CAPTURE_RECORDS.labels("written").inc(len(batch))
+            except Exception:
+                logger.exception("Capture write failed")
+                CAPTURE_RECORDS.labels("dropped").inc(len(batch))
+                self._file = None
+
+    def _write_batch(self, batch: List[dict]) -> None:
+        for record in batch:
+            if self._file is None or self._written >= self.max_bytes:
+                self._rotate()
+            line = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+            self._file.write(line)
+            self._written += len(line)
+        self._file.flush()  # a sync flush point: readers can decompress up to here
+
+    def _rotate(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        prefix = f"{self.service}-{os.getpid()}-"
+        self._file = gzip.open(os.path.join(self.directory, f"{prefix}{stamp}.jsonl.gz"), "wb")
+        self._written = 0
+        own = sorted(name for name in os.listdir(self.directory) if name.startswith(prefix))
+        for name in own[:-self.backups] if self.backups > 0 else []:
+            os.remove(os.path.join(self.directory, name))
+
+
+class CaptureMiddleware:
+    """Records a sample of /api/ requests and their outcome to a CaptureWriter."""
+
+    def __init__(self, app: ASGIApp, writer: Optional[CaptureWriter] = None, sample_rate: float = 1.0,
+                 prefix: str = "/api/"):
+        self.app = app
+        self.writer = writer
+        self.sample_rate = sample_rate
+        self.prefix = prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            self.writer is None
+            or scope["type"] != "http"
+            or not scope["path"].startswith(self.prefix)
+            or random.random() >= self.sample_rate
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        parts: List[bytes] = []
+        size = 0
+        status = 500
+
+        async def capture_receive() -> Message:
+            nonlocal size
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                if size <= MAX_BODY_BYTES:
+                    parts.append(chunk)
+            return message
+
+        async def capture_send(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        arrived = time.time()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            duration = time.perf_counter() - start
+            self.writer.write(self._record(scope, arrived, duration, status, b"".join(parts), size))
+
+    def _record(self, scope: Scope, arrived: float, duration: float, status: int, body: bytes,
+                size: int) -> dict:
+        headers = Headers(scope=scope)
+        record = {
+            "ts": round(arrived, 6),
+            "service": self.writer.service,
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": sanitize_query(scope.get("query_string", b"").decode("latin-1")),
+            "headers": {name: headers[name] for name in CAPTURED_HEADERS if name in headers},
+            "status": status,
+            "duration_ms": round(duration * 1000, 3),
+        }
+        if size > MAX_BODY_BYTES:
+            record["body_truncated"] = True
+        elif body:
+            try:
+                record["body"] = sanitize(json.loads(body))
+            except ValueError:
+                record["body_text"] = sanitize(body.decode("utf-8", errors="replace"))
+        context = request_context.get() or {}
+        record.update({name: context[name] for name in CONTEXT_FIELDS if name in context})
+        return record
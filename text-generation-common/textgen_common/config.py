@@ -0,0 +1,53 @@
+"""
+Per-service configuration of the shared modules.
+
+The modules in this package read their settings (provider keys, retry
+policy, scheduler limits, logging, ...) from the service that uses them.
+Each service calls `configure()` from its app/config.py, before anything
+else in the package is imported:
+
+    configure(settings, "text-generation-api")
+
+`settings` then forwards attribute access to that service's Settings
+object, so a test patching `app.config.settings` is seen here too.
+"""
+from typing import Any, Optional
+
+_service_settings: Any = None
+_service_name: Optional[str] = None
+
+
+class _ServiceSettings:
+    """Forwards attribute access to the settings passed to `configure()`."""
+
+    def _target(self) -> Any:
+        if _service_settings is None:
+            raise RuntimeError(
+                "textgen_common is not configured: import the service's app.config first"
+            )
+        return _service_settings
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._target(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._target(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._target(), name)
+
+
+settings = _ServiceSettings()
+
+
+def configure(service_settings: Any, service_name: str) -> None:
+    """Use `service_settings` for the shared modules; `service_name` labels logs, spans and captures."""
+    global _service_settings, _service_name
+    _service_settings = service_settings
+    _service_name = service_name
+
+
+def service_name() -> str:
+    """Name of the configured service."""
+    settings._target()
+    return _service_name
@@ -0,0 +1,165 @@
+"""
+Idempotency keys for the endpoints that call the LLM.
+
+A client that retries a request with the same `Idempotency-Key` header gets
+the first request's response instead of a second provider call (and, when
+rephrasing, a second stored request). Keys live in the box-local shared
+store, so duplicates are caught across all workers:
+
+- the first request claims the key (`SharedStore.add`) and runs;
+- a duplicate arriving while it runs waits for it, woken at once in the
+  same worker and by polling in another, for up to
+  IDEMPOTENCY_WAIT_SECONDS (then 409 with Retry-After);
+- the finished response is kept for IDEMPOTENCY_TTL_SECONDS and replayed
+  to later duplicates with `Idempotent-Replayed: true`.
+
+Only complete answers are kept: a failed (`success: false`), degraded or
+cancelled request releases its key, so the client's retry runs again.
+Reusing a key for a different request body is rejected with 422. A claim
+held by a worker that died expires after IDEMPOTENCY_LOCK_SECONDS.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Generic, Optional, Type, TypeVar, Union
+
+from pydantic import BaseModel
+
+from textgen_common.config import settings
+from textgen_common.logging_config import set_log_context
+from textgen_common.metrics import IDEMPOTENT_REQUESTS
+from textgen_common.serialization import FastJSONResponse, model_response
+from textgen_common.shared_store import SharedStore, shared_store
+
+NAMESPACE = "idempotency"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+# First and longest pause between checks of a key claimed by another worker
+POLL_SECONDS = (0.02, 0.5)
+
+M = TypeVar("M", bound=BaseModel)
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyError(Exception):
+    """A keyed request that cannot be run or replayed; maps to an HTTP error."""
+
+    def __init__(self, status_code: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> Optional[Dict[str, str]]:
+        return {"Retry-After": str(round(self.retry_after))} if self.retry_after else None
+
+
+@dataclass
+class IdempotentResult(Generic[M]):
+    """A response model and whether it was replayed from the store."""
+    model: M
+    replayed: bool = False
+
+    def response(self) -> Union[M, FastJSONResponse]:
+        if self.replayed:
+            return FastJSONResponse(self.model, headers={REPLAYED_HEADER: "true"})
+        return model_response(self.model)
+
+
+class IdempotencyKeys:
+    """Runs keyed requests once per key and replays their responses."""
+
+    def __init__(self, store: SharedStore):
+        self.store = store
+        # Keys this worker is running, set when they finish
+        self._running: Dict[str, asyncio.Event] = {}
+
+    async def run(
+        self,
+        pipeline: str,
+        key: Optional[str],
+        request: BaseModel,
+        work: Callable[[], Awaitable[M]],
+        response_type: Type[M],
+    ) -> IdempotentResult[M]:
+        """
+        Await `work()` unless a request with the same key ran or is running.
+
+        Without a key the work just runs. Raises IdempotencyError for an
+        overlong key, a key reused with a different body, or a duplicate
+        still running after IDEMPOTENCY_WAIT_SECONDS.
+        """
+        if not key:
+            return IdempotentResult(await work())
+        if len(key) > MAX_KEY_LENGTH:
+            raise IdempotencyError(400, f"Idempotency-Key is longer than {MAX_KEY_LENGTH} characters")
+
+        store_key = f"{pipeline}:{key}"
+        fingerprint = hashlib.sha256(request.model_dump_json().encode("utf-8")).hexdigest()
+        deadline = time.monotonic() + settings.idempotency_wait_seconds
+        pause = POLL_SECONDS[0]
+        while True:
+            entry = await self.store.aget(NAMESPACE, store_key)
+            if entry is None:
+                claim = {"fingerprint": fingerprint}
+                if await self.store.aadd(NAMESPACE, store_key, claim, settings.idempotency_lock_seconds):
+                    return IdempotentResult(await self._execute(pipeline, store_key, fingerprint, work))
+                continue  # claimed in between: read the winner's entry
+            if entry["fingerprint"] != fingerprint:
+                self._outcome(pipeline, "mismatch")
+                raise IdempotencyError(422, "Idempotency-Key was already used for a different request")
+            if "response" in entry:
+                self._outcome(pipeline, "replayed")
+                return IdempotentResult(response_type.model_validate(entry["response"]), replayed=True)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._outcome(pipeline, "conflict")
+                raise IdempotencyError(
+                    409, "A request with this Idempotency-Key is still in progress", retry_after=1
+                )
+            await self._wait(store_key, min(pause, remaining))
+            pause = min(pause * 2, POLL_SECONDS[1])
+
+    async def _execute(
+        self, pipeline: str, store_key: str, fingerprint: str, work: Callable[[], Awaitable[M]]
+    ) -> M:
+        """Run the claimed request; keep its response or release the key."""
+        finished = self._running[store_key] = asyncio.Event()
+        stored = False
+        try:
+            model = await work()
+            if getattr(model, "success", True) and not getattr(model, "degraded", False):
+                entry = {"fingerprint": fingerprint, "response": model.model_dump(mode="json")}
+                await self.store.aset(NAMESPACE, store_key, entry, settings.idempotency_ttl_seconds)
+                stored = True
+            return model
+        finally:
+            try:
+                if not stored:
+                    await self.store.adelete(NAMESPACE, store_key)
+            finally:
+                self._outcome(pipeline, "executed" if stored else "released")
+                self._running.pop(store_key, None)
+                finished.set()
+
+    async def _wait(self, store_key: str, timeout: float) -> None:
+        """Wait for a running duplicate: its event in this worker, a pause otherwise."""
+        finished = self._running.get(store_key)
+        if finished is None:
+            await asyncio.sleep(timeout)
+            return
+        try:
+            await asyncio.wait_for(finished.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _outcome(self, pipeline: str, outcome: str) -> None:
+        IDEMPOTENT_REQUESTS.labels(pipeline, outcome).inc()
+        set_log_context(idempotency=outcome)
+
+
+idempotency_keys = IdempotencyKeys(shared_store)
@@ -0,0 +1,195 @@
+"""
+Structured, non-blocking logging for both services.
+
+Records are rendered as JSON and written by a background thread: request
+handlers only enqueue them, so slow stdout never stalls the event loop.
+Repeated warnings/errors are rate limited so a provider outage cannot
+flood the log.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Request
+
+from textgen_common.config import service_name, settings
+
+# Per-request context: request id, provider and stage timings collected along the way
+request_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_context", default=None)
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+access_logger = logging.getLogger("app.access")
+
+
+class JsonFormatter(logging.Formatter):
+    """Render log records as single-line JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "service": service_name(),
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class ContextFilter(logging.Filter):
+    """Stamp records with the current request id at emit time (before queueing)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = request_context.get()
+        if context is not None and not hasattr(record, "request_id"):
+            record.request_id = context["request_id"]
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Drop repeats of the same warning/error beyond `limit` per `window` seconds.
+
+    Records are keyed by logger, level and unformatted message, so the same
+    failure with different exception text still counts as one line. The next
+    record let through after suppression carries a `suppressed` count.
+    """
+
+    def __init__(self, limit: int, window: float):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[str, int, str], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING or self.limit <= 0:
+            return True
+
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None or now - bucket[0] >= self.window:
+                suppressed = bucket[2] if bucket else 0
+                self._buckets[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if bucket[1] < self.limit:
+                bucket[1] += 1
+                return True
+            bucket[2] += 1
+            return False
+
+
+def _parse_module_levels(spec: str) -> Dict[str, str]:
+    """Parse 'app.services=DEBUG,httpx=WARNING' into a mapping."""
+    levels = {}
+    for part in spec.split(","):
+        name, _, level = part.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging() -> None:
+    """Route all logging through a queue to a background JSON writer."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if settings.log_format == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s", defaults={"request_id": "-"})
+        )
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(RateLimitFilter(settings.log_rate_limit_count, settings.log_rate_limit_window))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(settings.log_level.upper())
+    for name, level in _parse_module_levels(settings.log_levels).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def _restart_logging_in_child() -> None:
+    """The writer thread does not survive fork(); pre-forked workers start their own."""
+    global _listener
+    if _listener is not None:
+        _listener = None
+        setup_logging()
+
+
+os.register_at_fork(after_in_child=_restart_logging_in_child)
+
+
+def record_stage_timing(stage: str, seconds: float) -> None:
+    """Add a stage duration to the current request's log context."""
+    context = request_context.get()
+    if context is not None:
+        stages = context["stages"]
+        stages[stage] = round(stages.get(stage, 0.0) + seconds * 1000, 3)
+
+
+def set_log_context(**values: Any) -> None:
+    """Attach fields (provider, outcome, ...) to the current request's access record."""
+    context = request_context.get()
+    if context is not None:
+        context.update(values)
+
+
+async def request_logging_middleware(request: Request, call_next):
+    """Assign a request id and write one structured access record per request."""
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    context = {"request_id": request_id, "stages": {}}
+    token = request_context.set(context)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        route = request.scope.get("route")
+        extra = {k: v for k, v in context.items() if k not in ("request_id", "stages")}
+        access_logger.info(
+            "request completed",
+            extra={
+                "method": request.method,
+                "route": getattr(route, "path", request.url.path),
+                "status": status,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                "stage_timings_ms": context["stages"],
+                **extra,
+            },
+        )
+        request_context.reset(token)
@@ -0,0 +1,275 @@
+"""
+Prometheus metrics shared by both services.
+Exposes request latency per route, per-stage pipeline timings and provider counters.
+
+Under gunicorn (PROMETHEUS_MULTIPROC_DIR set) every worker writes its
+samples to that directory and a scrape of any worker aggregates them all.
+"""
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import APIRouter, Request, Response
+from opentelemetry.trace import SpanKind
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from textgen_common.logging_config import record_stage_timing, set_log_context
+from textgen_common.tokens import TokenUsage, estimate_tokens
+from textgen_common.tracing import start_span
+
+# Buckets tuned for a mix of sub-millisecond template/glossary work and multi-second LLM calls
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+HTTP_REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+STAGE_LATENCY = Histogram(
+    "pipeline_stage_duration_seconds",
+    "Latency of individual pipeline stages",
+    ["pipeline", "stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+PROVIDER_ERRORS = Counter(
+    "llm_provider_errors_total",
+    "Errors raised by AI provider calls",
+    ["provider", "error_type"],
+)
+
+PROVIDER_RETRIES = Counter(
+    "llm_provider_retries_total",
+    "AI provider calls retried after a transient error",
+    ["provider", "error_type"],
+)
+
+PROVIDER_FALLBACKS = Counter(
+    "llm_fallbacks_total",
+    "Requests served by a fallback path instead of the AI provider",
+    ["provider", "reason"],
+)
+
+LLM_IN_FLIGHT = Gauge(
+    "llm_in_flight_requests",
+    "AI provider calls currently in flight",
+    ["provider"],
+    multiprocess_mode="livesum",
+)
+
+CACHE_HITS = Counter(
+    "cache_hits_total",
+    "Cache lookups that returned a stored value",
+    ["cache"],
+)
+
+CACHE_MISSES = Counter(
+    "cache_misses_total",
+    "Cache lookups that found nothing",
+    ["cache"],
+)
+
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens consumed by AI provider calls",
+    ["provider", "model", "kind"],
+)
+
+LLM_REQUEST_TOKENS = Histogram(
+    "llm_request_tokens",
+    "Tokens per AI provider call; source is reported by the provider or estimated",
+    ["provider", "kind", "source"],
+    buckets=(16, 32, 64, 128, 256, 512, 1024, 2048, 4096),
+)
+
+SCHEDULER_QUEUE_WAIT = Histogram(
+    "llm_scheduler_queue_wait_seconds",
+    "Time provider calls waited for admission",
+    ["provider", "priority_class"],
+    buckets=LATENCY_BUCKETS,
+)
+
+SCHEDULER_QUEUE_DEPTH = Gauge(
+    "llm_scheduler_queue_depth",
+    "Provider calls waiting for admission",
+    ["provider", "priority_class"],
+    multiprocess_mode="livesum",
+)
+
+SCHEDULER_REJECTED = Counter(
+    "llm_scheduler_rejected_total",
+    "Provider calls rejected because their priority class queue was full",
+    ["provider", "priority_class"],
+)
+
+REQUESTS_SHED = Counter(
+    "requests_shed_total",
+    "Requests degraded or rejected because the provider was overloaded",
+    ["pipeline", "reason", "action"],
+)
+
+REQUESTS_CANCELLED = Counter(
+    "requests_cancelled_total",
+    "Requests abandoned because the client disconnected",
+    ["pipeline"],
+)
+
+CANCELLED_WORK = Histogram(
+    "cancelled_work_seconds",
+    "Time spent on requests before their client disconnected",
+    ["pipeline"],
+    buckets=LATENCY_BUCKETS,
+)
+
+LLM_CALLS_CANCELLED = Counter(
+    "llm_calls_cancelled_total",
+    "AI provider calls cancelled before they completed",
+    ["provider"],
+)
+
+IDEMPOTENT_REQUESTS = Counter(
+    "idempotent_requests_total",
+    "Requests with an Idempotency-Key, by outcome "
+    "(executed, replayed, released, conflict or mismatch)",
+    ["pipeline", "outcome"],
+)
+
+CAPTURE_RECORDS = Counter(
+    "capture_records_total",
+    "Requests recorded by traffic capture, by outcome (written or dropped)",
+    ["outcome"],
+)
+
+
+@contextmanager
+def stage_timer(
+    pipeline: str,
+    stage: str,
+    attributes: Optional[Dict[str, Any]] = None,
+    kind: SpanKind = SpanKind.INTERNAL,
+):
+    """Time a pipeline stage: histogram, per-request log timings and a trace span."""
+    start = time.perf_counter()
+    with start_span(f"{pipeline}.{stage}", attributes, kind):
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            STAGE_LATENCY.labels(pipeline, stage).observe(elapsed)
+            record_stage_timing(stage, elapsed)
+
+
+@contextmanager
+def track_llm_call(pipeline: str, provider: str):
+    """Track an AI provider call: in-flight gauge, latency, errors and cancellations."""
+    gauge = LLM_IN_FLIGHT.labels(provider)
+    gauge.inc()
+    try:
+        with stage_timer(pipeline, "provider_call", {"llm.provider": provider}, SpanKind.CLIENT):
+            yield
+    except asyncio.CancelledError:
+        LLM_CALLS_CANCELLED.labels(provider).inc()
+        raise
+    except Exception as e:
+        PROVIDER_ERRORS.labels(provider, type(e).__name__).inc()
+        raise
+    finally:
+        gauge.dec()
+
+
+def record_token_usage(
+    provider: str,
+    model: str,
+    response: Any,
+    prompt: str = "",
+    completion: str = "",
+) -> TokenUsage:
+    """
+    Record the token usage of one provider call and return it.
+
+    Handles OpenAI-compatible `usage` objects and Gemini `usage_metadata`;
+    counts the response does not carry are estimated from the prompt and
+    completion text.
+    """
+    prompt_tokens, completion_tokens = _extract_usage(response)
+    estimated = prompt_tokens is None or completion_tokens is None
+    usage = TokenUsage(
+        provider,
+        model,
+        estimate_tokens(prompt) if prompt_tokens is None else prompt_tokens,
+        estimate_tokens(completion) if completion_tokens is None else completion_tokens,
+        estimated,
+    )
+    for kind, tokens, reported in (
+        ("prompt", usage.prompt_tokens, prompt_tokens is not None),
+        ("completion", usage.completion_tokens, completion_tokens is not None),
+    ):
+        if tokens:
+            LLM_TOKENS.labels(provider, model, kind).inc(tokens)
+        LLM_REQUEST_TOKENS.labels(provider, kind, "reported" if reported else "estimated").observe(tokens)
+    set_log_context(
+        prompt_tokens=usage.prompt_tokens,
+        completion_tokens=usage.completion_tokens,
+        tokens_estimated=estimated,
+    )
+    return usage
+
+
+def _extract_usage(response: Any) -> Tuple[Optional[int], Optional[int]]:
+    """Pull (prompt, completion) token counts from a provider response."""
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        return getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None)
+
+    usage_metadata = getattr(response, "usage_metadata", None)
+    if usage_metadata is not None:
+        return (
+            getattr(usage_metadata, "prompt_token_count", None),
+            getattr(usage_metadata, "candidates_token_count", None),
+        )
+
+    return None, None
+
+
+async def metrics_middleware(request: Request, call_next):
+    """Record request latency labelled by the matched route template."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        HTTP_REQUEST_LATENCY.labels(
+            request.method, route_path, str(status)
+        ).observe(time.perf_counter() - start)
+
+
+router = APIRouter(tags=["Monitoring"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Expose metrics in the Prometheus text format."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
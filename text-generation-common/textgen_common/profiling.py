@@ -0,0 +1,221 @@
+"""
+Opt-in request profiling.
+
+Two ways to profile a request:
+- On demand: send `X-Profile: cprofile` or `X-Profile: sampling` (or the
+  `?profile=` query flag) together with `X-Admin-Token`.
+- Production sampling: set PROFILING_SAMPLE_RATE=N to profile 1-in-N requests
+  with the low-overhead sampling profiler.
+
+Artifacts are stored in PROFILING_OUTPUT_DIR (`.pstats` for cProfile,
+speedscope `.json` for sampling) and the file name is returned in the
+`X-Profile-Artifact` response header. Only the newest
+PROFILING_MAX_ARTIFACTS are kept; writing and pruning run off the event loop.
+"""
+import asyncio
+import cProfile
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse
+
+from textgen_common.auth import is_admin
+from textgen_common.config import settings
+
+PROFILE_MODES = ("cprofile", "sampling")
+
+router = APIRouter(prefix="/api/v1/admin", tags=["Admin"])
+
+_request_counter = itertools.count(1)
+# cProfile hooks the whole thread, so only one deterministic profile can run at a time
+_cprofile_lock = threading.Lock()
+
+
+class SamplingProfiler:
+    """
+    Wall-clock stack sampler.
+
+    A background thread snapshots every thread's stack at a fixed interval,
+    so the profiled request pays almost nothing beyond the sampler's own wakeups.
+    """
+
+    def __init__(self, interval_ms: float):
+        self.interval = interval_ms / 1000.0
+        self.frames: List[Tuple[str, str, int]] = []
+        self._frame_index: Dict[Tuple[str, str, int], int] = {}
+        self.samples: Dict[int, List[List[int]]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = 0.0
+        self.duration = 0.0
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                self.samples.setdefault(thread_id, []).append(self._stack(frame))
+
+    def _stack(self, frame) -> List[int]:
+        """Convert a frame chain into root-to-leaf frame indices."""
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_name, code.co_filename, code.co_firstlineno)
+            index = self._frame_index.get(key)
+            if index is None:
+                index = len(self.frames)
+                self._frame_index[key] = index
+                self.frames.append(key)
+            stack.append(index)
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def to_speedscope(self, name: str) -> dict:
+        """Render samples in the speedscope file format."""
+        thread_names = {t.ident: t.name for t in threading.enumerate()}
+        interval_ms = self.interval * 1000.0
+        profiles = []
+        for thread_id, stacks in self.samples.items():
+            profiles.append({
+                "type": "sampled",
+                "name": thread_names.get(thread_id, f"thread-{thread_id}"),
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": len(stacks) * interval_ms,
+                "samples": stacks,
+                "weights": [interval_ms] * len(stacks),
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "krion-sampling-profiler",
+            "activeProfileIndex": 0,
+            "shared": {
+                "frames": [
+                    {"name": fn, "file": file, "line": line}
+                    for fn, file, line in self.frames
+                ]
+            },
+            "profiles": profiles,
+        }
+
+
+def _requested_mode(request: Request) -> Optional[str]:
+    """Return the profiling mode for this request, if any."""
+    mode = request.headers.get("x-profile") or request.query_params.get("profile")
+    if mode and is_admin(request.headers.get("x-admin-token"), settings.profiling_admin_token):
+        return mode
+
+    rate = settings.profiling_sample_rate
+    if rate > 0 and next(_request_counter) % rate == 0:
+        return "sampling"
+
+    return None
+
+
+def _artifact_path(request: Request, extension: str) -> Tuple[str, str]:
+    """Build a unique artifact file name and its full path."""
+    route = request.url.path.strip("/").replace("/", "_") or "root"
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{route}-{os.getpid()}-{time.perf_counter_ns()}.{extension}"
+    return name, os.path.join(settings.profiling_output_dir, name)
+
+
+def _prune_artifacts() -> None:
+    """Delete the oldest artifacts beyond PROFILING_MAX_ARTIFACTS."""
+    directory = settings.profiling_output_dir
+    paths = [entry.path for entry in os.scandir(directory) if entry.is_file()]
+    if len(paths) <= settings.profiling_max_artifacts:
+        return
+    paths.sort(key=os.path.getmtime)
+    for path in paths[:len(paths) - settings.profiling_max_artifacts]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # another worker pruned it first
+
+
+def _write_cprofile(profiler: cProfile.Profile, path: str) -> None:
+    os.makedirs(settings.profiling_output_dir, exist_ok=True)
+    profiler.dump_stats(path)
+    _prune_artifacts()
+
+
+def _write_speedscope(sampler: SamplingProfiler, name: str, path: str) -> None:
+    os.makedirs(settings.profiling_output_dir, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(sampler.to_speedscope(name), f)
+    _prune_artifacts()
+
+
+async def profiling_middleware(request: Request, call_next):
+    """Run selected requests under a profiler and store the artifact."""
+    mode = _requested_mode(request)
+    if mode is None:
+        return await call_next(request)
+    if mode not in PROFILE_MODES:
+        return JSONResponse(
+            status_code=400,
+            content={"detail": f"Unknown profile mode {mode!r}; use one of {', '.join(PROFILE_MODES)}"},
+        )
+
+    if mode == "cprofile":
+        if not _cprofile_lock.acquire(blocking=False):
+            response = await call_next(request)
+            response.headers["X-Profile-Skipped"] = "profiler busy"
+            return response
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                response = await call_next(request)
+            finally:
+                profiler.disable()
+        finally:
+            _cprofile_lock.release()
+        name, path = _artifact_path(request, "pstats")
+        await asyncio.to_thread(_write_cprofile, profiler, path)
+    else:
+        sampler = SamplingProfiler(settings.profiling_interval_ms)
+        sampler.start()
+        try:
+            response = await call_next(request)
+        finally:
+            sampler.stop()
+        name, path = _artifact_path(request, "speedscope.json")
+        await asyncio.to_thread(_write_speedscope, sampler, f"{request.method} {request.url.path}", path)
+
+    response.headers["X-Profile-Artifact"] = name
+    return response
+
+
+@router.get("/profiles/{name}", include_in_schema=False)
+async def download_profile(name: str, x_admin_token: Optional[str] = Header(None)):
+    """Download a stored profile artifact (admin only)."""
+    if not is_admin(x_admin_token, settings.profiling_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+    path = os.path.join(settings.profiling_output_dir, os.path.basename(name))
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    return FileResponse(path, filename=os.path.basename(path))
@@ -0,0 +1,378 @@
+"""
+AI provider layer shared by the services.
+
+`providers.complete` is the one way a pipeline calls the configured LLM
+(AI_PROVIDER: openai, groq or gemini). It owns everything that is about
+the provider rather than the prompt:
+
+- clients: built lazily, once per worker, importing only the selected
+  provider's SDK. The OpenAI SDK (also used for Groq) keeps up to
+  PROVIDER_MAX_CONNECTIONS pooled HTTP connections; Gemini over REST
+  (GEMINI_BASE_URL) is sync and runs on a dedicated thread pool.
+- model selection: OPENAI_MODEL, GROQ_MODEL and GEMINI_MODEL.
+- prompts: the system prompt is the chat `system` message for OpenAI and
+  Groq and the model's system instruction for Gemini.
+- admission and tracking: the call holds a scheduler slot and is timed
+  by `track_llm_call`.
+- retry/timeout policy: each attempt gets PROVIDER_TIMEOUT_SECONDS;
+  timeouts, connection errors, 429 and 5xx answers are retried up to
+  PROVIDER_MAX_RETRIES times with full-jitter exponential backoff, but
+  only while no streamed text has reached the caller. The SDKs' own
+  retries are disabled so there is a single policy.
+- streaming: with `on_text`, the response is streamed and each piece is
+  awaited by the callback; the callback returning True closes the stream,
+  which also ends the generation.
+- usage accounting: every call returns its TokenUsage, recorded through
+  `record_token_usage`.
+"""
+import asyncio
+import logging
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from textgen_common.config import settings
+from textgen_common.logging_config import set_log_context
+from textgen_common.metrics import PROVIDER_RETRIES, record_token_usage, track_llm_call
+from textgen_common.scheduler import PriorityClass, scheduler
+from textgen_common.tokens import TokenUsage
+from textgen_common.tracing import inject_headers
+
+RETRYABLE_STATUS = (408, 409, 429)
+
+# Gemini models kept per distinct system prompt (the prompt is fixed per model)
+GEMINI_SYSTEM_MODELS = 32
+
+# Awaited with each piece of streamed text; returns True to stop reading
+TextCallback = Callable[[str], Awaitable[bool]]
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderNotConfiguredError(ValueError):
+    """The configured provider has no client (missing API key or SDK)."""
+
+    def __init__(self, provider: str):
+        super().__init__(f"No AI provider configured ({provider})")
+        self.provider = provider
+
+
+class EmptyCompletionError(RuntimeError):
+    """The provider answered without any text (a refusal, tool call or filtered response)."""
+
+    def __init__(self, provider: str, finish_reason: Optional[str]):
+        super().__init__(f"{provider} returned no text (finish_reason={finish_reason})")
+        self.provider = provider
+        self.finish_reason = finish_reason
+
+
+@dataclass
+class _Call:
+    """One provider call's parameters, reused across retries."""
+    client: Any
+    provider: str
+    model: str
+    system: str
+    prompt: str
+    max_tokens: int
+    stop: Sequence[str]
+    temperature: float
+
+
+def _retryable(error: Exception) -> bool:
+    """Whether a failed attempt is worth repeating."""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in ("APIConnectionError", "APITimeoutError"):
+        return True
+    # OpenAI SDK errors carry `status_code`, Google API errors an int `code`
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return isinstance(status, int) and (status in RETRYABLE_STATUS or status >= 500)
+
+
+class Providers:
+    """Clients of the configured AI provider, shared by every pipeline in the worker."""
+
+    def __init__(self):
+        self.openai_client = None
+        self.groq_client = None
+        self.gemini_model = None
+        # Builds a Gemini model for a system prompt: (model_name, system_instruction) -> model
+        self.gemini_factory: Optional[Callable[..., Any]] = None
+        self._gemini_models: Dict[str, Any] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def initialize(self) -> None:
+        """
+        Build the provider clients (lazy initialization).
+
+        Safe to call from the startup warm-up thread while requests are
+        already being served.
+        """
+        if self._initialized:
+            return
+
+        with self._init_lock:
+            if not self._initialized:
+                self._create_clients()
+                self._initialized = True
+
+    def _create_clients(self) -> None:
+        """Import the selected provider's SDK and build its client."""
+        provider = settings.ai_provider
+        logger.info(
+            "Initializing AI clients",
+            extra={
+                "provider": provider,
+                "groq_key_present": bool(settings.groq_api_key),
+                "openai_key_present": bool(settings.openai_api_key),
+            },
+        )
+
+        try:
+            if provider == "openai" and settings.openai_api_key:
+                self.openai_client = self._openai_client(settings.openai_api_key, settings.openai_base_url)
+            elif provider == "groq" and settings.groq_api_key:
+                self.groq_client = self._openai_client(settings.groq_api_key, settings.groq_base_url)
+            elif provider == "gemini" and settings.gemini_api_key:
+                self.gemini_model = self._gemini_model()
+            else:
+                logger.warning("No matching AI provider configured", extra={"provider": provider})
+                return
+            logger.info("AI client initialized", extra={"provider": provider, "model": self.model(provider)})
+        except Exception:
+            logger.exception("Failed to initialize AI client", extra={"provider": provider})
+
+    def _openai_client(self, api_key: str, base_url: Optional[str]):
+        """OpenAI-compatible async client with a bounded connection pool."""
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        connections = settings.provider_max_connections
+        return AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,
+            timeout=settings.provider_timeout_seconds or None,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+            ),
+        )
+
+    def _gemini_model(self):
+        import google.generativeai as genai
+
+        if settings.gemini_base_url:
+            genai.configure(
+                api_key=settings.gemini_api_key,
+                transport="rest",
+                client_options={"api_endpoint": settings.gemini_base_url}
+            )
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.scheduler_max_in_flight_per_worker, thread_name_prefix="gemini-rest"
+            )
+        else:
+            genai.configure(api_key=settings.gemini_api_key)
+        self.gemini_factory = genai.GenerativeModel
+        return genai.GenerativeModel(settings.gemini_model)
+
+    def _gemini_with_system(self, model: Any, system: str) -> Any:
+        """
+        `model` with `system` as its system instruction.
+
+        Gemini takes the system prompt when the model is built, not per call,
+        so one model is kept per distinct prompt.
+        """
+        if not system or self.gemini_factory is None:
+            return model
+        cached = self._gemini_models.get(system)
+        if cached is None:
+            if len(self._gemini_models) >= GEMINI_SYSTEM_MODELS:
+                self._gemini_models.clear()
+            cached = self._gemini_models[system] = self.gemini_factory(
+                model.model_name, system_instruction=system
+            )
+        return cached
+
+    def client(self, provider: str) -> Any:
+        """The client for `provider`, or None when it is not configured."""
+        return {
+            "openai": self.openai_client,
+            "groq": self.groq_client,
+            "gemini": self.gemini_model,
+        }.get(provider)
+
+    def ready(self, provider: Optional[str] = None) -> bool:
+        """Whether `provider` (default: the configured one) has a client."""
+        return self.client(provider or settings.ai_provider) is not None
+
+    def model(self, provider: str) -> str:
+        """Model name used for `provider`."""
+        if provider == "gemini":
+            return getattr(self.gemini_model, "model_name", settings.gemini_model)
+        return settings.groq_model if provider == "groq" else settings.openai_model
+
+    async def complete(
+        self,
+        pipeline: str,
+        prompt: str,
+        system: str,
+        max_tokens: int,
+        stop: Sequence[str] = (),
+        priority_class: PriorityClass = PriorityClass.INTERACTIVE,
+        on_text: Optional[TextCallback] = None,
+        temperature: float = 0.7,
+    ) -> Tuple[str, TokenUsage]:
+        """
+        Run `prompt` on the configured provider, admitted by the scheduler.
+
+        Returns the stripped response text and its token usage. Raises
+        ProviderNotConfiguredError without a client, QueueFullError when
+        the priority class queue is full, EmptyCompletionError when the
+        answer has no text, and the last error once retries are exhausted.
+        """
+        self.initialize()
+        provider = settings.ai_provider
+        client = self.client(provider)
+        if client is None:
+            raise ProviderNotConfiguredError(provider)
+
+        call = _Call(client, provider, self.model(provider), system, prompt, max_tokens, stop, temperature)
+        async with scheduler.admit(pipeline, provider, priority_class):
+            with track_llm_call(pipeline, provider):
+                text, usage = await self._with_retries(call, on_text)
+        return text.strip(), usage
+
+    async def _with_retries(self, call: _Call, on_text: Optional[TextCallback]) -> Tuple[str, TokenUsage]:
+        """Apply the timeout and retry policy to one call."""
+        received = False
+
+        async def forward(text: str) -> bool:
+            nonlocal received
+            received = True
+            return await on_text(text)
+
+        timeout = settings.provider_timeout_seconds or None
+        attempt = 0
+        while True:
+            try:
+                return await asyncio.wait_for(
+                    self._attempt(call, forward if on_text is not None else None), timeout
+                )
+            except Exception as e:
+                if received or attempt >= settings.provider_max_retries or not _retryable(e):
+                    raise
+                attempt += 1
+                PROVIDER_RETRIES.labels(call.provider, type(e).__name__).inc()
+                set_log_context(provider_retries=attempt)
+                delay = random.uniform(0, settings.provider_retry_backoff_seconds * 2 ** (attempt - 1))
+                logger.warning(
+                    "AI provider call failed, retrying",
+                    extra={
+                        "provider": call.provider,
+                        "attempt": attempt,
+                        "delay_s": round(delay, 3),
+                        "error": str(e),
+                        "error_type": type(e).__name__,
+                    },
+                )
+                await asyncio.sleep(delay)
+
+    async def _attempt(self, call: _Call, on_text: Optional[TextCallback]) -> Tuple[str, TokenUsage]:
+        if call.provider == "gemini":
+            return await self._gemini(call, on_text)
+        return await self._chat(call, on_text)
+
+    async def _chat(self, call: _Call, on_text: Optional[TextCallback]) -> Tuple[str, TokenUsage]:
+        """OpenAI-compatible chat completion (OpenAI and Groq)."""
+        request = dict(
+            model=call.model,
+            messages=[
+                {"role": "system", "content": call.system},
+                {"role": "user", "content": call.prompt}
+            ],
+            max_tokens=call.max_tokens,
+            temperature=call.temperature,
+            extra_headers=inject_headers()
+        )
+        if call.stop:
+            request["stop"] = list(call.stop)
+        prompt = f"{call.system}\n{call.prompt}"
+        if on_text is None:
+            # Async client: cancelling the awaiting task aborts the HTTP request
+            response = await call.client.chat.completions.create(**request)
+            choice = response.choices[0]
+            text = choice.message.content
+            usage = record_token_usage(call.provider, call.model, response, prompt, text or "")
+            if text is None:
+                # Not retried: the same request gets the same refusal
+                raise EmptyCompletionError(call.provider, getattr(choice, "finish_reason", None))
+            return text, usage
+
+        stream = await call.client.chat.completions.create(
+            **request, stream=True, stream_options={"include_usage": True}
+        )
+        parts = []
+        usage_chunk = None
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                if await on_text(parts[-1]):
+                    # No usage chunk after this: completion tokens are estimated
+                    await _close_stream(stream)
+                    break
+            if getattr(chunk, "usage", None):
+                usage_chunk = chunk
+        text = "".join(parts)
+        return text, record_token_usage(call.provider, call.model, usage_chunk, prompt, text)
+
+    async def _gemini(self, call: _Call, on_text: Optional[TextCallback]) -> Tuple[str, TokenUsage]:
+        """Google Gemini generation."""
+        model = self._gemini_with_system(call.client, call.system)
+        prompt = f"{call.system}\n{call.prompt}"
+        generation_config = {"max_output_tokens": call.max_tokens, "temperature": call.temperature}
+        if call.stop:
+            generation_config["stop_sequences"] = list(call.stop)
+
+        if settings.gemini_base_url:
+            # The SDK only has an async path over gRPC; the REST transport used
+            # with a base URL is sync, so the call cannot be aborted mid-flight
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(
+                self._executor,
+                lambda: model.generate_content(call.prompt, generation_config=generation_config)
+            )
+        elif on_text is not None:
+            response = await model.generate_content_async(
+                call.prompt, stream=True, generation_config=generation_config
+            )
+            parts = []
+            async for chunk in response:
+                parts.append(chunk.text)
+                if await on_text(chunk.text):
+                    break
+            text = "".join(parts)
+            return text, record_token_usage("gemini", call.model, response, prompt, text)
+        else:
+            response = await model.generate_content_async(call.prompt, generation_config=generation_config)
+
+        usage = record_token_usage("gemini", call.model, response, prompt, response.text)
+        if on_text is not None:
+            # No streaming here: the text arrives at once
+            await on_text(response.text)
+        return response.text, usage
+
+
+async def _close_stream(stream) -> None:
+    """Close a provider stream early, releasing its connection."""
+    close = getattr(stream, "close", None) or getattr(stream, "aclose", None)
+    if close is not None:
+        await close()
+
+
+# Singleton instance
+providers = Providers()
@@ -0,0 +1,225 @@
+"""
+Priority-class admission scheduler for AI provider calls.
+
+Every provider call is admitted through `scheduler.admit(...)`. At most
+SCHEDULER_MAX_IN_FLIGHT_PER_WORKER calls per provider run at once in each
+worker process; by default that is the box-wide SCHEDULER_MAX_IN_FLIGHT
+divided by WEB_CONCURRENCY, so the workers together stay within it. The
+rest queue by priority class and are released in weighted fair order, so
+interactive work keeps moving while batch or background jobs saturate the
+provider. A class whose queue is at its limit is rejected immediately with
+`QueueFullError`; a class missing from SCHEDULER_QUEUE_LIMITS keeps its
+DEFAULT_QUEUE_LIMITS entry.
+
+`estimated_wait` combines queue depth with a rolling (EWMA) provider latency
+so callers can shed load before queueing instead of timing out in the queue.
+
+Weighted fair queuing uses start-time tags: a queued call gets
+`max(virtual_time, last tag of its class) + 1 / weight`, and the lowest tag
+across classes is released next. Under contention each class gets slots in
+proportion to its weight; an idle class never banks credit.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import Enum
+from typing import Deque, Dict, Optional
+
+from textgen_common.config import settings
+from textgen_common.logging_config import set_log_context
+from textgen_common.metrics import (
+    SCHEDULER_QUEUE_DEPTH,
+    SCHEDULER_QUEUE_WAIT,
+    SCHEDULER_REJECTED,
+    stage_timer,
+)
+
+
+class PriorityClass(str, Enum):
+    """Priority classes for provider calls (sent as `X-Priority-Class`)."""
+    INTERACTIVE = "interactive"
+    BATCH = "batch"
+    BACKGROUND = "background"
+
+
+DEFAULT_WEIGHTS = {PriorityClass.INTERACTIVE: 8.0, PriorityClass.BATCH: 2.0, PriorityClass.BACKGROUND: 1.0}
+DEFAULT_QUEUE_LIMITS = {PriorityClass.INTERACTIVE: 64, PriorityClass.BATCH: 256, PriorityClass.BACKGROUND: 1024}
+
+
+class OverloadedError(RuntimeError):
+    """A request was shed because the provider is overloaded."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Service overloaded ({reason}), retry after {retry_after:.0f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class QueueFullError(RuntimeError):
+    """The priority class queue for a provider is at its limit."""
+
+    def __init__(self, provider: str, priority_class: PriorityClass):
+        super().__init__(f"Scheduler queue for {provider}/{priority_class.value} is full")
+        self.provider = provider
+        self.priority_class = priority_class
+
+
+def _parse_class_map(spec: str, cast) -> dict:
+    """Parse 'interactive=8,batch=2' into a mapping keyed by priority class."""
+    values = {}
+    for part in spec.split(","):
+        name, _, value = part.partition("=")
+        if name.strip() and value.strip():
+            values[PriorityClass(name.strip())] = cast(value.strip())
+    return values
+
+
+class _Waiter:
+    __slots__ = ("tag", "future")
+
+    def __init__(self, tag: float, future: asyncio.Future):
+        self.tag = tag
+        self.future = future
+
+
+class _ProviderQueue:
+    """In-flight count and per-class FIFO queues for one provider."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_flight = 0
+        self.latency = 0.0  # EWMA of how long a call holds its slot
+        self.virtual_time = 0.0
+        self.queues: Dict[PriorityClass, Deque[_Waiter]] = {cls: deque() for cls in PriorityClass}
+        self.last_tag: Dict[PriorityClass, float] = {cls: 0.0 for cls in PriorityClass}
+
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def pop_next(self) -> Optional[_Waiter]:
+        """Remove and return the queued call with the lowest tag."""
+        best = None
+        for queue in self.queues.values():
+            while queue and queue[0].future.done():
+                queue.popleft()  # cancelled while waiting
+            if queue and (best is None or queue[0].tag < best[0].tag):
+                best = queue
+        return best.popleft() if best is not None else None
+
+
+class AdmissionScheduler:
+    """Caps in-flight provider calls and releases queued ones by weighted fair share."""
+
+    LATENCY_ALPHA = 0.2
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        weights: Dict[PriorityClass, float],
+        queue_limits: Dict[PriorityClass, int],
+    ):
+        self.max_in_flight = max_in_flight
+        # A partial spec ("interactive=16") only overrides the classes it names
+        self.weights = {**DEFAULT_WEIGHTS, **weights}
+        self.queue_limits = {**DEFAULT_QUEUE_LIMITS, **queue_limits}
+        self._providers: Dict[str, _ProviderQueue] = {}
+
+    def _queue(self, provider: str) -> _ProviderQueue:
+        queue = self._providers.get(provider)
+        if queue is None:
+            queue = self._providers[provider] = _ProviderQueue(self.max_in_flight)
+        return queue
+
+    def stats(self, provider: str) -> Dict[str, float]:
+        """In-flight and queued counts and rolling latency for a provider."""
+        queue = self._queue(provider)
+        return {
+            "in_flight": queue.in_flight,
+            "latency": queue.latency,
+            **{cls.value: len(queue.queues[cls]) for cls in PriorityClass},
+        }
+
+    def estimated_wait(self, provider: str, priority_class: PriorityClass = PriorityClass.INTERACTIVE) -> float:
+        """
+        Seconds a new `priority_class` call would likely queue for `provider`.
+
+        The class drains at its weighted share of the provider's slots, each
+        turning over once per rolling call latency.
+        """
+        queue = self._queue(provider)
+        if queue.in_flight < queue.capacity and not queue.waiting():
+            return 0.0
+        active = [cls for cls in PriorityClass if queue.queues[cls] or cls == priority_class]
+        share = self.weights[priority_class] / sum(self.weights[cls] for cls in active)
+        ahead = len(queue.queues[priority_class]) + 1
+        return ahead * queue.latency / (queue.capacity * share)
+
+    @asynccontextmanager
+    async def admit(self, pipeline: str, provider: str, priority_class: PriorityClass = PriorityClass.INTERACTIVE):
+        """Hold an in-flight slot for `provider` for the duration of the block."""
+        queue = self._queue(provider)
+        set_log_context(priority_class=priority_class.value)
+        start = time.perf_counter()
+
+        if queue.in_flight < queue.capacity and not queue.waiting():
+            queue.in_flight += 1
+        else:
+            class_queue = queue.queues[priority_class]
+            if len(class_queue) >= self.queue_limits[priority_class]:
+                SCHEDULER_REJECTED.labels(provider, priority_class.value).inc()
+                raise QueueFullError(provider, priority_class)
+
+            tag = max(queue.virtual_time, queue.last_tag[priority_class]) + 1.0 / self.weights[priority_class]
+            queue.last_tag[priority_class] = tag
+            waiter = _Waiter(tag, asyncio.get_running_loop().create_future())
+            class_queue.append(waiter)
+
+            depth = SCHEDULER_QUEUE_DEPTH.labels(provider, priority_class.value)
+            depth.inc()
+            try:
+                with stage_timer(pipeline, "queue_wait", {"scheduler.priority_class": priority_class.value}):
+                    await waiter.future
+            except asyncio.CancelledError:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    # The slot was handed over just as we were cancelled
+                    self._release(queue)
+                elif waiter in class_queue:
+                    class_queue.remove(waiter)
+                raise
+            finally:
+                depth.dec()
+
+        admitted = time.perf_counter()
+        SCHEDULER_QUEUE_WAIT.labels(provider, priority_class.value).observe(admitted - start)
+        try:
+            yield
+        finally:
+            held = time.perf_counter() - admitted
+            queue.latency = held if not queue.latency else (
+                self.LATENCY_ALPHA * held + (1 - self.LATENCY_ALPHA) * queue.latency
+            )
+            self._release(queue)
+
+    def _release(self, queue: _ProviderQueue) -> None:
+        """Hand the freed slot to the next queued call, or return it."""
+        waiter = queue.pop_next()
+        if waiter is None:
+            queue.in_flight -= 1
+            return
+        queue.virtual_time = waiter.tag
+        waiter.future.set_result(None)
+
+
+def __getattr__(name: str):
+    # `scheduler` is built from the service's settings on first import rather
+    # than when this module is imported, which may be before configure()
+    global scheduler
+    if name == "scheduler":
+        scheduler = AdmissionScheduler(
+            max_in_flight=settings.scheduler_max_in_flight_per_worker,
+            weights=_parse_class_map(settings.scheduler_weights, float),
+            queue_limits=_parse_class_map(settings.scheduler_queue_limits, int),
+        )
+        return scheduler
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,51 @@
+"""
+Fast JSON responses.
+
+Handlers build their response models themselves, so letting FastAPI check
+the returned model against `response_model` again and encode it a second
+time is wasted work on every request. `model_response` serializes the model
+once with pydantic-core's JSON encoder and hands FastAPI a finished
+Response, which it sends untouched; `response_model` still documents the
+schema. `FastJSONResponse` is the app's default response class and encodes
+other content (dicts from health checks, errors) with orjson when it is
+installed.
+
+FAST_SERIALIZATION=false returns the models to FastAPI as before, which is
+what `perf.bench` compares against.
+"""
+import json
+from typing import Any, Union
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from textgen_common.config import settings
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Encode a model or JSON-compatible value as UTF-8 JSON bytes."""
+    if isinstance(content, BaseModel):
+        return to_json(content)
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with pydantic-core for models and orjson otherwise."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def model_response(model: BaseModel) -> Union[BaseModel, FastJSONResponse]:
+    """Return a handler-built model without FastAPI validating and encoding it again."""
+    if not settings.fast_serialization:
+        return model
+    return FastJSONResponse(model)
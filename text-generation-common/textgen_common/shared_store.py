@@ -0,0 +1,154 @@
+"""
+Box-local shared store for mutable caches.
+
+A SQLite file on tmpfs (/dev/shm where available) holding namespaced JSON
+values with a per-entry TTL. Every worker on the box reads and writes the
+same file, so a cache is filled once per box instead of once per worker
+and its size does not grow with the worker count.
+
+Connections are opened lazily per process and thread, which keeps the
+store safe to import before gunicorn forks its workers.
+
+A write can wait up to BUSY_TIMEOUT_SECONDS for another worker's lock, so
+async code uses the `a`-prefixed methods, which run the same calls in the
+default thread pool instead of on the event loop. Expired entries are
+invisible to reads and deleted by the writes, at most every
+PURGE_INTERVAL_SECONDS per process.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from textgen_common.config import settings
+from textgen_common.metrics import CACHE_HITS, CACHE_MISSES
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID
+"""
+BUSY_TIMEOUT_SECONDS = 5.0
+PURGE_INTERVAL_SECONDS = 60.0
+
+
+def _enable_wal(conn: sqlite3.Connection) -> None:
+    """
+    Switch the file to WAL mode, retrying up to BUSY_TIMEOUT_SECONDS.
+
+    The switch fails at once, without waiting on the busy timeout, while
+    another connection is setting up the same new file.
+    """
+    deadline = time.monotonic() + BUSY_TIMEOUT_SECONDS
+    while True:
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            return
+        except sqlite3.OperationalError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.01)
+
+
+class SharedStore:
+    """Namespaced key/value store with expiry, shared across processes."""
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._local = threading.local()
+        self._purged_at = time.monotonic()
+
+    @property
+    def path(self) -> str:
+        """The SQLite file; SHARED_STORE_PATH unless given, read at first use."""
+        return self._path or settings.shared_store_path
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            # Cache data: durability does not matter, concurrent readers do
+            _enable_wal(conn)
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return the stored value, or None when missing or expired."""
+        row = self._connection().execute(
+            "SELECT value FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time()),
+        ).fetchone()
+        if row is None:
+            CACHE_MISSES.labels(namespace).inc()
+            return None
+        CACHE_HITS.labels(namespace).inc()
+        return json.loads(row[0])
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        """Store a JSON-serializable value for `ttl` seconds."""
+        self._connection().execute(
+            "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value), time.time() + ttl),
+        )
+        self._purge_if_due()
+
+    def add(self, namespace: str, key: str, value: Any, ttl: float) -> bool:
+        """Store a value only if no live entry exists; return whether it was stored."""
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM entries WHERE namespace = ? AND key = ? AND expires_at <= ?",
+                (namespace, key, now),
+            )
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), now + ttl),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._purge_if_due()
+        return cursor.rowcount == 1
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._connection().execute(
+            "DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+        )
+
+    def purge_expired(self) -> int:
+        """Drop expired entries and return how many were removed."""
+        self._purged_at = time.monotonic()
+        cursor = self._connection().execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+        return cursor.rowcount
+
+    def _purge_if_due(self) -> None:
+        if time.monotonic() - self._purged_at >= PURGE_INTERVAL_SECONDS:
+            self.purge_expired()
+
+    async def aget(self, namespace: str, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self.get, namespace, key)
+
+    async def aset(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        await asyncio.to_thread(self.set, namespace, key, value, ttl)
+
+    async def aadd(self, namespace: str, key: str, value: Any, ttl: float) -> bool:
+        return await asyncio.to_thread(self.add, namespace, key, value, ttl)
+
+    async def adelete(self, namespace: str, key: str) -> None:
+        await asyncio.to_thread(self.delete, namespace, key)
+
+
+shared_store = SharedStore()
@@ -0,0 +1,128 @@
+"""
+Distributed tracing for both services.
+
+Incoming W3C `traceparent` headers are continued, every pipeline stage gets
+a span, and outgoing provider calls carry the trace context. Spans are
+written to a local JSONL file, so no collector is needed.
+"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+from opentelemetry import propagate, trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+from textgen_common.config import service_name, settings
+
+tracer = trace.get_tracer(__name__)
+
+
+def _span_to_dict(span) -> dict:
+    """Flatten a finished SDK span into an OTLP-like JSON record."""
+    context = span.get_span_context()
+    return {
+        "trace_id": format(context.trace_id, "032x"),
+        "span_id": format(context.span_id, "016x"),
+        "parent_span_id": format(span.parent.span_id, "016x") if span.parent else None,
+        "name": span.name,
+        "kind": span.kind.name,
+        "start_time_unix_nano": span.start_time,
+        "end_time_unix_nano": span.end_time,
+        "duration_ms": (span.end_time - span.start_time) / 1e6,
+        "status": span.status.status_code.name,
+        "attributes": dict(span.attributes or {}),
+        "service": span.resource.attributes.get("service.name"),
+    }
+
+
+def setup_tracing() -> None:
+    """
+    Install the tracer provider when tracing is enabled.
+
+    The SDK is only imported here, so a disabled tracer costs nothing at
+    import time and spans fall through to the API's no-op implementation.
+    """
+    if not settings.tracing_enabled:
+        return
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    class JsonlFileSpanExporter(SpanExporter):
+        """Append finished spans to a JSONL file, one span per line."""
+
+        def __init__(self, path: str):
+            self.path = path
+            self._lock = threading.Lock()
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        def export(self, spans) -> SpanExportResult:
+            lines = [json.dumps(_span_to_dict(span), default=str) for span in spans]
+            try:
+                with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+            except OSError:
+                return SpanExportResult.FAILURE
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self) -> None:
+            pass
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name()}),
+        sampler=ParentBased(TraceIdRatioBased(settings.tracing_sample_rate)),
+    )
+    provider.add_span_processor(
+        BatchSpanProcessor(JsonlFileSpanExporter(settings.tracing_export_path))
+    )
+    trace.set_tracer_provider(provider)
+
+
+@contextmanager
+def start_span(
+    name: str,
+    attributes: Optional[Dict[str, Any]] = None,
+    kind: SpanKind = SpanKind.INTERNAL,
+):
+    """Start a child span of the current context."""
+    with tracer.start_as_current_span(name, kind=kind, attributes=attributes) as span:
+        yield span
+
+
+def inject_headers(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Return headers carrying the current trace context for outgoing calls."""
+    carrier = dict(headers or {})
+    propagate.inject(carrier)
+    return carrier
+
+
+async def tracing_middleware(request: Request, call_next):
+    """Continue the caller's trace and wrap the request in a server span."""
+    context = propagate.extract(request.headers)
+    with tracer.start_as_current_span(
+        f"{request.method} {request.url.path}",
+        context=context,
+        kind=SpanKind.SERVER,
+        attributes={"http.method": request.method, "http.target": request.url.path},
+    ) as span:
+        response = await call_next(request)
+
+        route = request.scope.get("route")
+        if route is not None:
+            span.update_name(f"{request.method} {route.path}")
+            span.set_attribute("http.route", route.path)
+        span.set_attribute("http.status_code", response.status_code)
+        if response.status_code >= 500:
+            span.set_status(Status(StatusCode.ERROR))
+
+        span_context = span.get_span_context()
+        if span_context.is_valid:
+            response.headers["X-Trace-Id"] = format(span_context.trace_id, "032x")
+        return response